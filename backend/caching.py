@@ -0,0 +1,135 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+from fastapi import Request, Response
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from .config import settings
+from .database import SessionLocal
+from .metrics import CACHE_HITS, CACHE_MISSES
+from .models import User
+from .serialization import dumps
+
+# Version counters on User, one per group of cached resources
+COUNTERS = {
+    "organization": User.organization_version,
+    "templates": User.templates_version,
+}
+
+
+class CacheEntry:
+    __slots__ = ("version", "etag", "body", "checked_at")
+
+    def __init__(self, version: int, etag: str, body: bytes):
+        self.version = version
+        self.etag = etag
+        self.body = body
+        self.checked_at = time.monotonic()
+
+
+class ResponseCache:
+    """Per-worker LRU of serialized responses, tagged with the version counter
+    they were built from.
+
+    Entries younger than the TTL are served without touching the database.
+    Older ones are revalidated by reading just the counter, so other workers'
+    changes show up within one TTL while changes made through this worker
+    invalidate its entries as soon as they commit.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str, str], CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, str, str]) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Tuple[str, str, str], entry: CacheEntry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: str, counter: str):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == user_id and key[1] == counter]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+response_cache = ResponseCache(settings.RESPONSE_CACHE_TTL_SECONDS, settings.RESPONSE_CACHE_MAX_ENTRIES)
+
+
+def bump_version(db: Session, user_id: str, counter: str):
+    """Mark the user's resources in ``counter`` as changed.
+
+    Call before committing a mutation; the new version becomes visible with
+    the commit, and this worker's cached copies are dropped after it.
+    """
+    column = COUNTERS[counter]
+    db.query(User).filter(User.id == user_id).update({column: column + 1}, synchronize_session=False)
+    event.listen(db, "after_commit", lambda session: response_cache.invalidate(user_id, counter), once=True)
+
+
+def _etag(counter: str, version: int, body: bytes) -> str:
+    return f'"{counter}-{version}-{hashlib.sha1(body).hexdigest()[:16]}"'
+
+
+def _load(user_id: str, counter: str, load: Callable[[Session], Any], stale: Optional[CacheEntry]) -> CacheEntry:
+    with SessionLocal() as db:
+        # Read the version before the data, so a concurrent change can only
+        # make the entry look older than it is, never newer
+        version = db.query(COUNTERS[counter]).filter(User.id == user_id).scalar() or 0
+        if stale is not None and stale.version == version:
+            stale.checked_at = time.monotonic()
+            return stale
+        body = dumps(load(db))
+    return CacheEntry(version, _etag(counter, version, body), body)
+
+
+def not_modified(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match matches ``etag`` (weak comparison)."""
+    if_none_match = request.headers.get("if-none-match", "")
+    return any(tag.strip().removeprefix("W/") in (etag, "*") for tag in if_none_match.split(","))
+
+
+async def cached_json(
+        request: Request,
+        user_id: str,
+        counter: str,
+        name: str,
+        load: Callable[[Session], Any]
+) -> Response:
+    """Serve ``load(db)`` as JSON from the response cache with an ETag.
+
+    ``load`` runs in the threadpool on a cache miss and returns JSON-ready
+    data; it may raise HTTPException (errors aren't cached).
+    """
+    key = (user_id, counter, name)
+    entry = response_cache.get(key)
+    if entry is not None and time.monotonic() - entry.checked_at < response_cache.ttl:
+        CACHE_HITS.labels(counter).inc()
+    else:
+        CACHE_MISSES.labels(counter).inc()
+        fresh = await run_in_threadpool(_load, user_id, counter, load, entry)
+        if fresh is not entry:
+            response_cache.put(key, fresh)
+        entry = fresh
+
+    headers: Dict[str, str] = {"ETag": entry.etag, "Cache-Control": "private, no-cache"}
+    if not_modified(request, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(entry.body, media_type="application/json", headers=headers)
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, List, Literal, Optional
 
 class Settings(BaseSettings):
     DATABASE_URL: str = "mysql://root:@localhost/craftcv"
@@ -7,8 +7,120 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     UPLOAD_DIR: str = "uploads"
+    # File storage: "local" (under UPLOAD_DIR) or "s3"
+    STORAGE_BACKEND: str = "local"
+    S3_BUCKET: str = ""
+    S3_PREFIX: str = ""
+    S3_ENDPOINT_URL: str = ""
+    S3_REGION: str = ""
+    S3_ACCESS_KEY_ID: str = ""
+    S3_SECRET_ACCESS_KEY: str = ""
+    # Let the reverse proxy send /uploads files: "X-Accel-Redirect" (nginx,
+    # via an internal location aliased to UPLOAD_DIR) or "X-Sendfile"
+    UPLOADS_OFFLOAD_HEADER: str = ""
+    UPLOADS_OFFLOAD_PREFIX: str = "/protected-uploads/"
+    # Organization/template reads are served from memory for this long
+    # before their version counter is rechecked in the database
+    RESPONSE_CACHE_TTL_SECONDS: float = 5.0
+    RESPONSE_CACHE_MAX_ENTRIES: int = 10000
+    # Fair scheduling of LLM parsing and PDF rendering, per worker: slots in
+    # total and per user, and jobs queued (per worker, per user) before 429s
+    PARSE_CONCURRENCY: int = 8
+    PARSE_TENANT_CONCURRENCY: int = 4
+    PARSE_MAX_QUEUED: int = 1000
+    PARSE_TENANT_MAX_QUEUED: int = 200
+    RENDER_CONCURRENCY: int = 2
+    RENDER_TENANT_CONCURRENCY: int = 1
+    RENDER_MAX_QUEUED: int = 50
+    RENDER_TENANT_MAX_QUEUED: int = 5
+    # Fair-share weights by user id (default 1), e.g. TENANT_WEIGHTS='{"<user id>": 2}'
+    TENANT_WEIGHTS: Dict[str, float] = {}
+    # Tenants the per-tenant queue metrics name; all others (users) are
+    # reported together as "other", keeping user ids out of /metrics
+    METRICS_TENANTS: List[str] = ["reparse"]
+    # ZIP imports: zip bomb limits (declared and actual sizes) and the number
+    # of documents buffered between the extract, dedupe and parse stages
+    IMPORT_MAX_ARCHIVE_MB: int = 200
+    IMPORT_MAX_ENTRIES: int = 1000
+    IMPORT_MAX_ENTRY_MB: int = 20
+    IMPORT_MAX_TOTAL_MB: int = 1024
+    IMPORT_MAX_RATIO: int = 100
+    IMPORT_IN_FLIGHT: int = 8
+    # Resumable uploads: chunk size, largest file and how long a session (and
+    # a finalized session's idempotency key) is kept
+    UPLOAD_CHUNK_MB: int = 5
+    UPLOAD_SESSION_MAX_MB: int = 50
+    UPLOAD_SESSION_TTL_HOURS: float = 24
+    # Bulk export: rows fetched per cursor batch, Parquet row group size and
+    # how far behind now the default upper watermark stays
+    EXPORT_BATCH_SIZE: int = 500
+    EXPORT_PARQUET_ROW_GROUP_SIZE: int = 10000
+    EXPORT_WATERMARK_LAG_SECONDS: int = 60
+    # Most CV ids one bulk status change or delete may name
+    BULK_MAX_IDS: int = 1000
+    # Output profile for /generate when none is requested (checked at startup)
+    PDF_DEFAULT_PROFILE: Literal["screen", "print", "archive"] = "print"
+    # Uploaded logos are downscaled to their largest printed size at this DPI
+    LOGO_DPI: int = 300
+    # CV list thumbnails (rendering needs pypdfium2)
+    THUMBNAIL_WIDTH: int = 320
+    THUMBNAIL_QUEUE_SIZE: int = 64
+    THUMBNAIL_WORKERS: int = 1
+    # Recent CVs re-rendered in the background after a template/branding change
+    THUMBNAIL_PREWARM_LIMIT: int = 20
+    # Background storage sweeper (0 disables it)
+    MAINTENANCE_INTERVAL_SECONDS: int = 900
+    MAINTENANCE_BATCH_SIZE: int = 200
+    MAINTENANCE_BATCH_PAUSE_SECONDS: float = 0.1
+    # Unreferenced files younger than this are left alone (uploads in flight)
+    ORPHAN_GRACE_SECONDS: int = 3600
+    GENERATED_TTL_HOURS: float = 24
+    GENERATED_QUOTA_PER_USER_MB: int = 200
+    STORAGE_QUOTA_MB: int = 20480
     OPENAI_API_KEY: str = ""
+    # LLM calls: deadline per attempt and overall, retries with jittered
+    # backoff, optional hedged duplicates after the recent p95 latency, and a
+    # circuit breaker opened by consecutive transient failures
+    LLM_ATTEMPT_TIMEOUT_SECONDS: float = 60
+    LLM_DEADLINE_SECONDS: float = 150
+    LLM_MAX_ATTEMPTS: int = 3
+    LLM_BACKOFF_BASE_SECONDS: float = 1.0
+    LLM_BACKOFF_MAX_SECONDS: float = 20
+    LLM_HEDGE_ENABLED: bool = False
+    LLM_HEDGE_MIN_DELAY_SECONDS: float = 5
+    LLM_BREAKER_FAILURES: int = 5
+    LLM_BREAKER_RESET_SECONDS: float = 30
+    # CVs whose parse failed transiently are retried in the background (0 disables)
+    PARSE_RETRY_INTERVAL_SECONDS: int = 60
+    PARSE_RETRY_DELAY_SECONDS: int = 120
+    PARSE_RETRY_MAX_ATTEMPTS: int = 5
+    PARSE_RETRY_BATCH_SIZE: int = 20
+    # Admin-started re-parse jobs: CVs per committed batch and how often
+    # workers look for jobs to run or take over (0 disables the worker)
+    REPARSE_BATCH_SIZE: int = 20
+    REPARSE_POLL_SECONDS: int = 10
+    # Skill taxonomy (JSON with skills and their aliases) the CV skill
+    # tagger matches; empty for the bundled backend/data/skills.json
+    SKILL_TAXONOMY_PATH: str = ""
     APP_URL: str = "http://localhost:8000"
+    ADMIN_USERNAMES: List[str] = ["administrator"]
+    # Import LangChain/WeasyPrint in the background after startup
+    WARM_UP_SERVICES: bool = True
+
+    # Tracing: "none" (off), "jsonl" or a "package.module:Class" exporter;
+    # the jsonl file is rotated at TRACE_EXPORT_MAX_BYTES
+    TRACE_EXPORTER: str = "none"
+    TRACE_EXPORT_PATH: str = "traces/spans.jsonl"
+    TRACE_EXPORT_MAX_BYTES: int = 50 * 1024 * 1024
+    TRACE_EXPORT_BACKUPS: int = 3
+    TRACE_SAMPLE_RATE: float = 0.01
+    TRACE_SLOW_SAMPLE_RATE: float = 1.0
+    TRACE_SLOW_THRESHOLD_MS: float = 2000
+
+    # Per-request profiling (middleware is only installed when enabled)
+    PROFILING_ENABLED: bool = False
+    PROFILE_SAMPLE_RATE: float = 0.0
+    PROFILE_DIR: str = "profiles"
 
     class Config:
         env_file = ".env"
@@ -1,11 +1,12 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from sqlalchemy.orm import Session
-from .database import get_db
+from .database import SessionLocal, get_db
 from .models import User
 from .schemas import TokenData
 from .config import settings
+from .security import decode_access_token
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
@@ -30,4 +31,47 @@ async def get_current_user(
     user = db.query(User).filter(User.username == token_data.username).first()
     if user is None:
         raise credentials_exception
-    return user
\ No newline at end of file
+    return user
+
+def _user_id(token: str) -> str:
+    """User ID from the token's "uid" claim, without a database lookup.
+    Tokens issued before the claim existed are looked up by their "sub"."""
+    payload = decode_access_token(token) if token else None
+    user_id = payload.get("uid") if payload else None
+    if not user_id and payload and payload.get("sub"):
+        with SessionLocal() as db:
+            user_id = db.query(User.id).filter(User.username == payload["sub"]).scalar()
+    if not user_id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user_id
+
+def _bearer_token(request: Request) -> str:
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    return token if scheme.lower() == "bearer" else ""
+
+async def get_current_user_id(request: Request) -> str:
+    """User ID of the bearer token, usually without a database lookup."""
+    return _user_id(_bearer_token(request))
+
+async def get_link_user_id(request: Request) -> str:
+    """Like get_current_user_id, but the token may also be passed as an
+    ``access_token`` query parameter so file links work where no
+    Authorization header can be set (<img>, new tabs). Only for routes
+    serving such links: a token in a URL ends up in logs and histories.
+    """
+    return _user_id(_bearer_token(request) or request.query_params.get("access_token", ""))
+
+def require_admin(user: User):
+    """403 unless the user is listed in ADMIN_USERNAMES, for routes where
+    only some requests are admin-only."""
+    if user.username not in settings.ADMIN_USERNAMES:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Administrators only")
+
+async def get_admin_user(current_user: User = Depends(get_current_user)) -> User:
+    """The current user, who must be listed in ADMIN_USERNAMES."""
+    require_admin(current_user)
+    return current_user
@@ -1,15 +1,77 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from .routers import auth, cv, organization, template
+from .routers import admin, auth, cv, organization, template, uploads
 from .database import engine, Base
 from .config import settings
+from .metrics import MetricsMiddleware
+from .tracing import TracingMiddleware, tracer
+from .profiling import ProfilingMiddleware
+from .services.cv_parser import get_cv_parser, get_output_parser, get_chat_prompt
+from .services.cv_generator import get_cv_generator
+from .services.maintenance import maintenance_loop
+from .services.parse_retry import parse_retry_loop
+from .services.reparse import reparse_loop
+from .services.thumbnails import get_thumbnail_queue
+from . import metrics
+import asyncio
+import logging
 import os
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+logger = logging.getLogger(__name__)
 
-app = FastAPI(title="CraftCV API")
+def warm_up_services():
+    """Build the parser and generator and pull in their heavy imports."""
+    try:
+        get_cv_parser()
+        get_output_parser()
+        get_chat_prompt()
+        get_cv_generator()
+        import weasyprint  # noqa: F401
+    except Exception:
+        logger.exception("Service warm-up failed; services will initialize on first use")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create database tables
+    Base.metadata.create_all(bind=engine)
+
+    # Ensure uploads directory exists
+    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+
+    # Warm up in the background so the worker starts serving immediately
+    if settings.WARM_UP_SERVICES:
+        asyncio.get_running_loop().run_in_executor(None, warm_up_services)
+
+    # Periodic cleanup of orphaned uploads and generated PDFs
+    sweeper = None
+    if settings.MAINTENANCE_INTERVAL_SECONDS > 0:
+        sweeper = asyncio.create_task(maintenance_loop(), name="storage-sweeper")
+
+    # Background retries of parses that failed on the LLM provider's side
+    parse_retrier = None
+    if settings.PARSE_RETRY_INTERVAL_SECONDS > 0:
+        parse_retrier = asyncio.create_task(parse_retry_loop(), name="parse-retry")
+
+    # Admin-started re-parse jobs, resumed from their checkpoint after a restart
+    reparser = None
+    if settings.REPARSE_POLL_SECONDS > 0:
+        reparser = asyncio.create_task(reparse_loop(), name="reparse")
+
+    # Background thumbnail rendering
+    thumbnail_queue = get_thumbnail_queue()
+    thumbnail_queue.start()
+    yield
+    if sweeper:
+        sweeper.cancel()
+    if parse_retrier:
+        parse_retrier.cancel()
+    if reparser:
+        reparser.cancel()
+    await thumbnail_queue.stop()
+    tracer.exporter.shutdown()
+
+app = FastAPI(title="CraftCV API", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -19,15 +81,20 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-
-# Ensure uploads directory exists
-os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
-
-# Mount static files directory
-app.mount("/uploads", StaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
 
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(cv.router, prefix="/api/cv", tags=["cv"])
 app.include_router(organization.router, prefix="/api/organization", tags=["organization"])
 app.include_router(template.router, prefix="/api/template", tags=["template"])
+app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
+# Uploaded and generated files, with ETags, Range and long-lived caching
+app.include_router(uploads.router, prefix="/uploads")
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
@@ -0,0 +1,158 @@
+import os
+import time
+from contextlib import contextmanager
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+from .tracing import tracer
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+REQUEST_LATENCY = Histogram(
+    "craftcv_http_request_duration_seconds",
+    "HTTP request latency by route template and status code",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+STAGE_LATENCY = Histogram(
+    "craftcv_stage_duration_seconds",
+    "Latency of ingestion and render pipeline stages",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+PARSE_FAILURES = Counter(
+    "craftcv_parse_failures_total",
+    "CV parse failures by the stage that failed",
+    ["stage"],
+)
+CACHE_HITS = Counter("craftcv_cache_hits_total", "Cache hits", ["cache"])
+CACHE_MISSES = Counter("craftcv_cache_misses_total", "Cache misses", ["cache"])
+QUEUE_DEPTH = Gauge(
+    "craftcv_queue_depth",
+    "Work items waiting to be processed",
+    ["queue"],
+    multiprocess_mode="livesum",
+)
+STORAGE_RECLAIMED_BYTES = Counter(
+    "craftcv_storage_reclaimed_bytes_total",
+    "Bytes freed by the storage sweeper by reason",
+    ["reason"],
+)
+STORAGE_USAGE_BYTES = Gauge(
+    "craftcv_storage_usage_bytes",
+    "Bytes under UPLOAD_DIR after the last sweep",
+    multiprocess_mode="max",
+)
+TENANT_QUEUE_DEPTH = Gauge(
+    "craftcv_tenant_queue_depth",
+    "Jobs waiting for a parse or render slot by tenant (users as \"other\")",
+    ["queue", "tenant"],
+    multiprocess_mode="livesum",
+)
+TENANT_QUEUE_WAIT = Histogram(
+    "craftcv_tenant_queue_wait_seconds",
+    "Time jobs waited for a parse or render slot by tenant (users as \"other\")",
+    ["queue", "tenant"],
+    buckets=LATENCY_BUCKETS,
+)
+SCHEDULER_REJECTIONS = Counter(
+    "craftcv_scheduler_rejections_total",
+    "Requests refused with 429 by the fair scheduler, by which queue limit was hit",
+    ["queue", "limit"],
+)
+LLM_ATTEMPTS = Counter(
+    "craftcv_llm_attempts_total",
+    "LLM call attempts by outcome (success, timeout, error, failed)",
+    ["outcome"],
+)
+LLM_HEDGES = Counter(
+    "craftcv_llm_hedges_total",
+    "Hedged duplicate LLM requests issued, and how many finished first",
+    ["outcome"],
+)
+CIRCUIT_STATE = Gauge(
+    "craftcv_circuit_state",
+    "Circuit breaker state: 0 closed, 1 half-open, 2 open",
+    ["circuit"],
+    multiprocess_mode="livemax",
+)
+CIRCUIT_REJECTIONS = Counter(
+    "craftcv_circuit_rejections_total",
+    "Calls refused without trying because the circuit was open",
+    ["circuit"],
+)
+REPARSE_CVS = Counter(
+    "craftcv_reparse_cvs_total",
+    "CVs handled by re-parse jobs, by outcome",
+    ["outcome"],
+)
+PDF_OUTPUT_BYTES = Histogram(
+    "craftcv_pdf_output_bytes",
+    "Size of generated PDFs by output profile",
+    ["profile"],
+    buckets=(25_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 2_500_000, 5_000_000, 10_000_000),
+)
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+
+@contextmanager
+def stage(name: str):
+    """Time a pipeline stage into the stage latency histogram and a trace span."""
+    start = time.perf_counter()
+    try:
+        with tracer.span(name) as span:
+            yield span
+    finally:
+        STAGE_LATENCY.labels(name).observe(time.perf_counter() - start)
+
+
+def render() -> bytes:
+    """Render all metrics in the Prometheus text exposition format.
+
+    When PROMETHEUS_MULTIPROC_DIR is set (e.g. under gunicorn with several
+    workers) the samples of every worker process are aggregated.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency per route template and status."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            # Label by template ("/api/cv/{cv_id}") rather than raw path to bound cardinality
+            route_path = getattr(route, "path", None) or "unmatched"
+            REQUEST_LATENCY.labels(scope["method"], route_path, str(status_code)).observe(
+                time.perf_counter() - start
+            )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Enum as SQLEnum, Text, JSON, Boolean
+from sqlalchemy import Column, String, DateTime, ForeignKey, Enum as SQLEnum, Text, JSON, Boolean, Integer, BigInteger, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from .database import Base
@@ -16,6 +16,9 @@ class User(Base):
     username = Column(String(255), unique=True, nullable=False)
     email = Column(String(255), unique=True, nullable=False)
     password = Column(String(255), nullable=False)
+    # Bumped by every change to the user's organization/templates (see caching.py)
+    organization_version = Column(Integer, nullable=False, default=0, server_default="0")
+    templates_version = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     organization = relationship("Organization", back_populates="user", uselist=False)
@@ -27,7 +30,8 @@ class Organization(Base):
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = Column(String(36), ForeignKey("users.id"), nullable=False)
-    logo_url = Column(Text, nullable=True)
+    logo_url = Column(Text, nullable=True)  # Downscaled for rendering
+    logo_original_url = Column(Text, nullable=True)  # As uploaded, when logo_url is a resized copy
     primary_color = Column(String(7), default="#2563eb")
     secondary_color = Column(String(7), default="#1e40af")
     font = Column(String(255), default="Inter")
@@ -46,6 +50,23 @@ class CV(Base):
     file_url = Column(Text, nullable=False)
     status = Column(SQLEnum(CVStatus), default=CVStatus.PROCESSING)
     parsed_data = Column(JSON, nullable=True)
+    # Normalized, template-ready copy of parsed_data (see services/render_model.py)
+    render_data = Column(JSON, nullable=True)
+    render_version = Column(Integer, nullable=True)
+    render_hash = Column(String(64), nullable=True)
+    # Failed parses; parse_retry_at is set while a retry is scheduled
+    parse_attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    parse_error = Column(Text, nullable=True)
+    parse_retry_at = Column(DateTime(timezone=True), nullable=True, index=True)
+    # cv_parser.PARSE_VERSION of the prompt/schema that produced parsed_data
+    parse_version = Column(String(16), nullable=True)
+    # When parsed_data was last written: the incremental export watermark,
+    # so CVs parsed by a retry or re-parse job are exported again
+    parsed_at = Column(DateTime(timezone=True), nullable=True, index=True)
+    # Canonical skill IDs tagged from the CV's text and parsed_data, and the
+    # taxonomy version they were tagged with (see services/skills.py)
+    skill_ids = Column(JSON, nullable=True)
+    skills_version = Column(String(16), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     user = relationship("User", back_populates="cvs")
@@ -61,4 +82,63 @@ class Template(Base):
     is_default = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
-    user = relationship("User", back_populates="templates")
\ No newline at end of file
+    user = relationship("User", back_populates="templates")
+
+class Blob(Base):
+    __tablename__ = "blobs"
+
+    key = Column(String(255), primary_key=True)  # blobs/ab/cd/<sha256><ext>
+    size = Column(BigInteger, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=1)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Set by every new reference: the sweeper leaves recently referenced
+    # blobs alone, as their CV row may not be committed yet
+    last_referenced_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class UploadSession(Base):
+    """A resumable upload: chunks are stored under upload-sessions/<id>/ until
+    the session is finalized into a CV (see services/upload_sessions.py)."""
+    __tablename__ = "upload_sessions"
+    __table_args__ = (UniqueConstraint("user_id", "idempotency_key", name="uq_upload_sessions_idempotency_key"),)
+
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String(36), ForeignKey("users.id"), nullable=False)
+    filename = Column(String(255), nullable=False)
+    size = Column(BigInteger, nullable=False)
+    chunk_size = Column(Integer, nullable=False)
+    sha256 = Column(String(64), nullable=True)  # Checked on finalize when the client sends it
+    status = Column(String(20), nullable=False, default="open")  # open, finalizing or complete
+    # Set by finalize; a retry with the same key returns the same CV
+    idempotency_key = Column(String(255), nullable=True)
+    cv_id = Column(String(36), ForeignKey("cvs.id", ondelete="SET NULL"), nullable=True)
+    # A finalize that crashed can be taken over once its lease has passed;
+    # the owner token tells a finalize whether it still holds the claim
+    lease_owner = Column(String(36), nullable=True)
+    lease_until = Column(DateTime(timezone=True), nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class ReparseJob(Base):
+    """An admin-started re-parse of stored CVs (see services/reparse.py).
+    CVs are processed in ID order and ``cursor`` is the last ID done, so a
+    job picks up where it stopped after a crash or restart."""
+    __tablename__ = "reparse_jobs"
+
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    created_by = Column(String(36), ForeignKey("users.id"), nullable=False)
+    # {"missing": bool, "stale": bool, "user_id": str, "created_before": iso, "created_after": iso}
+    filters = Column(JSON, nullable=False)
+    parse_version = Column(String(16), nullable=False)  # Version the job parses to
+    status = Column(String(20), nullable=False, default="pending")  # pending, running, completed, cancelled or failed
+    cursor = Column(String(36), nullable=True)
+    total = Column(Integer, nullable=False, default=0)  # Matching CVs when the job was created
+    processed = Column(Integer, nullable=False, default=0)
+    succeeded = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    # The worker running the job renews its lease; an expired lease means it died
+    lease_owner = Column(String(36), nullable=True)
+    lease_until = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
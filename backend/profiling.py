@@ -0,0 +1,123 @@
+import cProfile
+import logging
+import os
+import random
+import re
+import threading
+from urllib.parse import parse_qs
+from uuid import uuid4
+from starlette.concurrency import run_in_threadpool
+from .config import settings
+from .security import decode_access_token
+from .tracing import current_trace_id
+
+try:
+    from pyinstrument import Profiler
+    from pyinstrument.renderers import SpeedscopeRenderer
+except ImportError:  # pragma: no cover - optional dependency
+    Profiler = None
+
+logger = logging.getLogger(__name__)
+
+# Only one request is profiled at a time per worker, so profiles aren't mixed
+_profile_lock = threading.Lock()
+
+
+def _is_admin(headers: dict) -> bool:
+    authorization = headers.get(b"authorization", b"").decode("latin-1")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    payload = decode_access_token(token)
+    return bool(payload) and payload.get("sub") in settings.ADMIN_USERNAMES
+
+
+def _requested(scope, headers: dict) -> bool:
+    if headers.get(b"x-profile") in (b"1", b"true"):
+        return True
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return query.get("profile", [""])[0] in ("1", "true")
+
+
+def _slug(route_path: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "_", route_path).strip("_") or "root"
+
+
+def _write_speedscope(profiler, path: str):
+    output = profiler.output(SpeedscopeRenderer())
+    with open(path, "wb") as f:
+        f.write(output.encode("utf-8"))
+
+
+class ProfilingMiddleware:
+    """Profiles individual requests on demand.
+
+    A request is profiled when an admin sends ``X-Profile: 1`` (or
+    ``?profile=1``), or at random with probability PROFILE_SAMPLE_RATE.
+    With pyinstrument installed the profile is a sampling profile written as
+    speedscope JSON; otherwise a cProfile ``.prof`` file (readable by
+    flameprof/snakeviz) is written. Files land in PROFILE_DIR named after the
+    route and request ID, which is also returned in ``X-Profile-Id``.
+
+    The middleware is only registered when PROFILING_ENABLED is set.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        wanted = (_requested(scope, headers) and _is_admin(headers)) or (
+            settings.PROFILE_SAMPLE_RATE and random.random() < settings.PROFILE_SAMPLE_RATE
+        )
+        if not wanted or not _profile_lock.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = current_trace_id() or uuid4().hex
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", request_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            if Profiler is not None:
+                profiler = Profiler(async_mode="enabled")
+                profiler.start()
+                try:
+                    await self.app(scope, receive, send_wrapper)
+                finally:
+                    profiler.stop()
+                    # Rendering and writing a large profile takes a while:
+                    # keep it off the event loop
+                    path = self._path(scope, request_id, "speedscope.json")
+                    await run_in_threadpool(_write_speedscope, profiler, path)
+                    logger.info("Wrote request profile %s", path)
+            else:
+                # cProfile is per thread, so other requests interleaved on the
+                # event loop while this one awaits show up in its profile too
+                profile = cProfile.Profile()
+                profile.enable()
+                try:
+                    await self.app(scope, receive, send_wrapper)
+                finally:
+                    profile.disable()
+                    path = self._path(scope, request_id, "prof")
+                    await run_in_threadpool(profile.dump_stats, path)
+                    logger.info("Wrote request profile %s", path)
+        finally:
+            _profile_lock.release()
+
+    def _path(self, scope, request_id: str, extension: str) -> str:
+        route = scope.get("route")
+        route_path = getattr(route, "path", None) or scope["path"]
+        filename = f"{scope['method']}_{_slug(route_path)}-{request_id}.{extension}"
+        return os.path.join(settings.PROFILE_DIR, filename)
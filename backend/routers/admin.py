@@ -0,0 +1,83 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import List
+from ..database import get_db
+from ..models import ReparseJob, User
+from ..schemas import ReparseJob as ReparseJobSchema, ReparseJobCreate
+from ..dependencies import get_admin_user
+from ..services.reparse import CANCELLED, FAILED, PENDING, RUNNING, create_job, wake_reparse_worker
+
+router = APIRouter()
+
+def get_job(db: Session, job_id: str) -> ReparseJob:
+    job = db.query(ReparseJob).filter(ReparseJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Re-parse job not found")
+    return job
+
+@router.post("/reparse-jobs", response_model=ReparseJobSchema, status_code=201)
+async def create_reparse_job(
+    body: ReparseJobCreate,
+    db: Session = Depends(get_db),
+    admin: User = Depends(get_admin_user)
+):
+    """Re-parse the stored CVs matching the filters in the background:
+    ``missing`` and/or ``stale`` (either matches), optionally narrowed to
+    one user and a creation time range. Without either flag every CV
+    matching the other filters is re-parsed."""
+    job = create_job(db, admin.id, body.model_dump(mode="json", exclude_none=True))
+    db.commit()
+    db.refresh(job)
+    wake_reparse_worker()
+    return job
+
+@router.get("/reparse-jobs", response_model=List[ReparseJobSchema])
+async def list_reparse_jobs(
+    db: Session = Depends(get_db),
+    admin: User = Depends(get_admin_user)
+):
+    return db.query(ReparseJob).order_by(ReparseJob.created_at.desc()).limit(50).all()
+
+@router.get("/reparse-jobs/{job_id}", response_model=ReparseJobSchema)
+async def get_reparse_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    admin: User = Depends(get_admin_user)
+):
+    return get_job(db, job_id)
+
+@router.post("/reparse-jobs/{job_id}/cancel", response_model=ReparseJobSchema)
+async def cancel_reparse_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    admin: User = Depends(get_admin_user)
+):
+    """Stop the job once its current batch is saved; it can be resumed
+    later."""
+    job = get_job(db, job_id)
+    if job.status not in (PENDING, RUNNING):
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    # The running worker stops when it fetches the next batch
+    job.status = CANCELLED
+    job.lease_until = None
+    db.commit()
+    db.refresh(job)
+    return job
+
+@router.post("/reparse-jobs/{job_id}/resume", response_model=ReparseJobSchema)
+async def resume_reparse_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    admin: User = Depends(get_admin_user)
+):
+    """Continue a cancelled or failed job from its last checkpoint."""
+    job = get_job(db, job_id)
+    if job.status not in (CANCELLED, FAILED):
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    job.status = PENDING
+    job.error = None
+    job.finished_at = None
+    db.commit()
+    db.refresh(job)
+    wake_reparse_worker()
+    return job
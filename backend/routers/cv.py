@@ -1,39 +1,62 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status, UploadFile, File
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, RedirectResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import delete, select, update
 from sqlalchemy.orm import Session
-from typing import List
+from datetime import datetime
+from typing import List, Optional
+import asyncio
+import logging
 import os
-from ..database import get_db
-from ..models import CV, User, Template, Organization
-from ..schemas import CVCreate, CV as CVSchema, BulkCVUpload, CVUpdate
-from ..dependencies import get_current_user
-from ..services.cv_parser import CVParser
-from ..services.cv_generator import CVGenerator
-import aiofiles
+from ..config import settings
+from ..database import get_db, SessionLocal
+from ..models import CV, User, Template, Organization, UploadSession
+from ..schemas import (
+    CVCreate, CV as CVSchema, BulkCVIds, BulkCVUpdate, BulkCVUpload, BulkResult, CVUpdate, ImportResult,
+    PreviewRequest, SectionPreviewRequest, UploadSession as UploadSessionSchema, UploadSessionCreate
+)
+from ..dependencies import get_current_user, get_link_user_id, require_admin
+from ..caching import not_modified
+from ..services.cv_parser import get_cv_parser
+from ..services.cv_generator import PDFProfile, get_cv_generator
+from ..services import upload_sessions
+from ..services.export import MEDIA_TYPES, ExportFormat, export_chunks, export_window, iter_export_rows, parquet_available
+from ..services.importer import ArchiveImporter, ArchiveRejected, InvalidArchive
+from ..services.parse_retry import record_parse_failure, record_parse_success
+from ..services.scheduler import FairScheduler, Reservation, SchedulerBusy, TooManyJobs, get_scheduler
+from ..services.skills import get_skill_tagger
+from ..services.render_model import set_render_model, upgrade_render_model
+from ..services.storage import get_blob_store, generated_path
+from ..services.thumbnails import get_thumbnail_queue, load_render_inputs, thumbnail_key, thumbnails_available
+from ..metrics import QUEUE_DEPTH, stage
+from ..serialization import JSONArrayStreamingResponse, compress_chunks, dumps, negotiate_encoding, sse_event
+from ..tracing import create_task, tracer
 from uuid import uuid4
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
-UPLOAD_DIR = "uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+def admit(scheduler: FairScheduler, user_id: str, count: int = 1) -> Reservation:
+    """Admission control: 429 with Retry-After when the user or the worker
+    already has too much parse/render work queued, 413 when ``count`` jobs
+    would be too many even with nothing queued. Queue the admitted jobs
+    through the returned reservation and release what's left of it."""
+    try:
+        return scheduler.check(user_id, count)
+    except TooManyJobs as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except SchedulerBusy as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
 
-cv_parser = CVParser()
-cv_generator = CVGenerator()
+# Work that outlives its request, traced as part of it; holding the tasks
+# keeps them from being garbage collected mid-run
+_background_tasks = set()
 
-async def save_upload_file(file: UploadFile) -> str:
-    file_extension = os.path.splitext(file.filename)[1]
-    file_name = f"{uuid4()}{file_extension}"
-    file_path = os.path.join(UPLOAD_DIR, file_name)
-    
-    async with aiofiles.open(file_path, 'wb') as out_file:
-        content = await file.read()
-        await out_file.write(content)
-    
-    return file_path
-
-async def delete_file(file_path: str):
-    if os.path.exists(file_path):
-        os.remove(file_path)
+def run_in_background(coro, name: str) -> asyncio.Task:
+    task = create_task(coro, name)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
 
 @router.post("/upload", response_model=List[CVSchema])
 async def upload_cvs(
@@ -41,48 +64,455 @@ async def upload_cvs(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    uploaded_cvs = []
-    for file in files:
+    # Refuse the whole batch up front rather than part of it
+    reservation = admit(get_scheduler("parse"), current_user.id, len(files))
+
+    queue_depth = QUEUE_DEPTH.labels("upload")
+    queue_depth.inc(len(files))
+    blob_store = get_blob_store()
+    stored_files = []
+    try:
+        for file in files:
+            with tracer.span("upload_cvs.file", filename=file.filename):
+                # Save the file (identical uploads share one stored blob) and
+                # commit its reference at once: the blob row stays locked
+                # until then, which mustn't wait for other files or the LLM
+                with tracer.span("save_upload_file"):
+                    file_path, content = await blob_store.save_upload(db, file)
+                    db.commit()
+            stored_files.append((file.filename, file_path, content))
+    except BaseException:
+        queue_depth.dec(len(files))
+        reservation.release()
+        blob_store.release_committed(db, [file_path for _, file_path, _ in stored_files])
+        raise
+
+    async def parse(filename: str, file_path: str, content: bytes):
+        cv = CV(user_id=current_user.id, original_filename=filename, file_url=file_path)
+        # Parse the CV using LLM, sharing the parse slots fairly between users
         try:
-            # Save the file
-            file_path = await save_upload_file(file)
-            
-            # Parse the CV using LLM
-            parsed_data = await cv_parser.parse_cv(file_path)
-            
-            # Create CV record with parsed data
-            cv = CV(
-                user_id=current_user.id,
-                original_filename=file.filename,
-                file_url=file_path,
-                parsed_data=parsed_data
-            )
-            db.add(cv)
-            uploaded_cvs.append(cv)
-            
+            async with reservation.slot():
+                parsed_data = await get_cv_parser().parse_cv(file_path, content)
         except Exception as e:
-            # If parsing fails, still save the CV but without parsed data
-            cv = CV(
-                user_id=current_user.id,
-                original_filename=file.filename,
-                file_url=file_path
-            )
-            db.add(cv)
-            uploaded_cvs.append(cv)
-            print(f"Error processing CV {file.filename}: {str(e)}")
+            # If parsing fails, still save the CV without parsed data; provider
+            # failures (timeouts, an open circuit) are retried in the background
+            record_parse_failure(cv, e)
+            set_render_model(cv)
+            logger.warning("Error processing CV %s: %s", filename, e)
+        else:
+            record_parse_success(cv, parsed_data)
+        finally:
+            queue_depth.dec()
+        return cv
+
+    try:
+        uploaded_cvs = await asyncio.gather(*(parse(*stored) for stored in stored_files))
+        db.add_all(uploaded_cvs)
+        with stage("db_commit"):
+            db.commit()
+    except BaseException:
+        blob_store.release_committed(db, [file_path for _, file_path, _ in stored_files])
+        raise
+    finally:
+        reservation.release()
+    with tracer.span("db.refresh", rows=len(uploaded_cvs)):
+        for cv in uploaded_cvs:
+            db.refresh(cv)
     
-    db.commit()
+    # Render list thumbnails in the background (skipped when the queue is full)
+    thumbnail_queue = get_thumbnail_queue()
     for cv in uploaded_cvs:
-        db.refresh(cv)
+        thumbnail_queue.submit(cv.id)
     
     return uploaded_cvs
 
+@router.post("/import", response_model=ImportResult)
+async def import_cvs(
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Import every CV in a ZIP archive, with a result per archive entry."""
+    if file.size is not None and file.size > settings.IMPORT_MAX_ARCHIVE_MB * 1024 * 1024:
+        raise HTTPException(status_code=413, detail=f"Archive is larger than {settings.IMPORT_MAX_ARCHIVE_MB} MB")
+    try:
+        importer = await run_in_threadpool(ArchiveImporter, db, current_user.id, file.file)
+    except InvalidArchive as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ArchiveRejected as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    with admit(get_scheduler("parse"), current_user.id, importer.queued_jobs) as reservation:
+        entries = await importer.run(reservation)
+
+    thumbnail_queue = get_thumbnail_queue()
+    counts = {"imported": 0, "duplicate": 0, "skipped": 0, "rejected": 0, "failed": 0}
+    for entry in entries:
+        counts[entry.status] += 1
+        if entry.cv is not None:
+            thumbnail_queue.submit(entry.cv.id)
+    return {
+        "imported": counts["imported"],
+        "duplicates": counts["duplicate"],
+        "skipped": counts["skipped"],
+        "rejected": counts["rejected"],
+        "failed": counts["failed"],
+        "entries": [entry.to_dict() for entry in entries]
+    }
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+SSE_KEEPALIVE_SECONDS = 15
+
+@router.post("/upload/stream")
+async def upload_cvs_stream(
+    files: List[UploadFile] = File(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Like /upload, answered with Server-Sent Events as the work happens:
+    ``accepted`` with the file list, ``field`` for each top-level field of a
+    CV as soon as the LLM has produced it, ``cv`` with each saved CV (in
+    completion order) and finally ``done``."""
+    reservation = admit(get_scheduler("parse"), current_user.id, len(files))
+
+    # The CVs are saved by the tasks below, in their own sessions; commit
+    # each blob reference at once, as in /upload
+    blob_store = get_blob_store()
+    stored_files = []
+    try:
+        for file in files:
+            file_path, content = await blob_store.save_upload(db, file)
+            db.commit()
+            stored_files.append((file.filename, file_path, content))
+    except BaseException:
+        reservation.release()
+        blob_store.release_committed(db, [file_path for _, file_path, _ in stored_files])
+        raise
+
+    user_id = current_user.id
+    events: asyncio.Queue = asyncio.Queue()
+    queue_depth = QUEUE_DEPTH.labels("upload")
+    queue_depth.inc(len(stored_files))
+
+    def save(cv: CV) -> dict:
+        with SessionLocal() as session:
+            session.add(cv)
+            session.commit()
+            session.refresh(cv)
+            return cv_row_to_dict(cv)
+
+    async def process(index: int, filename: str, file_path: str, content: bytes):
+        def on_field(name, value):
+            events.put_nowait(("field", {"index": index, "field": name, "value": value}))
+
+        try:
+            cv = CV(user_id=user_id, original_filename=filename, file_url=file_path)
+            try:
+                async with reservation.slot():
+                    parsed_data = await get_cv_parser().stream_cv(file_path, content, on_field)
+            except Exception as e:
+                record_parse_failure(cv, e)
+                set_render_model(cv)
+                logger.warning("Error processing CV %s: %s", filename, e)
+            else:
+                record_parse_success(cv, parsed_data)
+            saved = await run_in_threadpool(save, cv)
+            get_thumbnail_queue().submit(cv.id)
+            events.put_nowait(("cv", {"index": index, "cv": saved}))
+        except Exception as e:
+            logger.exception("Streamed upload of %s failed", filename)
+            events.put_nowait(("error", {"index": index, "detail": str(e)}))
+        finally:
+            queue_depth.dec()
+
+    for index, stored in enumerate(stored_files):
+        # Keeps parsing if the client disconnects
+        run_in_background(process(index, *stored), "upload.stream_cv")
+
+    async def event_stream():
+        yield sse_event("accepted", {"files": [
+            {"index": index, "filename": filename} for index, (filename, _, _) in enumerate(stored_files)
+        ]})
+        remaining = len(stored_files)
+        while remaining:
+            try:
+                event, data = await asyncio.wait_for(events.get(), SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+            if event in ("cv", "error"):
+                remaining -= 1
+            yield sse_event(event, data)
+        yield sse_event("done", {"count": len(stored_files)})
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+def _upload_session(db: Session, session_id: str, user_id: str) -> UploadSession:
+    session = db.query(UploadSession).filter(UploadSession.id == session_id, UploadSession.user_id == user_id).first()
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return session
+
+async def _upload_session_status(session: UploadSession) -> dict:
+    backend = get_blob_store().backend
+    received = set() if session.status == upload_sessions.COMPLETE else await run_in_threadpool(
+        upload_sessions.received_chunks, backend, session
+    )
+    missing = [] if session.status == upload_sessions.COMPLETE else upload_sessions.missing_offsets(session, received)
+    return {
+        "id": session.id,
+        "filename": session.filename,
+        "size": session.size,
+        "chunk_size": session.chunk_size,
+        "status": session.status,
+        "received_bytes": session.size - sum(min(session.chunk_size, session.size - offset) for offset in missing),
+        "missing_offsets": missing,
+        "cv_id": session.cv_id,
+        "expires_at": session.expires_at
+    }
+
+def _finalized_cv(db: Session, session: UploadSession) -> CV:
+    cv = db.query(CV).filter(CV.id == session.cv_id).first() if session.cv_id else None
+    if not cv:
+        raise HTTPException(status_code=410, detail="The CV created by this upload has been deleted")
+    return cv
+
+@router.post("/upload-sessions", response_model=UploadSessionSchema, status_code=201)
+async def create_upload_session(
+    body: UploadSessionCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Start a resumable upload. PUT the file's chunks (any order, in
+    parallel, again after a failure) and then finalize it into a CV."""
+    if body.size > settings.UPLOAD_SESSION_MAX_MB * 1024 * 1024:
+        raise HTTPException(status_code=413, detail=f"File is larger than {settings.UPLOAD_SESSION_MAX_MB} MB")
+    session = upload_sessions.create_session(db, current_user.id, body.filename, body.size, body.sha256)
+    db.commit()
+    return await _upload_session_status(session)
+
+@router.get("/upload-sessions/{session_id}", response_model=UploadSessionSchema)
+async def get_upload_session(
+    session_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Which chunks the server has; re-send the ones in missing_offsets."""
+    return await _upload_session_status(_upload_session(db, session_id, current_user.id))
+
+@router.put("/upload-sessions/{session_id}", response_model=UploadSessionSchema)
+async def put_upload_chunk(
+    session_id: str,
+    offset: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Store the chunk starting at byte ``offset`` (the raw request body).
+    Re-sending a chunk replaces it."""
+    session = _upload_session(db, session_id, current_user.id)
+    if session.status != upload_sessions.OPEN:
+        raise HTTPException(status_code=409, detail=f"Upload session is {session.status}")
+    if upload_sessions.is_expired(session):
+        raise HTTPException(status_code=410, detail="Upload session has expired")
+
+    chunks = []
+    length = 0
+    async for part in request.stream():
+        length += len(part)
+        if length > session.chunk_size:
+            raise HTTPException(status_code=413, detail=f"Chunks are at most {session.chunk_size} bytes")
+        chunks.append(part)
+    try:
+        index = upload_sessions.chunk_index(session, offset, length)
+    except upload_sessions.ChunkRejected as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    backend = get_blob_store().backend
+    with stage("upload_write"):
+        await run_in_threadpool(backend.put, upload_sessions.chunk_key(session.id, index), b"".join(chunks))
+    return await _upload_session_status(session)
+
+@router.post("/upload-sessions/{session_id}/finalize", response_model=CVSchema)
+async def finalize_upload_session(
+    session_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, max_length=255)
+):
+    """Assemble the chunks, store and parse the file and return its CV.
+
+    Finalizing twice returns the same CV, and so does finalizing another
+    session with an Idempotency-Key already used for a finalized upload, so
+    a client that lost the response (or restarted the whole upload) can
+    retry without creating a duplicate CV."""
+    session = _upload_session(db, session_id, current_user.id)
+    if idempotency_key:
+        previous = upload_sessions.find_by_idempotency_key(db, current_user.id, idempotency_key)
+        if previous is not None and previous.status == upload_sessions.COMPLETE:
+            return _finalized_cv(db, previous)
+    if session.status == upload_sessions.COMPLETE:
+        return _finalized_cv(db, session)
+    if upload_sessions.is_expired(session):
+        raise HTTPException(status_code=410, detail="Upload session has expired")
+
+    reservation = admit(get_scheduler("parse"), current_user.id)
+    owner = upload_sessions.claim(db, session, idempotency_key)
+    if owner is None:
+        reservation.release()
+        raise HTTPException(status_code=409, detail="This upload is already being finalized")
+
+    blob_store = get_blob_store()
+    backend = blob_store.backend
+    async with upload_sessions.keep_claimed(session.id, owner):
+        try:
+            with stage("upload_assemble"):
+                content = await run_in_threadpool(upload_sessions.assemble, backend, session)
+            file_path = await blob_store.save(db, content, session.filename)
+            # Commit the blob reference before parsing, as in /upload
+            db.commit()
+        except upload_sessions.SessionIncomplete as e:
+            reservation.release()
+            upload_sessions.release(db, session, owner)
+            raise HTTPException(status_code=409, detail={"message": str(e), "missing_offsets": e.missing})
+        except upload_sessions.ChecksumMismatch as e:
+            # No way to tell which chunk is corrupt: start the file over
+            reservation.release()
+            upload_sessions.release(db, session, owner)
+            await run_in_threadpool(upload_sessions.discard_chunks, backend, session.id)
+            raise HTTPException(status_code=422, detail=f"{e}; all chunks have been discarded")
+        except BaseException:
+            reservation.release()
+            upload_sessions.release(db, session, owner)
+            raise
+
+        cv = CV(user_id=current_user.id, original_filename=session.filename, file_url=file_path)
+        try:
+            async with reservation.slot():
+                parsed_data = await get_cv_parser().parse_cv(file_path, content)
+        except Exception as e:
+            record_parse_failure(cv, e)
+            set_render_model(cv)
+            logger.warning("Error processing CV %s: %s", session.filename, e)
+        else:
+            record_parse_success(cv, parsed_data)
+
+        try:
+            db.add(cv)
+            db.flush()
+            completed = upload_sessions.complete(db, session, owner, cv.id)
+            if completed:
+                with stage("db_commit"):
+                    db.commit()
+        except BaseException:
+            blob_store.release_committed(db, [file_path])
+            upload_sessions.release(db, session, owner)
+            raise
+    if not completed:
+        # Another finalize took the session over and its CV is the one kept
+        blob_store.release_committed(db, [file_path])
+        raise HTTPException(status_code=409, detail="This upload was finalized by another request")
+    db.refresh(cv)
+    await run_in_threadpool(upload_sessions.discard_chunks, backend, session.id)
+    get_thumbnail_queue().submit(cv.id)
+    return cv
+
+# Columns of the CV list response, read without building ORM objects
+CV_LIST_COLUMNS = (
+    CV.id, CV.user_id, CV.original_filename, CV.file_url, CV.status, CV.parsed_data,
+    CV.parse_error, CV.parse_retry_at, CV.skill_ids, CV.created_at
+)
+
+def cv_row_to_dict(row) -> dict:
+    """Shape a CV_LIST_COLUMNS row like the CV schema, without re-validating
+    parsed_data (it was validated when it was stored)."""
+    return {
+        "original_filename": row.original_filename,
+        "file_url": row.file_url,
+        "id": row.id,
+        "user_id": row.user_id,
+        "status": row.status,
+        "parsed_data": row.parsed_data,
+        "parse_error": row.parse_error,
+        "parse_retry_at": row.parse_retry_at,
+        "skill_ids": row.skill_ids,
+        "created_at": row.created_at
+    }
+
+def iter_user_cvs(user_id: str, skill_ids: frozenset = frozenset()):
+    # The request's session is closed before the body streams, so use our own
+    with SessionLocal() as db:
+        rows = db.execute(
+            select(*CV_LIST_COLUMNS)
+            .where(CV.user_id == user_id)
+            .execution_options(yield_per=500)
+        )
+        for row in rows:
+            if skill_ids and not skill_ids.issubset(row.skill_ids or ()):
+                continue
+            yield cv_row_to_dict(row)
+
 @router.get("/", response_model=List[CVSchema])
 async def get_cvs(
-    db: Session = Depends(get_db),
+    request: Request,
+    skill: List[str] = Query(default=[]),
+    current_user: User = Depends(get_current_user)
+):
+    """The user's CVs; each ``skill`` (an ID, name or alias from the skill
+    taxonomy, e.g. "JS") narrows them to CVs tagged with that skill."""
+    tagger = get_skill_tagger()
+    skill_ids = set()
+    for name in skill:
+        skill_id = tagger.resolve(name)
+        if skill_id is None:
+            raise HTTPException(status_code=400, detail=f"Unknown skill: {name}")
+        skill_ids.add(skill_id)
+    # Streamed and encoded with orjson; bypasses response_model validation
+    return JSONArrayStreamingResponse(
+        iter_user_cvs(current_user.id, frozenset(skill_ids)),
+        accept_encoding=request.headers.get("accept-encoding")
+    )
+
+@router.get("/export")
+async def export_cvs(
+    request: Request,
+    format: ExportFormat = ExportFormat.NDJSON,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    all_users: bool = False,
     current_user: User = Depends(get_current_user)
 ):
-    return db.query(CV).filter(CV.user_id == current_user.id).all()
+    """Stream the parsed data of the CVs created in (since, until] as flat
+    rows (see services/export.py). The X-Export-Until header is the
+    watermark to pass as ``since`` to the next incremental export.
+    ``all_users`` (admins only) exports every user's CVs."""
+    if all_users:
+        require_admin(current_user)
+    if format == ExportFormat.PARQUET and not parquet_available():
+        raise HTTPException(status_code=501, detail="Parquet export is not available")
+    since, until = export_window(since, until)
+    user_id = None if all_users else current_user.id
+
+    def rows():
+        # The request's session is closed before the body streams
+        with SessionLocal() as db:
+            yield from iter_export_rows(db, since, until, user_id)
+
+    headers = {
+        "X-Export-Until": until.isoformat(),
+        "Content-Disposition": f'attachment; filename="cvs-{until:%Y%m%dT%H%M%S}.{format.value}"',
+    }
+    encoding = None
+    if format != ExportFormat.PARQUET:
+        # Parquet pages are compressed already
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+        headers["Vary"] = "Accept-Encoding"
+        if encoding:
+            headers["Content-Encoding"] = encoding
+    return StreamingResponse(
+        compress_chunks(export_chunks(format, rows()), encoding),
+        media_type=MEDIA_TYPES[format],
+        headers=headers
+    )
 
 @router.get("/{cv_id}/parsed-data")
 async def get_cv_parsed_data(
@@ -99,6 +529,110 @@ async def get_cv_parsed_data(
     
     return cv.parsed_data
 
+@router.get("/{cv_id}/render-model")
+async def get_cv_render_model(
+    cv_id: str,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    cv = db.query(CV).filter(CV.id == cv_id, CV.user_id == current_user.id).first()
+    if not cv:
+        raise HTTPException(status_code=404, detail="CV not found")
+    
+    if upgrade_render_model(cv):
+        db.commit()
+    
+    # The render hash changes exactly when the model does
+    etag = f'"{cv.render_hash}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(
+        dumps({"version": cv.render_version, "hash": cv.render_hash, "data": cv.render_data}),
+        media_type="application/json",
+        headers=headers
+    )
+
+@router.get("/{cv_id}/thumbnail")
+async def get_cv_thumbnail(
+    cv_id: str,
+    db: Session = Depends(get_db),
+    user_id: str = Depends(get_link_user_id)
+):
+    """Redirect to the CV's first-page thumbnail in the default template.
+
+    Accepts ``?access_token=`` so it can be used as an <img> src. Returns 202
+    while a missing thumbnail is rendered, or 429 when the render queue is full.
+    """
+    inputs = load_render_inputs(db, cv_id)
+    if inputs is None or inputs[0].user_id != user_id:
+        raise HTTPException(status_code=404, detail="CV not found")
+    cv, template, organization = inputs
+    if upgrade_render_model(cv):
+        db.commit()
+    
+    blob_store = get_blob_store()
+    key = thumbnail_key(cv, template, organization)
+    if await run_in_threadpool(blob_store.backend.exists, key):
+        # The target is immutable; the redirect changes with the template
+        return RedirectResponse(f"/{blob_store.url(key)}", headers={"Cache-Control": "private, no-cache"})
+    
+    if not thumbnails_available():
+        raise HTTPException(status_code=503, detail="Thumbnails are not available")
+    if not get_thumbnail_queue().submit(cv.id):
+        raise HTTPException(status_code=429, detail="Too many thumbnails pending", headers={"Retry-After": "5"})
+    return JSONResponse({"status": "pending"}, status_code=202, headers={"Retry-After": "2"})
+
+def _bulk_ids(ids: List[str]) -> List[str]:
+    unique = list(dict.fromkeys(ids))
+    if len(unique) > settings.BULK_MAX_IDS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.BULK_MAX_IDS} CVs per request")
+    return unique
+
+def _bulk_result(ids: List[str], found: set, outcome: str) -> dict:
+    results = [{"id": cv_id, "outcome": outcome if cv_id in found else "not_found"} for cv_id in ids]
+    return {"succeeded": len(found), "not_found": len(ids) - len(found), "results": results}
+
+@router.patch("/bulk", response_model=BulkResult)
+async def bulk_update_cv_status(
+    body: BulkCVUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Set the status of many CVs in one UPDATE; IDs that aren't the
+    user's CVs are reported as not_found."""
+    ids = _bulk_ids(body.ids)
+    owned = (CV.id.in_(ids), CV.user_id == current_user.id)
+    with stage("db_bulk_update"):
+        db.execute(update(CV).where(*owned).values(status=body.status))
+        found = {cv_id for (cv_id,) in db.query(CV.id).filter(*owned)}
+        db.commit()
+    return _bulk_result(ids, found, "updated")
+
+@router.post("/bulk/delete", response_model=BulkResult)
+async def bulk_delete_cvs(
+    body: BulkCVIds,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Delete many CVs in one DELETE. Their files' references are dropped
+    in the same transaction; unreferenced files are removed in the
+    background after the response."""
+    ids = _bulk_ids(body.ids)
+    blob_store = get_blob_store()
+    keys = []
+    with stage("db_bulk_delete"):
+        rows = db.query(CV.id, CV.file_url).filter(CV.id.in_(ids), CV.user_id == current_user.id).all()
+        found = {row.id for row in rows}
+        if found:
+            db.execute(delete(CV).where(CV.id.in_(found), CV.user_id == current_user.id))
+            keys = blob_store.release_many(db, [row.file_url for row in rows])
+        db.commit()
+    if keys:
+        run_in_background(run_in_threadpool(blob_store.delete_keys, keys), "blob_store.delete_keys")
+    return _bulk_result(ids, found, "deleted")
+
 @router.patch("/{cv_id}", response_model=CVSchema)
 async def update_cv_status(
     cv_id: str,
@@ -125,9 +659,9 @@ async def delete_cv(
     if not cv:
         raise HTTPException(status_code=404, detail="CV not found")
     
-    # Delete the file
-    if cv.file_url:
-        await delete_file(cv.file_url)
+    # Drop this CV's reference to the file; it is removed after the commit
+    # once no other CV shares it
+    await get_blob_store().release(db, cv.file_url)
     
     # Delete from database
     db.delete(cv)
@@ -135,17 +669,12 @@ async def delete_cv(
     
     return {"success": True}
 
-@router.post("/{cv_id}/generate", response_class=FileResponse)
-async def generate_cv(
-    cv_id: str,
-    template_id: str | None = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
+def get_render_inputs(db: Session, user_id: str, cv_id: str, template_id: str | None):
+    """Load the CV, organization and template (given or default) to render."""
     # Get the CV
     cv = db.query(CV).filter(
         CV.id == cv_id,
-        CV.user_id == current_user.id
+        CV.user_id == user_id
     ).first()
     
     if not cv:
@@ -153,7 +682,7 @@ async def generate_cv(
     
     # Get the organization settings
     organization = db.query(Organization).filter(
-        Organization.user_id == current_user.id
+        Organization.user_id == user_id
     ).first()
     
     if not organization:
@@ -163,24 +692,106 @@ async def generate_cv(
     if template_id:
         template = db.query(Template).filter(
             Template.id == template_id,
-            Template.user_id == current_user.id
+            Template.user_id == user_id
         ).first()
     else:
         template = db.query(Template).filter(
-            Template.user_id == current_user.id,
+            Template.user_id == user_id,
             Template.is_default == True
         ).first()
     
     if not template:
         raise HTTPException(status_code=404, detail="Template not found")
     
+    # Rows parsed before the current normalizer get their model rebuilt once
+    if upgrade_render_model(cv):
+        db.commit()
+    
+    return cv, organization, template
+
+# Previews are served from our origin, so lock them down to inline styles and
+# our own images
+PREVIEW_HEADERS = {
+    "Content-Security-Policy": "default-src 'none'; style-src 'unsafe-inline'; img-src 'self' data:",
+    "Cache-Control": "private, no-store"
+}
+
+@router.get("/{cv_id}/preview", response_class=HTMLResponse)
+@router.post("/{cv_id}/preview", response_class=HTMLResponse)
+async def preview_cv(
+    cv_id: str,
+    template_id: str | None = None,
+    preview: PreviewRequest | None = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """HTML rendering of the CV for live editing, without WeasyPrint.
+
+    POST a PreviewRequest to preview unsaved layout, section or branding edits.
+    """
+    cv, organization, template = get_render_inputs(db, current_user.id, cv_id, template_id)
+    preview = preview or PreviewRequest()
+    generator = get_cv_generator()
+
+    branding = generator.branding(organization)
+    branding.update(preview.model_dump(include={"primary_color", "secondary_color", "font"}, exclude_none=True))
+    sections = [section.model_dump() for section in preview.sections] if preview.sections is not None else template.sections
+    # Blob URLs are public and cacheable, so the browser loads the logo itself
+    logo_src = f"/{organization.logo_url}" if get_blob_store().key_for(organization.logo_url) else None
+
+    with stage("html_render"):
+        context = generator.build_context(cv.render_data, sections, branding, logo_src)
+        try:
+            html_content = generator.render_html(
+                preview.layout or template.layout, context, inline_css=generator.branding_css(branding)
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return HTMLResponse(html_content, headers=PREVIEW_HEADERS)
+
+@router.post("/{cv_id}/preview/section", response_class=HTMLResponse)
+async def preview_cv_section(
+    cv_id: str,
+    section_preview: SectionPreviewRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Re-render a single section; replaces the element with the same
+    data-section-id in the preview."""
+    cv = db.query(CV).filter(CV.id == cv_id, CV.user_id == current_user.id).first()
+    if not cv:
+        raise HTTPException(status_code=404, detail="CV not found")
+    
+    if upgrade_render_model(cv):
+        db.commit()
+    
+    with stage("html_render"):
+        fragment = get_cv_generator().render_section(section_preview.section.model_dump(), cv.render_data)
+    return HTMLResponse(fragment, headers=PREVIEW_HEADERS)
+
+@router.post("/{cv_id}/generate", response_class=FileResponse)
+async def generate_cv(
+    cv_id: str,
+    template_id: str | None = None,
+    profile: PDFProfile | None = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Render the CV to PDF. ``profile`` trades size for fidelity: "screen"
+    for the smallest download, "print" or "archive" (PDF/A)."""
+    cv, organization, template = get_render_inputs(db, current_user.id, cv_id, template_id)
+    profile = profile or PDFProfile(settings.PDF_DEFAULT_PROFILE)
+    reservation = admit(get_scheduler("render"), current_user.id)
+    
     # Generate PDF filename
     pdf_filename = f"{uuid4()}.pdf"
-    output_path = os.path.join("uploads", "generated", pdf_filename)
+    output_path = generated_path(current_user.id, pdf_filename)
     
     try:
         # Generate the PDF
-        await cv_generator.generate_pdf(cv, template, organization, output_path)
+        async with reservation.slot():
+            with tracer.span("cv_generator.generate_pdf", cv_id=cv.id, layout=template.layout, profile=profile.value):
+                await get_cv_generator().generate_pdf(cv, template, organization, output_path, profile)
         
         # Return the generated PDF
         return FileResponse(
@@ -1,44 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from ..database import get_db
 from ..models import Organization, User
 from ..schemas import OrganizationCreate, Organization as OrganizationSchema
-from ..dependencies import get_current_user
-import aiofiles
-import os
-from uuid import uuid4
+from ..dependencies import get_current_user, get_current_user_id
+from ..caching import bump_version, cached_json
+from ..services.thumbnails import get_thumbnail_queue
+from ..metrics import stage
+from ..services.images import normalize_logo
+from ..services.storage import get_blob_store
 
 router = APIRouter()
 
-UPLOAD_DIR = "uploads/organization"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-
-async def save_upload_file(file: UploadFile, subfolder: str) -> str:
-    file_extension = os.path.splitext(file.filename)[1]
-    file_name = f"{uuid4()}{file_extension}"
-    folder_path = os.path.join(UPLOAD_DIR, subfolder)
-    os.makedirs(folder_path, exist_ok=True)
-    file_path = os.path.join(folder_path, file_name)
-    
-    async with aiofiles.open(file_path, 'wb') as out_file:
-        content = await file.read()
-        await out_file.write(content)
-    
-    return file_path
-
-async def delete_file(file_path: str):
-    if os.path.exists(file_path):
-        os.remove(file_path)
-
 @router.get("/", response_model=OrganizationSchema)
 async def get_organization(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    request: Request,
+    user_id: str = Depends(get_current_user_id)
 ):
-    org = db.query(Organization).filter(Organization.user_id == current_user.id).first()
-    if not org:
-        raise HTTPException(status_code=404, detail="Organization not found")
-    return org
+    def load(db: Session):
+        org = db.query(Organization).filter(Organization.user_id == user_id).first()
+        if not org:
+            raise HTTPException(status_code=404, detail="Organization not found")
+        return OrganizationSchema.model_validate(org).model_dump(mode="json")
+
+    # Served from memory (or as 304) until the organization changes
+    return await cached_json(request, user_id, "organization", "organization", load)
 
 @router.patch("/", response_model=OrganizationSchema)
 async def update_organization(
@@ -53,7 +40,9 @@ async def update_organization(
     for key, value in org_update.model_dump(exclude_unset=True).items():
         setattr(org, key, value)
     
+    bump_version(db, current_user.id, "organization")
     db.commit()
+    get_thumbnail_queue().submit_user(current_user.id)
     db.refresh(org)
     return org
 
@@ -67,13 +56,31 @@ async def upload_logo(
     if not org:
         raise HTTPException(status_code=404, detail="Organization not found")
     
-    # Delete old logo if exists
-    if org.logo_url and os.path.exists(org.logo_url):
-        await delete_file(org.logo_url)
-    
-    file_path = await save_upload_file(file, "logos")
+    blob_store = get_blob_store()
+    content = await file.read()
+
+    # Render from a copy downscaled to print size; keep the upload as the original
+    with stage("logo_normalize"):
+        normalized = await run_in_threadpool(normalize_logo, content)
+    # Write the files before referencing them, so no blob row is locked
+    # across an await
+    original_key = await blob_store.store(content, file.filename)
+    if normalized:
+        normalized_content, extension = normalized
+        key = await blob_store.store(normalized_content, f"logo{extension}")
+        file_path = blob_store.add_reference(db, key, len(normalized_content))
+        original_path = blob_store.add_reference(db, original_key, len(content))
+    else:
+        file_path, original_path = blob_store.add_reference(db, original_key, len(content)), None
+
+    # Release old logo if exists
+    await blob_store.release(db, org.logo_url)
+    await blob_store.release(db, org.logo_original_url)
     org.logo_url = file_path
+    org.logo_original_url = original_path
+    bump_version(db, current_user.id, "organization")
     db.commit()
+    get_thumbnail_queue().submit_user(current_user.id)
     db.refresh(org)
     return org
 
@@ -87,9 +94,13 @@ async def delete_logo(
         raise HTTPException(status_code=404, detail="Organization not found")
     
     if org.logo_url:
-        await delete_file(org.logo_url)
+        await get_blob_store().release(db, org.logo_url)
+        await get_blob_store().release(db, org.logo_original_url)
         org.logo_url = None
+        org.logo_original_url = None
+        bump_version(db, current_user.id, "organization")
         db.commit()
+        get_thumbnail_queue().submit_user(current_user.id)
         db.refresh(org)
     
     return org
@@ -104,12 +115,13 @@ async def upload_template(
     if not org:
         raise HTTPException(status_code=404, detail="Organization not found")
     
-    # Delete old template if exists
-    if org.cv_template_url and os.path.exists(org.cv_template_url):
-        await delete_file(org.cv_template_url)
-    
-    file_path = await save_upload_file(file, "templates")
+    blob_store = get_blob_store()
+    file_path, _ = await blob_store.save_upload(db, file)
+
+    # Release old template if exists
+    await blob_store.release(db, org.cv_template_url)
     org.cv_template_url = file_path
+    bump_version(db, current_user.id, "organization")
     db.commit()
     db.refresh(org)
     return org
@@ -124,8 +136,9 @@ async def delete_template(
         raise HTTPException(status_code=404, detail="Organization not found")
     
     if org.cv_template_url:
-        await delete_file(org.cv_template_url)
+        await get_blob_store().release(db, org.cv_template_url)
         org.cv_template_url = None
+        bump_version(db, current_user.id, "organization")
         db.commit()
         db.refresh(org)
     
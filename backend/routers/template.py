@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from typing import List
 from ..database import get_db
 from ..models import Template, User
 from ..schemas import Template as TemplateSchema, TemplateCreate
-from ..dependencies import get_current_user
+from ..dependencies import get_current_user, get_current_user_id
+from ..caching import bump_version, cached_json
+from ..services.thumbnails import get_thumbnail_queue
 
 router = APIRouter()
 
@@ -27,32 +29,42 @@ async def create_template(
         is_default=template.is_default
     )
     db.add(db_template)
+    bump_version(db, current_user.id, "templates")
     db.commit()
+    get_thumbnail_queue().submit_user(current_user.id)
     db.refresh(db_template)
     return db_template
 
 @router.get("/", response_model=List[TemplateSchema])
 async def get_templates(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    request: Request,
+    user_id: str = Depends(get_current_user_id)
 ):
-    return db.query(Template).filter(Template.user_id == current_user.id).all()
+    def load(db: Session):
+        templates = db.query(Template).filter(Template.user_id == user_id).all()
+        return [TemplateSchema.model_validate(template).model_dump(mode="json") for template in templates]
+
+    # Served from memory (or as 304) until any of the user's templates change
+    return await cached_json(request, user_id, "templates", "list", load)
 
 @router.get("/{template_id}", response_model=TemplateSchema)
 async def get_template(
     template_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    request: Request,
+    user_id: str = Depends(get_current_user_id)
 ):
-    template = db.query(Template).filter(
-        Template.id == template_id,
-        Template.user_id == current_user.id
-    ).first()
-    
-    if not template:
-        raise HTTPException(status_code=404, detail="Template not found")
-    
-    return template
+    def load(db: Session):
+        template = db.query(Template).filter(
+            Template.id == template_id,
+            Template.user_id == user_id
+        ).first()
+        
+        if not template:
+            raise HTTPException(status_code=404, detail="Template not found")
+        
+        return TemplateSchema.model_validate(template).model_dump(mode="json")
+
+    return await cached_json(request, user_id, "templates", template_id, load)
 
 @router.patch("/{template_id}/set-default", response_model=TemplateSchema)
 async def set_default_template(
@@ -73,7 +85,9 @@ async def set_default_template(
     
     # Set this template as default
     template.is_default = True
+    bump_version(db, current_user.id, "templates")
     db.commit()
+    get_thumbnail_queue().submit_user(current_user.id)
     db.refresh(template)
     
     return template
@@ -93,6 +107,8 @@ async def delete_template(
         raise HTTPException(status_code=404, detail="Template not found")
     
     db.delete(template)
+    bump_version(db, current_user.id, "templates")
     db.commit()
+    get_thumbnail_queue().submit_user(current_user.id)
     
     return {"success": True}
\ No newline at end of file
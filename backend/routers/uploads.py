@@ -0,0 +1,130 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, Response
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, Optional
+import hashlib
+import mimetypes
+import os
+import re
+from ..caching import not_modified
+from ..config import settings
+from ..dependencies import get_link_user_id
+from ..services.storage import BLOB_PREFIX, get_blob_store
+from ..services.thumbnails import THUMBNAIL_PREFIX
+
+router = APIRouter()
+
+PRIVATE_IMMUTABLE = "private, max-age=31536000, immutable"
+# Pre-blob uploads: cacheable, but revalidated against the ETag on each use
+REVALIDATE = "public, no-cache"
+
+GENERATED_PREFIX = "generated/"
+_BLOB_NAME = re.compile(r"^([0-9a-f]{64})(\.[A-Za-z0-9]+)?$")
+
+
+def _etag(key: str, stat_result: Optional[os.stat_result]) -> str:
+    # Blob names are the SHA-256 of their content, so they are the ideal
+    # strong validator; other files are never rewritten in place
+    match = _BLOB_NAME.match(key.rsplit("/", 1)[-1]) if key.startswith(BLOB_PREFIX) else None
+    if match:
+        return f'"{match.group(1)}"'
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+class PathSendResponse(Response):
+    """Hands the file to the ASGI server (``http.response.pathsend``) so it
+    can be sent with sendfile(2) instead of being read through Python."""
+
+    def __init__(self, path: str, headers: Dict[str, str], media_type: str):
+        super().__init__(headers=headers, media_type=media_type)
+        self.path = path
+        self.headers["content-length"] = str(os.path.getsize(path))
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        await send({"type": "http.response.pathsend", "path": self.path})
+
+
+async def _user_scoped(request: Request, key: str):
+    """Generated files live under generated/<user id>/ and are private."""
+    user_id = await get_link_user_id(request)
+    owner = key[len(GENERATED_PREFIX):].split("/", 1)[0]
+    if owner != user_id:
+        raise HTTPException(status_code=404, detail="File not found")
+
+
+@router.api_route("/{path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+async def serve_upload(path: str, request: Request):
+    key = path.lstrip("/")
+    if not key or any(part in ("", ".", "..") or part.startswith(".") for part in key.split("/")):
+        raise HTTPException(status_code=404, detail="File not found")
+
+    if key.startswith(GENERATED_PREFIX):
+        await _user_scoped(request, key)
+        cache_control = PRIVATE_IMMUTABLE
+        # Generated PDFs stay on the node even with a remote blob backend
+        path_on_disk = os.path.join(settings.UPLOAD_DIR, *key.split("/"))
+    else:
+        # A blob's content hash doubles as an unguessable capability, as does
+        # the CV ID and style hash in a thumbnail's key; both are CV content,
+        # so only the browser may cache them, never a shared cache
+        if key.startswith(BLOB_PREFIX) or key.startswith(THUMBNAIL_PREFIX):
+            cache_control = PRIVATE_IMMUTABLE
+        else:
+            cache_control = REVALIDATE
+        path_on_disk = get_blob_store().backend.local_path(key)
+
+    media_type = mimetypes.guess_type(key)[0] or "application/octet-stream"
+    if path_on_disk is None:
+        return await _serve_remote(request, key, cache_control, media_type)
+
+    try:
+        stat_result = await run_in_threadpool(os.stat, path_on_disk)
+    except (FileNotFoundError, NotADirectoryError):
+        raise HTTPException(status_code=404, detail="File not found")
+    if not os.path.isfile(path_on_disk):
+        raise HTTPException(status_code=404, detail="File not found")
+
+    etag = _etag(key, stat_result)
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Accept-Ranges": "bytes"}
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    if settings.UPLOADS_OFFLOAD_HEADER:
+        # Let the reverse proxy send the file (and handle Range) via sendfile
+        target = (
+            settings.UPLOADS_OFFLOAD_PREFIX.rstrip("/") + "/" + key
+            if settings.UPLOADS_OFFLOAD_HEADER.lower() == "x-accel-redirect"
+            else os.path.abspath(path_on_disk)
+        )
+        headers[settings.UPLOADS_OFFLOAD_HEADER] = target
+        return Response(headers=headers, media_type=media_type)
+
+    pathsend = "http.response.pathsend" in request.scope.get("extensions", {})
+    if pathsend and request.method == "GET" and "range" not in request.headers:
+        return PathSendResponse(path_on_disk, headers, media_type)
+
+    # FileResponse handles HEAD, Range/If-Range and multipart byte ranges
+    return FileResponse(
+        path_on_disk,
+        headers=headers,
+        media_type=media_type,
+        stat_result=stat_result
+    )
+
+
+async def _serve_remote(request: Request, key: str, cache_control: str, media_type: str) -> Response:
+    # Blob names carry their hash, so revalidation needs no backend call
+    is_blob = key.startswith(BLOB_PREFIX) and _BLOB_NAME.match(key.rsplit("/", 1)[-1])
+    etag = _etag(key, None) if is_blob else None
+    if etag and not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+    try:
+        content = await run_in_threadpool(get_blob_store().backend.get, key)
+    except Exception:
+        raise HTTPException(status_code=404, detail="File not found")
+    etag = etag or f'"{hashlib.sha256(content).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content, headers=headers, media_type=media_type)
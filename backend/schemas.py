@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr, HttpUrl
+from pydantic import BaseModel, EmailStr, Field, HttpUrl
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from .models import CVStatus
@@ -38,6 +38,7 @@ class OrganizationCreate(OrganizationBase):
 class Organization(OrganizationBase):
     id: str
     user_id: str
+    logo_original_url: Optional[str] = None
     created_at: datetime
 
     class Config:
@@ -53,11 +54,29 @@ class CVCreate(CVBase):
 class CVUpdate(BaseModel):
     status: CVStatus
 
+class BulkCVIds(BaseModel):
+    ids: List[str] = Field(..., min_length=1)
+
+class BulkCVUpdate(BulkCVIds):
+    status: CVStatus
+
+class BulkOutcome(BaseModel):
+    id: str
+    outcome: str  # updated, deleted or not_found
+
+class BulkResult(BaseModel):
+    succeeded: int
+    not_found: int
+    results: List[BulkOutcome]
+
 class CV(CVBase):
     id: str
     user_id: str
     status: CVStatus
     parsed_data: Optional[Dict[str, Any]] = None
+    parse_error: Optional[str] = None
+    parse_retry_at: Optional[datetime] = None
+    skill_ids: Optional[List[str]] = None
     created_at: datetime
 
     class Config:
@@ -66,6 +85,60 @@ class CV(CVBase):
 class BulkCVUpload(BaseModel):
     files: List[CVCreate]
 
+class ImportEntry(BaseModel):
+    name: str
+    status: str  # imported, duplicate, skipped, rejected or failed
+    cv_id: Optional[str] = None
+    detail: Optional[str] = None
+
+class ImportResult(BaseModel):
+    imported: int
+    duplicates: int
+    skipped: int
+    rejected: int
+    failed: int
+    entries: List[ImportEntry]
+
+class UploadSessionCreate(BaseModel):
+    filename: str = Field(..., min_length=1, max_length=255)
+    size: int = Field(..., gt=0)
+    sha256: Optional[str] = Field(None, pattern="^[0-9a-fA-F]{64}$")
+
+class UploadSession(BaseModel):
+    id: str
+    filename: str
+    size: int
+    chunk_size: int
+    status: str  # open, finalizing or complete
+    received_bytes: int
+    missing_offsets: List[int]
+    cv_id: Optional[str] = None
+    expires_at: datetime
+
+class ReparseJobCreate(BaseModel):
+    missing: bool = False  # CVs without parsed data
+    stale: bool = False  # CVs parsed with another prompt/schema version
+    user_id: Optional[str] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+
+class ReparseJob(BaseModel):
+    id: str
+    created_by: str
+    filters: Dict[str, Any]
+    parse_version: str
+    status: str  # pending, running, completed, cancelled or failed
+    total: int
+    processed: int
+    succeeded: int
+    failed: int
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
 class TemplateSection(BaseModel):
     id: str
     type: str
@@ -87,4 +160,15 @@ class Template(TemplateBase):
     created_at: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class PreviewRequest(BaseModel):
+    # Unsaved edits layered over the saved template and organization branding
+    layout: Optional[str] = None
+    sections: Optional[List[TemplateSection]] = None
+    primary_color: Optional[str] = None
+    secondary_color: Optional[str] = None
+    font: Optional[str] = None
+
+class SectionPreviewRequest(BaseModel):
+    section: TemplateSection
@@ -0,0 +1,118 @@
+import json
+import zlib
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Iterable, Iterator, Optional
+from fastapi.responses import StreamingResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+# Items are joined into chunks of about this size before being compressed/sent
+CHUNK_SIZE = 64 * 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def _default(value: Any):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value: Any) -> bytes:
+    """Serialize to compact JSON bytes, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_UTC_Z)
+    return json.dumps(value, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def sse_event(event: str, data: Any) -> bytes:
+    """One Server-Sent Events message with a JSON payload."""
+    return b"event: " + event.encode("utf-8") + b"\ndata: " + dumps(data) + b"\n\n"
+
+
+def iter_json_array(items: Iterable[Any], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Encode ``items`` as one JSON array, yielding it in chunks as it goes."""
+    buffer = bytearray(b"[")
+    first = True
+    for item in items:
+        if not first:
+            buffer += b","
+        first = False
+        buffer += dumps(item)
+        if len(buffer) >= chunk_size:
+            yield bytes(buffer)
+            buffer.clear()
+    buffer += b"]"
+    yield bytes(buffer)
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick "br", "gzip" or None (identity) from an Accept-Encoding header."""
+    offered = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if coding:
+            offered[coding.strip().lower()] = quality
+
+    wildcard = offered.get("*", 0.0)
+    available = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best = max(available, key=lambda coding: offered.get(coding, wildcard))
+    return best if offered.get(best, wildcard) > 0 else None
+
+
+def compress_chunks(chunks: Iterable[bytes], encoding: Optional[str]) -> Iterator[bytes]:
+    """Stream-compress ``chunks`` with the given content coding."""
+    if encoding is None:
+        yield from chunks
+        return
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        compress, flush = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+        compress, flush = compressor.compress, compressor.flush
+    for chunk in chunks:
+        data = compress(chunk)
+        if data:
+            yield data
+    yield flush()
+
+
+class JSONArrayStreamingResponse(StreamingResponse):
+    """Streams an iterable as a JSON array, compressed per Accept-Encoding.
+
+    Items are serialized as-is: callers pass plain dicts built from trusted
+    stored data instead of going through response model validation. A sync
+    iterable is consumed in the threadpool, so it may do blocking I/O.
+    """
+
+    def __init__(self, items: Iterable[Any], accept_encoding: Optional[str] = None, **kwargs):
+        encoding = negotiate_encoding(accept_encoding)
+        headers = dict(kwargs.pop("headers", None) or {})
+        headers["Vary"] = "Accept-Encoding"
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        super().__init__(
+            compress_chunks(iter_json_array(items), encoding),
+            media_type="application/json",
+            headers=headers,
+            **kwargs
+        )
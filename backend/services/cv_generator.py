@@ -1,99 +1,99 @@
-from weasyprint import HTML, CSS
-from jinja2 import Environment, FileSystemLoader
+from functools import lru_cache
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from markupsafe import Markup
+from starlette.concurrency import run_in_threadpool
+import base64
+import enum
+import mimetypes
 import os
-from typing import Dict, Any
+import re
+from typing import Dict, Any, List, Tuple
 from ..models import CV, Organization, Template
 from ..config import settings
+from ..metrics import PDF_OUTPUT_BYTES, stage
+from .render_model import build_render_model
+from .storage import get_blob_store
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "templates")
+LAYOUTS = ("1-column", "2-column")
+
+DEFAULT_PRIMARY_COLOR = "#2563eb"
+DEFAULT_SECONDARY_COLOR = "#1e40af"
+DEFAULT_FONT = "Inter"
+
+class PDFProfile(str, enum.Enum):
+    SCREEN = "screen"
+    PRINT = "print"
+    ARCHIVE = "archive"
+
+
+def _strip_metadata(document, pdf):
+    """WeasyPrint finisher dropping the document info (title, author,
+    dates, producer) from the PDF."""
+    pdf.info.clear()
+
+
+# WeasyPrint write_pdf options per profile. Identical images are embedded
+# once per document in every profile.
+PDF_PROFILE_OPTIONS: Dict[PDFProfile, Dict[str, Any]] = {
+    # Smallest download: images resampled to 150 DPI and recompressed, fonts
+    # subset without hinting, no document info
+    PDFProfile.SCREEN: {
+        "optimize_images": True, "jpeg_quality": 70, "dpi": 150, "finisher": _strip_metadata,
+    },
+    # Sharp on paper: 300 DPI, near-lossless JPEGs, subset fonts keeping
+    # their hinting for low-resolution printers
+    PDFProfile.PRINT: {"optimize_images": True, "jpeg_quality": 90, "dpi": 300, "hinting": True},
+    # Long-term storage: PDF/A-3b with XMP and custom metadata, complete
+    # font files so the text can still be edited, images left untouched
+    PDFProfile.ARCHIVE: {"pdf_variant": "pdf/a-3b", "custom_metadata": True, "full_fonts": True, "hinting": True},
+}
+
+_COLOR = re.compile(r"^#(?:[0-9a-fA-F]{3,4}|[0-9a-fA-F]{6}|[0-9a-fA-F]{8})$")
+_FONT_UNSAFE = re.compile(r"[^\w\s-]")
+
+def _color(value: str | None, default: str) -> str:
+    return value if value and _COLOR.match(value) else default
 
 class CVGenerator:
     def __init__(self):
+        # CV text comes from uploaded documents, so escape it
         self.env = Environment(
-            loader=FileSystemLoader("backend/templates")
+            loader=FileSystemLoader(TEMPLATES_DIR),
+            autoescape=select_autoescape(["html"])
         )
 
-        # Ensure output directory exists
-        os.makedirs("uploads/generated", exist_ok=True)
-
-    def get_local_path(self, url_path: str | None) -> str | None:
-        """Convert URL path to local file path."""
-        if not url_path:
+    async def get_logo_src(self, logo_url: str | None) -> str | None:
+        """Resolve a stored logo to a URL WeasyPrint can load."""
+        blob_store = get_blob_store()
+        if not blob_store.key_for(logo_url):
             return None
-        if url_path.startswith(('http://', 'https://')):
-            return None
-        # Remove leading slash if present
-        if url_path.startswith('/'):
-            url_path = url_path[1:]
-        # Get absolute path
-        return os.path.abspath(url_path)
+        local_path = blob_store.local_path(logo_url)
+        if local_path:
+            return f"file://{local_path}" if os.path.exists(local_path) else None
+        # Remote storage: inline the image
+        content = await blob_store.read(logo_url)
+        mime_type = mimetypes.guess_type(logo_url)[0] or "application/octet-stream"
+        return f"data:{mime_type};base64,{base64.b64encode(content).decode('ascii')}"
 
-    async def generate_pdf(
-            self,
-            cv: CV,
-            template: Template,
-            organization: Organization,
-            output_path: str
-    ) -> str:
-        # Load the appropriate template based on layout
-        template_name = f"{template.layout}.html"
-        jinja_template = self.env.get_template(template_name)
-
-        # Ensure cv_data has all required fields with defaults
-        cv_data = cv.parsed_data or {}
-
-        # Set default values for all required fields
-        cv_data = {
-            'personal_info': {
-                'name': cv_data.get('personal_info', {}).get('name', 'No Name'),
-                'email': cv_data.get('personal_info', {}).get('email', ''),
-                'phone': cv_data.get('personal_info', {}).get('phone', ''),
-                'location': cv_data.get('personal_info', {}).get('location', '')
-            },
-            'summary': cv_data.get('summary', ''),
-            'work_experience': [
-                                   {
-                                       'company': exp.get('company', ''),
-                                       'position': exp.get('position', ''),
-                                       'dates': exp.get('dates', ''),
-                                       'responsibilities': exp.get('responsibilities', [])
-                                   }
-                                   for exp in cv_data.get('work_experience', [])
-                               ] or [],
-            'education': [
-                             {
-                                 'institution': edu.get('institution', ''),
-                                 'degree': edu.get('degree', ''),
-                                 'dates': edu.get('dates', '')
-                             }
-                             for edu in cv_data.get('education', [])
-                         ] or [],
-            'skills': cv_data.get('skills', []),
-            'certifications': cv_data.get('certifications', [])
-        }
-
-        # Get local path for logo
-        logo_path = self.get_local_path(organization.logo_url)
-
-        # Prepare the context for the template
-        context = {
-            "cv_data": cv_data,
-            "organization": {
-                "logo_url": f"file://{logo_path}" if logo_path else None,
-                "primary_color": organization.primary_color,
-                "secondary_color": organization.secondary_color,
-                "font": organization.font
-            },
-            "sections": template.sections
+    def branding(self, organization: Organization) -> Dict[str, Any]:
+        return {
+            "primary_color": organization.primary_color,
+            "secondary_color": organization.secondary_color,
+            "font": organization.font
         }
 
-        # Render the HTML
-        html_content = jinja_template.render(**context)
-
-        # Create CSS with dynamic values
-        css = CSS(string=f"""
+    def branding_css(self, branding: Dict[str, Any]) -> str:
+        """Page and branding CSS; values are sanitized since they end up
+        inside a <style> element in previews."""
+        primary_color = _color(branding.get("primary_color"), DEFAULT_PRIMARY_COLOR)
+        secondary_color = _color(branding.get("secondary_color"), DEFAULT_SECONDARY_COLOR)
+        font = _FONT_UNSAFE.sub("", branding.get("font") or "").strip() or DEFAULT_FONT
+        return f"""
             :root {{
-                --primary-color: {organization.primary_color};
-                --secondary-color: {organization.secondary_color};
-                --font-family: {organization.font}, system-ui, sans-serif;
+                --primary-color: {primary_color};
+                --secondary-color: {secondary_color};
+                --font-family: {font}, system-ui, sans-serif;
             }}
             
             @page {{
@@ -114,12 +114,88 @@ class CVGenerator:
                 margin: 0;
                 box-sizing: border-box;
             }}
-        """)
+        """
 
-        # Generate PDF
-        HTML(string=html_content).write_pdf(
-            output_path,
-            stylesheets=[css]
-        )
+    def build_context(
+            self,
+            cv_data: Dict[str, Any],
+            sections: List[Dict[str, Any]],
+            branding: Dict[str, Any],
+            logo_src: str | None
+    ) -> Dict[str, Any]:
+        return {
+            "cv_data": cv_data,
+            "organization": {"logo_url": logo_src, **branding},
+            "sections": sections
+        }
+
+    def render_html(self, layout: str, context: Dict[str, Any], inline_css: str | None = None) -> str:
+        """Render a layout to HTML; ``inline_css`` is embedded in a <style>."""
+        if layout not in LAYOUTS:
+            raise ValueError(f"Unknown layout: {layout}")
+        jinja_template = self.env.get_template(f"{layout}.html")
+        branding_css = Markup(inline_css) if inline_css else None
+        return jinja_template.render(**context, branding_css=branding_css)
+
+    def render_section(self, section: Dict[str, Any], cv_data: Dict[str, Any]) -> str:
+        """Render one section as the fragment the full layouts contain."""
+        return str(self.env.get_template("_sections.html").module.section(section, cv_data))
+
+    async def prepare_html(
+            self,
+            cv: CV,
+            template: Template,
+            organization: Organization
+    ) -> Tuple[str, str]:
+        """Return the rendered HTML and the branding CSS for WeasyPrint."""
+        # Normalized once at parse time (see render_model.py)
+        cv_data = cv.render_data or build_render_model(cv.parsed_data)
+
+        # Resolve the logo from storage
+        logo_src = await self.get_logo_src(organization.logo_url)
+
+        # Render the HTML
+        branding = self.branding(organization)
+        context = self.build_context(cv_data, template.sections, branding, logo_src)
+        return self.render_html(template.layout, context), self.branding_css(branding)
+
+    async def generate_pdf(
+            self,
+            cv: CV,
+            template: Template,
+            organization: Organization,
+            output_path: str,
+            profile: PDFProfile = PDFProfile.PRINT
+    ) -> str:
+        html_content, css = await self.prepare_html(cv, template, organization)
+
+        # WeasyPrint is slow to import, so defer it to the first render
+        from weasyprint import HTML, CSS
+
+        def write_pdf():
+            HTML(string=html_content).write_pdf(
+                output_path,
+                stylesheets=[CSS(string=css)],
+                **PDF_PROFILE_OPTIONS[profile]
+            )
+
+        # Generate PDF off the event loop; concurrency is capped by the render scheduler
+        with stage("pdf_render"):
+            await run_in_threadpool(write_pdf)
+        PDF_OUTPUT_BYTES.labels(profile.value).observe(os.path.getsize(output_path))
 
         return output_path
+
+    def render_first_page(self, html_content: str, css: str) -> bytes:
+        """Lay out the document and return a PDF of its first page only.
+
+        Blocking; run it in the threadpool.
+        """
+        from weasyprint import HTML, CSS
+
+        document = HTML(string=html_content).render(stylesheets=[CSS(string=css)])
+        return document.copy(document.pages[:1]).write_pdf()
+
+@lru_cache(maxsize=None)
+def get_cv_generator() -> CVGenerator:
+    return CVGenerator()
@@ -1,25 +1,30 @@
+import hashlib
+import io
+import json
+import logging
 import os
-from typing import Dict, Any
-import PyPDF2
-from docx import Document
-from langchain_openai import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate
-from langchain.output_parsers import ResponseSchema, StructuredOutputParser
+import time
+from functools import lru_cache
+from typing import Dict, Any, BinaryIO, Callable, Optional, Union
 from ..config import settings
+from ..metrics import PARSE_FAILURES, STAGE_LATENCY, stage
+from ..tracing import tracer
+from .json_stream import IncrementalObjectParser
+from .resilience import CircuitBreaker, CircuitOpen, ResilientCaller
 
-# Define the schema for CV parsing
+logger = logging.getLogger(__name__)
+
+# Define the schema for CV parsing. LangChain is imported lazily (see
+# get_output_parser) because it dominates the app's import time.
 response_schemas = [
-    ResponseSchema(name="personal_info", description="Personal information including name, email, phone, location as an object with fields: name, email, phone, location"),
-    ResponseSchema(name="summary", description="Professional summary or objective statement"),
-    ResponseSchema(name="work_experience", description="List of work experiences with company, position, dates, and responsibilities"),
-    ResponseSchema(name="education", description="Educational background including institutions, degrees, and dates"),
-    ResponseSchema(name="skills", description="Technical and soft skills"),
-    ResponseSchema(name="certifications", description="Professional certifications and achievements"),
+    {"name": "personal_info", "description": "Personal information including name, email, phone, location as an object with fields: name, email, phone, location"},
+    {"name": "summary", "description": "Professional summary or objective statement"},
+    {"name": "work_experience", "description": "List of work experiences with company, position, dates, and responsibilities"},
+    {"name": "education", "description": "Educational background including institutions, degrees, and dates"},
+    {"name": "skills", "description": "Technical and soft skills"},
+    {"name": "certifications", "description": "Professional certifications and achievements"},
 ]
 
-parser = StructuredOutputParser.from_response_schemas(response_schemas)
-format_instructions = parser.get_format_instructions()
-
 PROMPT_TEMPLATE = """Extract structured information from the following CV/resume. 
 For personal_info, parse it into an object with name, email, phone, and location fields.
 If you find a string with multiple pieces of information, split them appropriately.
@@ -31,14 +36,79 @@ CV Content:
 {cv_content}
 """
 
-chat_prompt = ChatPromptTemplate.from_template(PROMPT_TEMPLATE)
+LLM_MODEL = "gpt-4o"
+
+# Identifies the model, prompt and schema a CV was parsed with (stored as
+# CV.parse_version); changing any of them makes existing CVs stale for the
+# re-parse pipeline (services/reparse.py)
+PARSE_VERSION = hashlib.sha256(
+    json.dumps([LLM_MODEL, PROMPT_TEMPLATE, response_schemas], sort_keys=True).encode("utf-8")
+).hexdigest()[:16]
+
+def extract_text_from_pdf(source: Union[str, BinaryIO]) -> str:
+    import PyPDF2
+    reader = PyPDF2.PdfReader(source)
+    text = ""
+    for page in reader.pages:
+        text += page.extract_text()
+    return text
+
+def extract_text_from_docx(source: Union[str, BinaryIO]) -> str:
+    from docx import Document
+    doc = Document(source)
+    return " ".join([paragraph.text for paragraph in doc.paragraphs])
+
+def extract_text(file_path: str, content: Optional[bytes] = None) -> str:
+    """Extract text from a CV; ``content`` avoids re-reading an upload
+    that is already in memory (``file_path`` then only supplies the
+    extension). Needs no LLM client, so callers that only want the text
+    (skill re-tagging, benchmarks) don't need OPENAI_API_KEY."""
+    file_extension = os.path.splitext(file_path)[1].lower()
+    source = io.BytesIO(content) if content is not None else file_path
+
+    if file_extension == '.pdf':
+        return extract_text_from_pdf(source)
+    elif file_extension in ['.docx', '.doc']:
+        return extract_text_from_docx(source)
+    else:
+        raise ValueError(f"Unsupported file format: {file_extension}")
+
+@lru_cache(maxsize=None)
+def get_output_parser():
+    from langchain.output_parsers import ResponseSchema, StructuredOutputParser
+    return StructuredOutputParser.from_response_schemas(
+        [ResponseSchema(**schema) for schema in response_schemas]
+    )
+
+@lru_cache(maxsize=None)
+def get_chat_prompt():
+    from langchain.prompts import ChatPromptTemplate
+    return ChatPromptTemplate.from_template(PROMPT_TEMPLATE)
+
+class ParsedCV(dict):
+    """parse_cv's result: the parsed fields, with the text extracted from
+    the file as ``text`` (not stored, but scanned by the skill tagger)."""
+    text: str = ""
 
 class CVParser:
     def __init__(self):
+        from langchain_openai import ChatOpenAI
+        # Timeouts and retries are handled by llm_caller, not the client
         self.llm = ChatOpenAI(
-            model_name="gpt-4o",
+            model_name=LLM_MODEL,
             temperature=0,
-            openai_api_key=settings.OPENAI_API_KEY
+            openai_api_key=settings.OPENAI_API_KEY,
+            max_retries=0
+        )
+        self.llm_caller = ResilientCaller(
+            CircuitBreaker("llm", settings.LLM_BREAKER_FAILURES, settings.LLM_BREAKER_RESET_SECONDS),
+            deadline=settings.LLM_DEADLINE_SECONDS,
+            attempt_timeout=settings.LLM_ATTEMPT_TIMEOUT_SECONDS,
+            max_attempts=settings.LLM_MAX_ATTEMPTS,
+            backoff_base=settings.LLM_BACKOFF_BASE_SECONDS,
+            backoff_max=settings.LLM_BACKOFF_MAX_SECONDS,
+            hedge=settings.LLM_HEDGE_ENABLED,
+            hedge_min_delay=settings.LLM_HEDGE_MIN_DELAY_SECONDS
         )
 
     def parse_personal_info(self, info_str: str) -> Dict[str, str]:
@@ -70,45 +140,81 @@ class CVParser:
 
         return info
 
-    def extract_text_from_pdf(self, file_path: str) -> str:
-        with open(file_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text()
-        return text
-
-    def extract_text_from_docx(self, file_path: str) -> str:
-        doc = Document(file_path)
-        return " ".join([paragraph.text for paragraph in doc.paragraphs])
-
-    def extract_text(self, file_path: str) -> str:
-        file_extension = os.path.splitext(file_path)[1].lower()
-
-        if file_extension == '.pdf':
-            return self.extract_text_from_pdf(file_path)
-        elif file_extension in ['.docx', '.doc']:
-            return self.extract_text_from_docx(file_path)
-        else:
-            raise ValueError(f"Unsupported file format: {file_extension}")
-
-    async def parse_cv(self, file_path: str) -> Dict[str, Any]:
+    def extract_text_from_pdf(self, source: Union[str, BinaryIO]) -> str:
+        return extract_text_from_pdf(source)
+
+    def extract_text_from_docx(self, source: Union[str, BinaryIO]) -> str:
+        return extract_text_from_docx(source)
+
+    def extract_text(self, file_path: str, content: Optional[bytes] = None) -> str:
+        return extract_text(file_path, content)
+
+    async def parse_cv(self, file_path: str, content: Optional[bytes] = None) -> Dict[str, Any]:
+        with tracer.span("cv_parser.parse_cv", file_path=file_path):
+            return await self._parse_cv(file_path, content)
+
+    async def stream_cv(
+            self,
+            file_path: str,
+            content: Optional[bytes],
+            on_field: Callable[[str, Any], None]
+    ) -> Dict[str, Any]:
+        """Like parse_cv, but streams the completion and calls
+        ``on_field(name, value)`` as soon as each top-level field is complete.
+        The returned data is parsed from the whole response, as in parse_cv."""
+        with tracer.span("cv_parser.stream_cv", file_path=file_path):
+            return await self._parse_cv(file_path, content, on_field)
+
+    async def _stream_completion(self, messages, on_field: Callable[[str, Any], None]) -> str:
+        fields = IncrementalObjectParser()
+        chunks = []
+        started = time.perf_counter()
+        first_field = True
+        async for chunk in self.llm_caller.stream(lambda: self.llm.astream(messages)):
+            text = chunk.content if isinstance(chunk.content, str) else ""
+            chunks.append(text)
+            for name, value in fields.feed(text):
+                if first_field:
+                    STAGE_LATENCY.labels("llm_first_field").observe(time.perf_counter() - started)
+                    first_field = False
+                if name == "personal_info" and isinstance(value, str):
+                    value = self.parse_personal_info(value)
+                on_field(name, value)
+        return "".join(chunks)
+
+    async def _parse_cv(
+            self,
+            file_path: str,
+            content: Optional[bytes],
+            on_field: Optional[Callable[[str, Any], None]] = None
+    ) -> Dict[str, Any]:
+        current_stage = "text_extraction"
         try:
             # Extract text from the CV file
-            cv_text = self.extract_text(file_path)
+            with stage(current_stage):
+                cv_text = self.extract_text(file_path, content)
 
             # Create the prompt with the CV content
-            messages = chat_prompt.format_messages(
-                format_instructions=format_instructions,
+            parser = get_output_parser()
+            messages = get_chat_prompt().format_messages(
+                format_instructions=parser.get_format_instructions(),
                 cv_content=cv_text
             )
 
             # Get response from LLM
-            response = await self.llm.agenerate([messages])
-            result = response.generations[0][0].text
+            current_stage = "llm_call"
+            with stage(current_stage):
+                if on_field is None:
+                    response = await self.llm_caller.call(lambda: self.llm.agenerate([messages]))
+                    result = response.generations[0][0].text
+                else:
+                    result = await self._stream_completion(messages, on_field)
 
             # Parse the response into structured data
-            parsed_data = parser.parse(result)
+            current_stage = "json_parse"
+            with stage(current_stage):
+                parsed_data = ParsedCV(parser.parse(result))
+                parsed_data.text = cv_text
 
             # If personal_info is a string, parse it into structured format
             if isinstance(parsed_data.get("personal_info"), str):
@@ -116,6 +222,15 @@ class CVParser:
 
             return parsed_data
 
-        except Exception as e:
-            print(f"Error parsing CV: {str(e)}")
+        except CircuitOpen:
+            # The provider is down; the CV is queued for a retry instead
+            PARSE_FAILURES.labels("circuit_open").inc()
             raise
+        except Exception:
+            PARSE_FAILURES.labels(current_stage).inc()
+            logger.exception("Error parsing CV %s during %s", file_path, current_stage)
+            raise
+
+@lru_cache(maxsize=None)
+def get_cv_parser() -> CVParser:
+    return CVParser()
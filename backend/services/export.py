@@ -0,0 +1,229 @@
+import csv
+import enum
+import importlib.util
+import io
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..models import CV
+from ..serialization import CHUNK_SIZE, dumps
+from .render_model import RENDER_MODEL_VERSION, build_render_model
+
+
+class ExportFormat(str, enum.Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+    PARQUET = "parquet"
+
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv; charset=utf-8",
+    ExportFormat.PARQUET: "application/vnd.apache.parquet",
+}
+
+# One row per CV ("cv") and per work experience, education entry and skill,
+# joined back to their CV by cv_id; columns that don't apply are empty
+EXPORT_COLUMNS = (
+    "cv_id", "user_id", "created_at", "parsed_at", "record", "position_in_cv",
+    "original_filename", "name", "email", "phone", "location", "summary",
+    "company", "position", "dates", "responsibilities",
+    "institution", "degree", "skill",
+)
+
+
+def _utc(value: datetime) -> datetime:
+    # Naive datetimes come back from SQLite/MySQL in UTC
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def export_window(since: Optional[datetime], until: Optional[datetime]) -> Tuple[Optional[datetime], datetime]:
+    """The parsed_at range (since, until] of an export, naive times taken
+    as UTC. ``until`` defaults to a little before now so rows still being
+    committed aren't skipped by the next incremental export, which should
+    start at this ``until``."""
+    if until is None:
+        until = datetime.now(timezone.utc) - timedelta(seconds=settings.EXPORT_WATERMARK_LAG_SECONDS)
+    return (_utc(since) if since else None), _utc(until)
+
+
+def iter_export_rows(
+        db: Session,
+        since: Optional[datetime],
+        until: datetime,
+        user_id: Optional[str] = None
+) -> Iterator[Dict[str, Any]]:
+    """Flattened rows of the CVs parsed in (since, until], least recently
+    parsed first, streamed from a server-side cursor. A CV parsed again (by
+    a retry or a re-parse job) is in the next incremental export again."""
+    query = (
+        select(
+            CV.id, CV.user_id, CV.original_filename, CV.created_at, CV.parsed_at,
+            CV.parsed_data, CV.render_data, CV.render_version
+        )
+        .where(CV.parsed_at <= until)
+        .order_by(CV.parsed_at, CV.id)
+        .execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+    )
+    if since is not None:
+        query = query.where(CV.parsed_at > since)
+    if user_id is not None:
+        query = query.where(CV.user_id == user_id)
+
+    for row in db.execute(query):
+        if not row.parsed_data:
+            continue
+        model = row.render_data if row.render_version == RENDER_MODEL_VERSION else build_render_model(row.parsed_data)
+        yield from _flatten(row, model)
+
+
+def _flatten(row, model: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    created_at = _utc(row.created_at) if row.created_at else None
+    parsed_at = _utc(row.parsed_at) if row.parsed_at else None
+
+    def record(kind: str, index: int, **values) -> Dict[str, Any]:
+        out = dict.fromkeys(EXPORT_COLUMNS)
+        out.update(
+            cv_id=row.id, user_id=row.user_id, created_at=created_at, parsed_at=parsed_at,
+            record=kind, position_in_cv=index
+        )
+        out.update(values)
+        return out
+
+    personal_info = model["personal_info"]
+    yield record(
+        "cv", 0,
+        original_filename=row.original_filename,
+        name=personal_info["name"],
+        email=personal_info["email"],
+        phone=personal_info["phone"],
+        location=personal_info["location"],
+        summary=model["summary"]
+    )
+    for index, exp in enumerate(model["work_experience"]):
+        yield record(
+            "work_experience", index,
+            company=exp["company"],
+            position=exp["position"],
+            dates=exp["dates"],
+            responsibilities="\n".join(exp["responsibilities"])
+        )
+    for index, edu in enumerate(model["education"]):
+        yield record("education", index, institution=edu["institution"], degree=edu["degree"], dates=edu["dates"])
+    for index, skill in enumerate(model["skills"]):
+        yield record("skill", index, skill=skill)
+
+
+def _ndjson_chunks(rows: Iterator[Dict[str, Any]]) -> Iterator[bytes]:
+    buffer = bytearray()
+    for row in rows:
+        buffer += dumps(row)
+        buffer += b"\n"
+        if len(buffer) >= CHUNK_SIZE:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+def _csv_chunks(rows: Iterator[Dict[str, Any]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    for row in rows:
+        if row["created_at"] is not None:
+            row["created_at"] = row["created_at"].isoformat()
+        writer.writerow(row)
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+class _DrainingSink:
+    """Write-only file for ParquetWriter whose bytes are handed on as soon
+    as they are written; ``tell`` keeps counting so the footer's offsets
+    are right."""
+
+    closed = False
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _parquet_schema():
+    import pyarrow
+    timestamp = pyarrow.timestamp("us", tz="UTC")
+    types = {"created_at": timestamp, "parsed_at": timestamp, "position_in_cv": pyarrow.int32()}
+    return pyarrow.schema([(column, types.get(column, pyarrow.string())) for column in EXPORT_COLUMNS])
+
+
+def _parquet_chunks(rows: Iterator[Dict[str, Any]]) -> Iterator[bytes]:
+    # pyarrow is heavy: imported by the first Parquet export, not with the app
+    import pyarrow
+    import pyarrow.parquet as parquet
+    schema = _parquet_schema()
+    sink = _DrainingSink()
+    writer = parquet.ParquetWriter(pyarrow.PythonFile(sink, mode="w"), schema, compression="zstd")
+    columns: Dict[str, list] = {column: [] for column in EXPORT_COLUMNS}
+    buffered = 0
+
+    def write_row_group():
+        writer.write_table(pyarrow.Table.from_pydict(columns, schema=schema))
+        for values in columns.values():
+            values.clear()
+
+    for row in rows:
+        for column in EXPORT_COLUMNS:
+            columns[column].append(row[column])
+        buffered += 1
+        if buffered >= settings.EXPORT_PARQUET_ROW_GROUP_SIZE:
+            write_row_group()
+            buffered = 0
+            yield sink.drain()
+    if buffered:
+        write_row_group()
+    writer.close()
+    yield sink.drain()
+
+
+@lru_cache(maxsize=None)
+def parquet_available() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def export_chunks(export_format: ExportFormat, rows: Iterator[Dict[str, Any]]) -> Iterator[bytes]:
+    """Encode export rows incrementally; memory stays bounded by one chunk
+    (NDJSON, CSV) or one row group (Parquet)."""
+    if export_format == ExportFormat.NDJSON:
+        return _ndjson_chunks(rows)
+    if export_format == ExportFormat.CSV:
+        return _csv_chunks(rows)
+    if not parquet_available():
+        raise RuntimeError("Parquet export needs pyarrow")
+    return _parquet_chunks(rows)
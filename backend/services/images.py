@@ -0,0 +1,52 @@
+import io
+import logging
+from typing import Optional, Tuple
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+# The templates show logos at most 120x60 CSS px (.org-logo); CSS px are 1/96 in
+LOGO_BOX_CSS_PX = (120, 60)
+JPEG_QUALITY = 85
+
+
+def logo_max_size(dpi: int) -> Tuple[int, int]:
+    """Largest pixel size a logo can be displayed at when printed at ``dpi``."""
+    return tuple(round(css_px * dpi / 96) for css_px in LOGO_BOX_CSS_PX)
+
+
+def normalize_logo(content: bytes) -> Optional[Tuple[bytes, str]]:
+    """Downscale a logo to its largest rendered size at LOGO_DPI and re-encode
+    it without metadata.
+
+    Returns (content, extension), or None when the image can't be processed
+    (Pillow missing, SVG or an unknown format); store the upload as-is then.
+    Images are never upscaled.
+    """
+    try:
+        # Imported on first use, not with the app
+        from PIL import Image, ImageOps, UnidentifiedImageError
+    except ImportError:  # pragma: no cover - optional dependency
+        return None
+    try:
+        image = Image.open(io.BytesIO(content))
+        image.load()
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        return None
+
+    source_format = image.format
+    # Apply the EXIF rotation before the metadata is dropped
+    image = ImageOps.exif_transpose(image)
+    has_alpha = image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info)
+    image = image.convert("RGBA" if has_alpha else "RGB")
+    image.thumbnail(logo_max_size(settings.LOGO_DPI), Image.LANCZOS)
+
+    # Fresh images carry no EXIF/ICC/text chunks from the upload
+    output = io.BytesIO()
+    if source_format == "JPEG" and not has_alpha:
+        image.save(output, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+        extension = ".jpg"
+    else:
+        image.save(output, "PNG", optimize=True)
+        extension = ".png"
+    return output.getvalue(), extension
@@ -0,0 +1,265 @@
+import asyncio
+import hashlib
+import logging
+import os
+import zipfile
+import zlib
+from typing import BinaryIO, Dict, List, Optional
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from ..config import settings
+from ..database import SessionLocal
+from ..metrics import stage
+from ..models import CV
+from .cv_parser import get_cv_parser
+from .parse_retry import record_parse_failure, record_parse_success
+from .render_model import set_render_model
+from .scheduler import Reservation, get_scheduler
+from .storage import blob_key, get_blob_store
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = {".pdf", ".docx", ".doc"}
+READ_CHUNK_SIZE = 64 * 1024
+MB = 1024 * 1024
+
+
+class InvalidArchive(ValueError):
+    """The upload isn't a readable ZIP archive."""
+
+
+class ArchiveRejected(ValueError):
+    """The archive as a whole is over the import limits."""
+
+
+class EntryRejected(ValueError):
+    """One entry is over the import limits."""
+
+
+class ImportEntry:
+    """Outcome of one archive member: imported, duplicate, skipped, rejected
+    or failed."""
+
+    def __init__(self, name: str, status: str = "pending", detail: Optional[str] = None):
+        self.name = name
+        self.status = status
+        self.detail = detail
+        self.cv: Optional[CV] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "status": self.status,
+            "cv_id": self.cv.id if self.cv is not None else None,
+            "detail": self.detail,
+        }
+
+
+def _save_cv(cv: CV):
+    """Commit one imported CV in its own session; its blob reference is
+    dropped again if that fails."""
+    with SessionLocal() as db:
+        try:
+            db.add(cv)
+            with stage("db_commit"):
+                db.commit()
+        except Exception:
+            get_blob_store().release_committed(db, [cv.file_url])
+            raise
+        db.refresh(cv)
+
+
+def _skip_reason(info: zipfile.ZipInfo) -> Optional[str]:
+    basename = os.path.basename(info.filename.rstrip("/"))
+    if info.is_dir():
+        return "directory"
+    if info.filename.startswith("__MACOSX/") or basename.startswith("."):
+        # macOS resource forks (._name) and other hidden files
+        return "hidden file"
+    if os.path.splitext(basename)[1].lower() not in SUPPORTED_EXTENSIONS:
+        return "unsupported file type"
+    return None
+
+
+class ArchiveImporter:
+    """Imports the CVs in a ZIP archive for one user.
+
+    Members are read one at a time straight from the archive (nothing is
+    extracted to disk) and flow through a pipeline with bounded queues:
+    extract -> dedupe and store -> parse. At most ``IMPORT_IN_FLIGHT``
+    documents wait between stages, so memory stays flat however large the
+    archive is, and parsing takes slots from the fair parse scheduler. Each
+    blob reference is committed as soon as it is stored and each CV as soon
+    as it is parsed, so no lock is held across the pipeline and a late
+    failure keeps the CVs already imported.
+
+    Zip bombs are refused on the declared sizes before any work starts, and
+    the actual decompressed bytes are counted while reading, since headers
+    can lie.
+    """
+
+    def __init__(self, db: Session, user_id: str, archive: BinaryIO):
+        self.db = db
+        self.user_id = user_id
+        try:
+            self.zip = zipfile.ZipFile(archive)
+        except (zipfile.BadZipFile, OSError) as e:
+            raise InvalidArchive(f"Not a readable ZIP archive: {e}")
+        self.entries: List[ImportEntry] = []
+        self._candidates: List[tuple] = []
+        self._total_read = 0
+        self._check_archive()
+
+    def _check_archive(self):
+        members = self.zip.infolist()
+        if len(members) > settings.IMPORT_MAX_ENTRIES:
+            raise ArchiveRejected(f"Archive has {len(members)} entries, the limit is {settings.IMPORT_MAX_ENTRIES}")
+        declared_total = sum(info.file_size for info in members)
+        if declared_total > settings.IMPORT_MAX_TOTAL_MB * MB:
+            raise ArchiveRejected(f"Archive expands to more than {settings.IMPORT_MAX_TOTAL_MB} MB")
+
+        for info in members:
+            entry = ImportEntry(info.filename)
+            self.entries.append(entry)
+            reason = _skip_reason(info)
+            if reason:
+                entry.status, entry.detail = "skipped", reason
+            elif info.flag_bits & 0x1:
+                entry.status, entry.detail = "rejected", "encrypted"
+            else:
+                self._candidates.append((info, entry))
+
+    @property
+    def parse_workers(self) -> int:
+        return max(1, min(settings.PARSE_TENANT_CONCURRENCY, settings.IMPORT_IN_FLIGHT))
+
+    @property
+    def queued_jobs(self) -> int:
+        """Most parse jobs the import has queued at once, for admission
+        control: the pipeline never queues the whole archive."""
+        return min(len(self._candidates), self.parse_workers)
+
+    def _read(self, info: zipfile.ZipInfo) -> bytes:
+        """Decompress one member, enforcing the size and ratio limits on the
+        bytes actually produced."""
+        max_entry = settings.IMPORT_MAX_ENTRY_MB * MB
+        max_ratio_size = max(info.compress_size, 1) * settings.IMPORT_MAX_RATIO
+        if info.file_size > max_entry:
+            raise EntryRejected(f"larger than {settings.IMPORT_MAX_ENTRY_MB} MB")
+        chunks = []
+        size = 0
+        with self.zip.open(info) as member:
+            while chunk := member.read(READ_CHUNK_SIZE):
+                size += len(chunk)
+                self._total_read += len(chunk)
+                if size > max_entry:
+                    raise EntryRejected(f"larger than {settings.IMPORT_MAX_ENTRY_MB} MB")
+                if size > max_ratio_size:
+                    raise EntryRejected(f"compression ratio above {settings.IMPORT_MAX_RATIO}:1")
+                if self._total_read > settings.IMPORT_MAX_TOTAL_MB * MB:
+                    raise ArchiveRejected(f"Archive expands to more than {settings.IMPORT_MAX_TOTAL_MB} MB")
+                chunks.append(chunk)
+        return b"".join(chunks)
+
+    async def run(self, reservation: Optional[Reservation] = None) -> List[ImportEntry]:
+        """Run the pipeline, committing each imported CV; the parses take
+        the ``reservation``'s places, when admitted with one."""
+        in_flight = settings.IMPORT_IN_FLIGHT
+        # Blob references committed for CVs that aren't saved yet
+        unsaved: Dict[int, str] = {}
+        extracted: asyncio.Queue = asyncio.Queue(in_flight)
+        stored: asyncio.Queue = asyncio.Queue(in_flight)
+        parsers = self.parse_workers
+
+        async def extract():
+            try:
+                for index, (info, entry) in enumerate(self._candidates):
+                    try:
+                        with stage("zip_extract"):
+                            content = await run_in_threadpool(self._read, info)
+                    except EntryRejected as e:
+                        entry.status, entry.detail = "rejected", str(e)
+                        continue
+                    except ArchiveRejected as e:
+                        # Over the total size: reject what's left
+                        for _, remaining in self._candidates[index:]:
+                            remaining.status, remaining.detail = "rejected", str(e)
+                        return
+                    except (zipfile.BadZipFile, zlib.error, OSError, EOFError, NotImplementedError) as e:
+                        entry.status, entry.detail = "failed", f"unreadable: {e}"
+                        continue
+                    await extracted.put((info, entry, content))
+            finally:
+                await extracted.put(None)
+
+        async def dedupe():
+            # Single consumer: owns the session while blobs are stored
+            seen: Dict[str, str] = {}
+            try:
+                while (item := await extracted.get()) is not None:
+                    info, entry, content = item
+                    digest = hashlib.sha256(content).hexdigest()
+                    if digest in seen:
+                        entry.status, entry.detail = "duplicate", f"same file as {seen[digest]}"
+                        continue
+                    seen[digest] = entry.name
+                    existing_id = self._existing_cv_id(digest, info.filename)
+                    if existing_id:
+                        entry.status, entry.detail = "duplicate", f"already imported as CV {existing_id}"
+                        continue
+                    try:
+                        file_url = await get_blob_store().save(self.db, content, os.path.basename(info.filename))
+                        self.db.commit()
+                    except Exception as e:
+                        self.db.rollback()
+                        logger.exception("Storing %s failed", entry.name)
+                        entry.status, entry.detail = "failed", f"could not be stored: {e}"
+                        continue
+                    unsaved[id(entry)] = file_url
+                    await stored.put((entry, file_url, content))
+            finally:
+                for _ in range(parsers):
+                    await stored.put(None)
+
+        async def parse():
+            scheduler = get_scheduler("parse")
+            while (item := await stored.get()) is not None:
+                entry, file_url, content = item
+                cv = CV(user_id=self.user_id, original_filename=os.path.basename(entry.name), file_url=file_url)
+                try:
+                    async with scheduler.slot(self.user_id, reservation=reservation):
+                        parsed_data = await get_cv_parser().parse_cv(file_url, content)
+                except Exception as e:
+                    record_parse_failure(cv, e)
+                    set_render_model(cv)
+                    entry.detail = f"parse failed: {cv.parse_error}"
+                else:
+                    record_parse_success(cv, parsed_data)
+                try:
+                    await run_in_threadpool(_save_cv, cv)
+                except Exception as e:
+                    logger.exception("Saving %s failed", entry.name)
+                    entry.status, entry.detail = "failed", f"could not be saved: {e}"
+                    continue
+                finally:
+                    unsaved.pop(id(entry), None)
+                entry.status, entry.cv = "imported", cv
+
+        tasks = [asyncio.ensure_future(stage_coro) for stage_coro in (extract(), dedupe(), *(parse() for _ in range(parsers)))]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # Don't leave the other stages blocked on a queue nobody reads
+            for task in tasks:
+                task.cancel()
+            get_blob_store().release_committed(self.db, list(unsaved.values()))
+            raise
+        return self.entries
+
+    def _existing_cv_id(self, digest: str, filename: str) -> Optional[str]:
+        """The user's CV with this exact document, if any (blob URLs are
+        content addressed)."""
+        extension = os.path.splitext(filename)[1].lower()
+        file_url = get_blob_store().url(blob_key(digest, extension))
+        existing = self.db.query(CV.id).filter(CV.user_id == self.user_id, CV.file_url == file_url).first()
+        return existing.id if existing else None
@@ -0,0 +1,105 @@
+import json
+from typing import Any, List, Optional, Tuple
+
+# What the scanner expects next at the top level of the object
+_KEY, _KEY_STRING, _COLON, _VALUE, _IN_VALUE, _COMMA = range(6)
+
+
+class IncrementalObjectParser:
+    """Extracts the top-level fields of a JSON object from text that arrives
+    in pieces, such as an LLM token stream.
+
+    ``feed`` returns the (key, value) pairs completed by the new text, so
+    each field can be used as soon as its value has been received. Anything
+    before the first "{" (a ```json fence, a preamble) and after the matching
+    "}" is ignored. Fields whose text isn't valid JSON are skipped; the
+    caller should still parse the whole response at the end.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._position = 0
+        self._started = False
+        self.done = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._expect = _KEY
+        self._key: Optional[str] = None
+        self._start = 0
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        fields = []
+        if self.done:
+            return fields
+        self._text += chunk
+        text = self._text
+        for i in range(self._position, len(text)):
+            c = text[i]
+            if not self._started:
+                if c == "{":
+                    self._started = True
+                    self._depth = 1
+                continue
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif c == "\\":
+                    self._escaped = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        if self._expect == _KEY_STRING:
+                            self._key = self._decode(self._start, i + 1)
+                            self._expect = _COLON
+                        elif self._expect == _IN_VALUE:
+                            self._emit(fields, i + 1)
+                continue
+
+            if c in " \t\r\n":
+                continue
+            if c == '"':
+                self._in_string = True
+                if self._depth == 1 and self._expect in (_KEY, _VALUE):
+                    self._start = i
+                    self._expect = _KEY_STRING if self._expect == _KEY else _IN_VALUE
+            elif c in "{[":
+                if self._depth == 1 and self._expect == _VALUE:
+                    self._start = i
+                    self._expect = _IN_VALUE
+                self._depth += 1
+            elif c in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._expect == _IN_VALUE:
+                    self._emit(fields, i + 1)
+                elif self._depth == 0:
+                    if self._expect == _IN_VALUE:
+                        # A number, true, false or null ends at the brace
+                        self._emit(fields, i)
+                    self.done = True
+                    break
+            elif self._depth == 1:
+                if c == ":" and self._expect == _COLON:
+                    self._expect = _VALUE
+                elif c == ",":
+                    if self._expect == _IN_VALUE:
+                        self._emit(fields, i)
+                    self._expect = _KEY
+                elif self._expect == _VALUE:
+                    self._start = i
+                    self._expect = _IN_VALUE
+        self._position = len(text)
+        return fields
+
+    def _decode(self, start: int, end: int) -> Any:
+        return json.loads(self._text[start:end])
+
+    def _emit(self, fields: List[Tuple[str, Any]], end: int):
+        self._expect = _COMMA
+        try:
+            value = self._decode(self._start, end)
+        except ValueError:
+            return
+        if self._key is not None:
+            fields.append((self._key, value))
@@ -0,0 +1,444 @@
+import asyncio
+import itertools
+import json
+import logging
+import os
+import random
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy import func
+from starlette.concurrency import run_in_threadpool
+from ..config import settings
+from ..database import SessionLocal
+from ..metrics import STORAGE_RECLAIMED_BYTES, STORAGE_USAGE_BYTES
+from ..models import Blob, CV, Organization, UploadSession, User
+from .storage import BLOB_PREFIX, BlobStore, LocalStorageBackend, get_blob_store
+from .thumbnails import THUMBNAIL_PREFIX
+from .upload_sessions import COMPLETE, UPLOAD_SESSION_PREFIX
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Uploads stored before content addressing are owned by exactly one row: CVs
+# at the top of UPLOAD_DIR and organization logos/templates under this prefix
+LEGACY_ORGANIZATION_PREFIX = "organization/"
+GENERATED_DIR = "generated"
+# Group of the PDFs generated before per-user directories, directly under
+# generated/: no owner to charge them to, but evictable like the rest
+LEGACY_GENERATED = ""
+# Generated PDFs younger than this may still be being written or served
+GENERATED_MIN_AGE_SECONDS = 300
+
+MB = 1024 * 1024
+
+
+class SweepReport:
+    """What one sweep removed, by reason."""
+
+    def __init__(self):
+        self.reclaimed_bytes: Dict[str, int] = defaultdict(int)
+        self.removed: Dict[str, int] = defaultdict(int)
+        self.recounted = 0
+        self.usage_bytes: Optional[int] = None
+        self.started = time.time()
+        self.duration = 0.0
+
+    def record(self, reason: str, size: int):
+        self.reclaimed_bytes[reason] += size
+        self.removed[reason] += 1
+        STORAGE_RECLAIMED_BYTES.labels(reason).inc(size)
+
+    @property
+    def total_reclaimed(self) -> int:
+        return sum(self.reclaimed_bytes.values())
+
+    def to_dict(self) -> dict:
+        return {
+            "reclaimed_bytes": dict(self.reclaimed_bytes),
+            "removed": dict(self.removed),
+            "total_reclaimed_bytes": self.total_reclaimed,
+            "recounted_blobs": self.recounted,
+            "usage_bytes": self.usage_bytes,
+            "duration_seconds": round(self.duration, 3),
+        }
+
+
+def _timestamp(value: datetime) -> float:
+    # Naive datetimes come back from SQLite/MySQL in UTC
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+@contextmanager
+def _sweep_lock(path: str):
+    """Non-blocking exclusive lock so one worker per node sweeps at a time."""
+    if fcntl is None:
+        yield True
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class StorageSweeper:
+    """Reclaims disk space in small batches.
+
+    - Blob files without a ``blobs`` row, legacy upload files no row points
+      at and thumbnails of deleted CVs are deleted once older than
+      ORPHAN_GRACE_SECONDS.
+    - Expired upload sessions are deleted, and so are the chunks of
+      sessions that are gone or finalized.
+    - Blob reference counts are recomputed from CV and organization rows;
+      blobs nothing references any more are deleted.
+    - Generated PDFs are evicted least-recently-used first when older than
+      GENERATED_TTL_HOURS, over the per-user quota, or while UPLOAD_DIR is over
+      STORAGE_QUOTA_MB (legacy PDFs directly under generated/ included).
+      Directories of deleted users are removed.
+
+    Blocking work runs in the threadpool one batch at a time with a pause
+    between batches so sweeps don't compete with request traffic.
+    """
+
+    def __init__(self, blob_store: BlobStore, upload_dir: str):
+        self.blob_store = blob_store
+        self.upload_dir = os.path.abspath(upload_dir)
+        self.generated_dir = os.path.join(self.upload_dir, GENERATED_DIR)
+        self.batch_size = max(1, settings.MAINTENANCE_BATCH_SIZE)
+        self.pause = settings.MAINTENANCE_BATCH_PAUSE_SECONDS
+
+    async def run(self) -> Optional[SweepReport]:
+        """Run one sweep; returns None if another worker holds the lock."""
+        with _sweep_lock(os.path.join(self.upload_dir, ".maintenance.lock")) as acquired:
+            if not acquired:
+                logger.debug("Storage sweep already running in another worker")
+                return None
+
+            report = SweepReport()
+            await self._remove_orphan_blobs(report)
+            await self._remove_orphan_legacy_files(report)
+            await self._remove_orphan_thumbnails(report)
+            await self._expire_upload_sessions(report)
+            await self._remove_orphan_chunks(report)
+            await self._recount_references(report)
+            await self._evict_generated(report)
+            report.duration = time.time() - report.started
+
+        STORAGE_USAGE_BYTES.set(report.usage_bytes or 0)
+        logger.info(
+            "Storage sweep reclaimed %d bytes (%s) in %.1fs; usage %s bytes",
+            report.total_reclaimed, dict(report.removed), report.duration, report.usage_bytes
+        )
+        return report
+
+    async def _batches(self, items: Iterable) -> AsyncIterator[List]:
+        """Pull items in batches off the event loop, pausing between batches."""
+        iterator = iter(items)
+        first = True
+        while True:
+            batch = await run_in_threadpool(lambda: list(itertools.islice(iterator, self.batch_size)))
+            if not batch:
+                return
+            if not first:
+                await asyncio.sleep(self.pause)
+            first = False
+            yield batch
+
+    def _is_stale(self, key: str, now: float) -> bool:
+        try:
+            return now - self.blob_store.backend.modified_at(key) >= settings.ORPHAN_GRACE_SECONDS
+        except FileNotFoundError:
+            return False
+
+    def _delete_key(self, key: str, reason: str, report: SweepReport):
+        backend = self.blob_store.backend
+        try:
+            size = backend.size(key)
+            backend.delete(key)
+        except FileNotFoundError:
+            return
+        except Exception:
+            logger.exception("Failed to delete %s", key)
+            return
+        report.record(reason, size)
+
+    async def _remove_orphan_blobs(self, report: SweepReport):
+        async for keys in self._batches(self.blob_store.backend.iter_keys(BLOB_PREFIX)):
+            await run_in_threadpool(self._remove_orphan_blob_batch, keys, report)
+
+    def _remove_orphan_blob_batch(self, keys: List[str], report: SweepReport):
+        with SessionLocal() as db:
+            known = {key for (key,) in db.query(Blob.key).filter(Blob.key.in_(keys))}
+        now = time.time()
+        for key in keys:
+            # Files are written before their row commits, hence the grace period
+            if key not in known and self._is_stale(key, now):
+                self._delete_key(key, "orphan_blob", report)
+
+    def _legacy_keys(self) -> Iterator[str]:
+        backend = self.blob_store.backend
+        if isinstance(backend, LocalStorageBackend) and os.path.isdir(self.upload_dir):
+            for entry in os.scandir(self.upload_dir):
+                if entry.is_file() and not entry.name.startswith("."):
+                    yield entry.name
+        yield from backend.iter_keys(LEGACY_ORGANIZATION_PREFIX)
+
+    async def _remove_orphan_legacy_files(self, report: SweepReport):
+        async for batch in self._batches(self._legacy_keys()):
+            await run_in_threadpool(self._remove_orphan_legacy_batch, batch, report)
+
+    def _remove_orphan_legacy_batch(self, keys: List[str], report: SweepReport):
+        urls = {self.blob_store.url(key): key for key in keys}
+        with SessionLocal() as db:
+            referenced = self._referenced_urls(db, list(urls))
+        now = time.time()
+        for url, key in urls.items():
+            if url not in referenced and self._is_stale(key, now):
+                self._delete_key(key, "orphan_file", report)
+
+    async def _remove_orphan_thumbnails(self, report: SweepReport):
+        async for keys in self._batches(self.blob_store.backend.iter_keys(THUMBNAIL_PREFIX)):
+            await run_in_threadpool(self._remove_orphan_thumbnail_batch, keys, report)
+
+    def _remove_orphan_thumbnail_batch(self, keys: List[str], report: SweepReport):
+        # thumbnails/<cv id>/<style hash>.webp; stale styles are replaced on render
+        cv_ids = {key[len(THUMBNAIL_PREFIX):].split("/", 1)[0] for key in keys}
+        with SessionLocal() as db:
+            existing = {cv_id for (cv_id,) in db.query(CV.id).filter(CV.id.in_(cv_ids))}
+        now = time.time()
+        for key in keys:
+            if key[len(THUMBNAIL_PREFIX):].split("/", 1)[0] not in existing and self._is_stale(key, now):
+                self._delete_key(key, "orphan_thumbnail", report)
+
+    async def _expire_upload_sessions(self, report: SweepReport):
+        while await run_in_threadpool(self._expire_upload_session_batch, report):
+            await asyncio.sleep(self.pause)
+
+    def _expire_upload_session_batch(self, report: SweepReport) -> int:
+        with SessionLocal() as db:
+            ids = [
+                session_id for (session_id,) in db.query(UploadSession.id)
+                .filter(UploadSession.expires_at < datetime.now(timezone.utc))
+                .limit(self.batch_size)
+            ]
+            if ids:
+                db.query(UploadSession).filter(UploadSession.id.in_(ids)).delete(synchronize_session=False)
+                db.commit()
+        # Their chunks go in _remove_orphan_chunks
+        report.removed["expired_upload_session"] += len(ids)
+        return len(ids)
+
+    async def _remove_orphan_chunks(self, report: SweepReport):
+        async for keys in self._batches(self.blob_store.backend.iter_keys(UPLOAD_SESSION_PREFIX)):
+            await run_in_threadpool(self._remove_orphan_chunk_batch, keys, report)
+
+    def _remove_orphan_chunk_batch(self, keys: List[str], report: SweepReport):
+        # upload-sessions/<session id>/<chunk index>
+        session_ids = {key[len(UPLOAD_SESSION_PREFIX):].split("/", 1)[0] for key in keys}
+        with SessionLocal() as db:
+            live = {
+                session_id for (session_id,) in db.query(UploadSession.id)
+                .filter(UploadSession.id.in_(session_ids), UploadSession.status != COMPLETE)
+            }
+        now = time.time()
+        for key in keys:
+            if key[len(UPLOAD_SESSION_PREFIX):].split("/", 1)[0] not in live and self._is_stale(key, now):
+                self._delete_key(key, "orphan_upload_chunk", report)
+
+    @staticmethod
+    def _referenced_urls(db, urls: List[str]) -> Dict[str, int]:
+        """Number of rows pointing at each of ``urls``."""
+        counts: Dict[str, int] = defaultdict(int)
+        for column in (CV.file_url, Organization.logo_url, Organization.logo_original_url, Organization.cv_template_url):
+            rows = db.query(column, func.count()).filter(column.in_(urls)).group_by(column)
+            for url, count in rows:
+                counts[url] += count
+        return counts
+
+    async def _recount_references(self, report: SweepReport):
+        last_key = ""
+        while True:
+            batch, last_key = await run_in_threadpool(self._recount_batch, last_key, report)
+            if not batch:
+                return
+            await asyncio.sleep(self.pause)
+
+    def _recount_batch(self, after_key: str, report: SweepReport) -> Tuple[int, str]:
+        cutoff = time.time() - settings.ORPHAN_GRACE_SECONDS
+        to_delete = []
+        with SessionLocal() as db:
+            rows = (
+                db.query(Blob.key, Blob.ref_count, Blob.size, Blob.created_at, Blob.last_referenced_at)
+                .filter(Blob.key > after_key)
+                .order_by(Blob.key)
+                .limit(self.batch_size)
+                .all()
+            )
+            if not rows:
+                return 0, after_key
+
+            urls = {self.blob_store.url(key): key for key, *_ in rows}
+            referenced = self._referenced_urls(db, list(urls))
+            for key, ref_count, _, created_at, last_referenced_at in rows:
+                # Uploads commit the reference before the CV row that holds it
+                if any(value is not None and _timestamp(value) > cutoff for value in (created_at, last_referenced_at)):
+                    continue
+                actual = referenced.get(self.blob_store.url(key), 0)
+                if actual == ref_count:
+                    continue
+                # Only apply if no request changed the count since we read it
+                query = db.query(Blob).filter(Blob.key == key, Blob.ref_count == ref_count)
+                if actual > 0:
+                    updated = query.update({Blob.ref_count: actual}, synchronize_session=False)
+                else:
+                    updated = query.delete(synchronize_session=False)
+                    if updated:
+                        to_delete.append(key)
+                report.recounted += updated
+            db.commit()
+
+        for key in to_delete:
+            self._delete_key(key, "unreferenced_blob", report)
+        return len(rows), rows[-1][0]
+
+    async def _evict_generated(self, report: SweepReport):
+        files, stale_dirs = await run_in_threadpool(self._scan_generated)
+        now = time.time()
+        ttl = settings.GENERATED_TTL_HOURS * 3600
+        per_user_quota = settings.GENERATED_QUOTA_PER_USER_MB * MB
+
+        evictions: List[Tuple[str, int, str]] = []
+        kept: List[Tuple[float, str, int]] = []
+        for user_id, user_files in files.items():
+            reason = "orphan_generated" if user_id in stale_dirs else None
+            # Legacy PDFs belong to no one user, so no per-user quota
+            user_quota = per_user_quota if user_id != LEGACY_GENERATED else 0
+            used = 0
+            # Most recently used first, so the quota keeps the hottest files
+            for last_used, path, size in sorted(user_files, reverse=True):
+                if now - last_used < GENERATED_MIN_AGE_SECONDS:
+                    used += size
+                elif reason:
+                    evictions.append((path, size, reason))
+                elif ttl and now - last_used > ttl:
+                    evictions.append((path, size, "generated_ttl"))
+                elif user_quota and used + size > user_quota:
+                    evictions.append((path, size, "generated_user_quota"))
+                else:
+                    used += size
+                    kept.append((last_used, path, size))
+
+        await self._remove_files(evictions, report)
+
+        usage = await run_in_threadpool(self._disk_usage)
+        quota = settings.STORAGE_QUOTA_MB * MB
+        if quota and usage > quota:
+            over_quota = []
+            for _, path, size in sorted(kept):
+                if usage <= quota:
+                    break
+                over_quota.append((path, size, "generated_global_quota"))
+                usage -= size
+            await self._remove_files(over_quota, report)
+            if usage > quota:
+                logger.warning(
+                    "Storage usage %d bytes is over STORAGE_QUOTA_MB after evicting generated files", usage
+                )
+        report.usage_bytes = usage
+
+        for user_id in stale_dirs:
+            try:
+                os.rmdir(os.path.join(self.generated_dir, user_id))
+            except OSError:
+                pass
+
+    def _scan_generated(self) -> Tuple[Dict[str, List[Tuple[float, str, int]]], set]:
+        files: Dict[str, List[Tuple[float, str, int]]] = defaultdict(list)
+        if not os.path.isdir(self.generated_dir):
+            return files, set()
+        for user_entry in os.scandir(self.generated_dir):
+            if user_entry.is_file():
+                if not user_entry.name.startswith("."):
+                    stat = user_entry.stat()
+                    files[LEGACY_GENERATED].append((max(stat.st_atime, stat.st_mtime), user_entry.path, stat.st_size))
+                continue
+            if not user_entry.is_dir():
+                continue
+            for entry in os.scandir(user_entry.path):
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+                files[user_entry.name].append((max(stat.st_atime, stat.st_mtime), entry.path, stat.st_size))
+
+        user_ids = [user_id for user_id in files if user_id != LEGACY_GENERATED]
+        with SessionLocal() as db:
+            existing = {
+                user_id
+                for chunk in range(0, len(user_ids), self.batch_size)
+                for (user_id,) in db.query(User.id).filter(User.id.in_(user_ids[chunk:chunk + self.batch_size]))
+            }
+        return files, set(user_ids) - existing
+
+    def _disk_usage(self) -> int:
+        total = 0
+        for directory, _, filenames in os.walk(self.upload_dir):
+            for filename in filenames:
+                try:
+                    total += os.path.getsize(os.path.join(directory, filename))
+                except OSError:
+                    pass
+        return total
+
+    async def _remove_files(self, files: List[Tuple[str, int, str]], report: SweepReport):
+        async for batch in self._batches(files):
+            await run_in_threadpool(self._remove_file_batch, batch, report)
+
+    @staticmethod
+    def _remove_file_batch(batch: List[Tuple[str, int, str]], report: SweepReport):
+        for path, size, reason in batch:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            except OSError:
+                logger.exception("Failed to delete %s", path)
+                continue
+            report.record(reason, size)
+
+
+async def maintenance_loop():
+    """Sweep storage every MAINTENANCE_INTERVAL_SECONDS until cancelled."""
+    interval = settings.MAINTENANCE_INTERVAL_SECONDS
+    sweeper = StorageSweeper(get_blob_store(), settings.UPLOAD_DIR)
+    # Spread workers out so they don't all contend for the lock at startup
+    await asyncio.sleep(random.uniform(0.5, 1.0) * interval)
+    while True:
+        try:
+            await sweeper.run()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Storage sweep failed")
+        await asyncio.sleep(interval)
+
+
+if __name__ == "__main__":
+    # One-off sweep: python -m backend.services.maintenance
+    logging.basicConfig(level=logging.INFO)
+    result = asyncio.run(StorageSweeper(get_blob_store(), settings.UPLOAD_DIR).run())
+    print(json.dumps(result.to_dict() if result else {"skipped": "sweep already running"}, indent=2))
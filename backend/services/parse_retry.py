@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from starlette.concurrency import run_in_threadpool
+from ..config import settings
+from ..database import SessionLocal
+from ..models import CV
+from .cv_parser import PARSE_VERSION, get_cv_parser
+from .render_model import set_render_model
+from .resilience import CLOSED, CircuitOpen, transient_errors
+from .scheduler import get_scheduler
+from .skills import tag_skills
+from .storage import get_blob_store
+from .thumbnails import get_thumbnail_queue
+
+logger = logging.getLogger(__name__)
+
+# Longest wait between two retries of the same CV
+MAX_RETRY_DELAY = timedelta(hours=6)
+
+
+def record_parse_failure(cv: CV, error: Exception):
+    """Note a failed parse on the CV and, if the failure was the provider's
+    (timeouts, outages, an open circuit), schedule a retry with backoff."""
+    now = datetime.now(timezone.utc)
+    if isinstance(error, CircuitOpen):
+        # Never sent to the provider, so it doesn't count as an attempt
+        cv.parse_error = str(error)
+        cv.parse_retry_at = now + timedelta(seconds=max(error.retry_in, settings.PARSE_RETRY_DELAY_SECONDS))
+        return
+    cv.parse_attempts = (cv.parse_attempts or 0) + 1
+    cv.parse_error = str(error)[:1000] or type(error).__name__
+    if isinstance(error, transient_errors()) and cv.parse_attempts < settings.PARSE_RETRY_MAX_ATTEMPTS:
+        delay = timedelta(seconds=settings.PARSE_RETRY_DELAY_SECONDS * 2 ** (cv.parse_attempts - 1))
+        cv.parse_retry_at = now + min(delay, MAX_RETRY_DELAY)
+    else:
+        cv.parse_retry_at = None
+
+
+def record_parse_success(cv: CV, parsed_data):
+    cv.parsed_data = parsed_data
+    cv.parse_version = PARSE_VERSION
+    cv.parsed_at = datetime.now(timezone.utc)
+    cv.parse_attempts = (cv.parse_attempts or 0) + 1
+    cv.parse_error = None
+    cv.parse_retry_at = None
+    set_render_model(cv)
+    tag_skills(cv, getattr(parsed_data, "text", ""))
+
+
+def _claim(cv_id: str, retry_at: datetime) -> Optional[CV]:
+    """Take a due retry, unless another worker got there first. The claim
+    pushes parse_retry_at forward so a crashed worker's claim expires."""
+    with SessionLocal() as db:
+        lease = datetime.now(timezone.utc) + timedelta(seconds=settings.LLM_DEADLINE_SECONDS * 2)
+        claimed = db.query(CV).filter(CV.id == cv_id, CV.parse_retry_at == retry_at).update(
+            {CV.parse_retry_at: lease}, synchronize_session=False
+        )
+        db.commit()
+        if not claimed:
+            return None
+        cv = db.query(CV).filter(CV.id == cv_id).first()
+        db.expunge(cv)
+        return cv
+
+
+async def _retry(cv_id: str, retry_at: datetime):
+    cv = await run_in_threadpool(_claim, cv_id, retry_at)
+    if cv is None:
+        return
+    try:
+        async with get_scheduler("parse").slot(cv.user_id):
+            content = await get_blob_store().read(cv.file_url)
+            outcome = await get_cv_parser().parse_cv(cv.file_url, content)
+    except Exception as e:
+        outcome = e
+
+    def save() -> Optional[int]:
+        # Apply the outcome to the row as it is now (the user may have
+        # deleted or changed the CV during the parse); returns the attempts
+        with SessionLocal() as db:
+            current = db.query(CV).filter(CV.id == cv_id).first()
+            if current is None:
+                return None
+            if isinstance(outcome, Exception):
+                record_parse_failure(current, outcome)
+            else:
+                record_parse_success(current, outcome)
+            attempts = current.parse_attempts
+            db.commit()
+            return attempts
+
+    attempts = await run_in_threadpool(save)
+    if attempts is None:
+        logger.info("CV %s was deleted during its parse retry", cv_id)
+    elif isinstance(outcome, Exception):
+        logger.info("Retrying parse of CV %s failed (attempt %d): %s", cv_id, attempts, outcome)
+    else:
+        get_thumbnail_queue().submit(cv_id)
+
+
+async def retry_pending_parses() -> int:
+    """Retry the CVs whose parse is due for another attempt; returns how
+    many were tried. Nothing is tried while the LLM circuit is open."""
+    breaker = get_cv_parser().llm_caller.breaker
+    if breaker.is_open:
+        return 0
+
+    def due():
+        with SessionLocal() as db:
+            return db.query(CV.id, CV.parse_retry_at).filter(
+                CV.parse_retry_at <= datetime.now(timezone.utc)
+            ).order_by(CV.parse_retry_at).limit(settings.PARSE_RETRY_BATCH_SIZE).all()
+
+    rows = await run_in_threadpool(due)
+    remaining = rows
+    if rows and breaker.state != CLOSED:
+        # Recovering: one CV probes the provider before the rest follow
+        await _retry(*rows[0])
+        if breaker.state != CLOSED:
+            return 1
+        remaining = rows[1:]
+    await asyncio.gather(*(_retry(cv_id, retry_at) for cv_id, retry_at in remaining))
+    return len(rows)
+
+
+async def parse_retry_loop():
+    """Retry due parses every PARSE_RETRY_INTERVAL_SECONDS until cancelled."""
+    interval = settings.PARSE_RETRY_INTERVAL_SECONDS
+    await asyncio.sleep(random.uniform(0.5, 1.0) * interval)
+    while True:
+        try:
+            await retry_pending_parses()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Parse retry pass failed")
+        await asyncio.sleep(interval)
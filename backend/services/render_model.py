@@ -0,0 +1,110 @@
+import hashlib
+import json
+from typing import Any, Dict, List
+from ..models import CV
+
+# Bump whenever build_render_model's output changes; stored models with an
+# older version are rebuilt from parsed_data the next time they are read
+RENDER_MODEL_VERSION = 1
+
+
+def _text(value: Any, default: str = "") -> str:
+    if value is None:
+        return default
+    if isinstance(value, (list, tuple)):
+        value = ", ".join(_text(item) for item in value if item is not None)
+    text = str(value).strip()
+    return text or default
+
+
+def _dict(value: Any) -> Dict[str, Any]:
+    return value if isinstance(value, dict) else {}
+
+
+def _dicts(value: Any) -> List[Dict[str, Any]]:
+    if isinstance(value, dict):
+        value = [value]
+    if not isinstance(value, list):
+        return []
+    return [item for item in value if isinstance(item, dict)]
+
+
+def _texts(value: Any) -> List[str]:
+    """A list of non-empty strings from a list, a single string or dicts."""
+    if value is None:
+        return []
+    if not isinstance(value, list):
+        value = [value]
+    texts = []
+    for item in value:
+        if isinstance(item, dict):
+            # e.g. {"name": "Python"} from a chattier LLM response
+            item = item.get("name") or item.get("title") or next(iter(item.values()), "")
+        text = _text(item)
+        if text:
+            texts.append(text)
+    return texts
+
+
+def build_render_model(parsed_data: Any) -> Dict[str, Any]:
+    """Normalize parsed CV data into the shape the templates render.
+
+    Every field is present with the right type, so templates and clients can
+    read it without defensive lookups.
+    """
+    data = _dict(parsed_data)
+    personal_info = _dict(data.get("personal_info"))
+    return {
+        "personal_info": {
+            "name": _text(personal_info.get("name"), "No Name"),
+            "email": _text(personal_info.get("email")),
+            "phone": _text(personal_info.get("phone")),
+            "location": _text(personal_info.get("location"))
+        },
+        "summary": _text(data.get("summary")),
+        "work_experience": [
+            {
+                "company": _text(exp.get("company")),
+                "position": _text(exp.get("position")),
+                "dates": _text(exp.get("dates")),
+                "responsibilities": _texts(exp.get("responsibilities"))
+            }
+            for exp in _dicts(data.get("work_experience"))
+        ],
+        "education": [
+            {
+                "institution": _text(edu.get("institution")),
+                "degree": _text(edu.get("degree")),
+                "dates": _text(edu.get("dates"))
+            }
+            for edu in _dicts(data.get("education"))
+        ],
+        "skills": _texts(data.get("skills")),
+        "certifications": _texts(data.get("certifications"))
+    }
+
+
+def render_hash(render_data: Dict[str, Any]) -> str:
+    """Stable content hash of a render model, usable as a cache key."""
+    canonical = json.dumps(render_data, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def set_render_model(cv: CV) -> Dict[str, Any]:
+    """(Re)build the CV's stored render model from its parsed data."""
+    render_data = build_render_model(cv.parsed_data)
+    cv.render_data = render_data
+    cv.render_version = RENDER_MODEL_VERSION
+    cv.render_hash = render_hash(render_data)
+    return render_data
+
+
+def upgrade_render_model(cv: CV) -> bool:
+    """Rebuild the render model if it is missing or outdated.
+
+    Returns True when the CV was changed and needs committing.
+    """
+    if cv.render_data is not None and cv.render_version == RENDER_MODEL_VERSION:
+        return False
+    set_render_model(cv)
+    return True
@@ -0,0 +1,251 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Query, Session
+from starlette.concurrency import run_in_threadpool
+from ..config import settings
+from ..database import SessionLocal
+from ..metrics import REPARSE_CVS, stage
+from ..models import CV, ReparseJob
+from .cv_parser import PARSE_VERSION, get_cv_parser
+from .parse_retry import record_parse_failure, record_parse_success
+from .resilience import CircuitOpen
+from .scheduler import Reservation, SchedulerBusy, get_scheduler
+from .storage import get_blob_store
+
+logger = logging.getLogger(__name__)
+
+PENDING, RUNNING, COMPLETED, CANCELLED, FAILED = "pending", "running", "completed", "cancelled", "failed"
+# Re-parses share the parse scheduler as one tenant, so they only get a fair
+# share of the LLM next to live uploads (weight it with TENANT_WEIGHTS)
+REPARSE_TENANT = "reparse"
+
+_wakeup: Optional[asyncio.Event] = None
+
+
+def _filtered(query: Query, filters: dict, parse_version: str) -> Query:
+    """CVs matching a job's filters: missing parsed data or a stale parse
+    version (either, when both are set), narrowed by owner and creation time."""
+    conditions = []
+    if filters.get("missing"):
+        conditions.append(CV.parsed_data.is_(None))
+    if filters.get("stale"):
+        conditions.append(or_(CV.parse_version.is_(None), CV.parse_version != parse_version))
+    if conditions:
+        query = query.filter(or_(*conditions))
+    if filters.get("user_id"):
+        query = query.filter(CV.user_id == filters["user_id"])
+    if filters.get("created_after"):
+        query = query.filter(CV.created_at > datetime.fromisoformat(filters["created_after"]))
+    if filters.get("created_before"):
+        query = query.filter(CV.created_at < datetime.fromisoformat(filters["created_before"]))
+    return query
+
+
+def create_job(db: Session, created_by: str, filters: dict) -> ReparseJob:
+    job = ReparseJob(created_by=created_by, filters=filters, parse_version=PARSE_VERSION, status=PENDING)
+    job.total = _filtered(db.query(func.count(CV.id)), filters, PARSE_VERSION).scalar()
+    db.add(job)
+    return job
+
+
+def _lease_until() -> datetime:
+    # Long enough for one batch of parses, each within the LLM deadline
+    return datetime.now(timezone.utc) + timedelta(seconds=settings.LLM_DEADLINE_SECONDS * 2)
+
+
+def _claim_job(owner: str) -> Optional[str]:
+    """Take the oldest pending job, or a running one whose worker died."""
+    with SessionLocal() as db:
+        now = datetime.now(timezone.utc)
+        runnable = or_(ReparseJob.status == PENDING, (ReparseJob.status == RUNNING) & (ReparseJob.lease_until < now))
+        for (job_id,) in db.query(ReparseJob.id).filter(runnable).order_by(ReparseJob.created_at).limit(5):
+            claimed = db.query(ReparseJob).filter(ReparseJob.id == job_id, runnable).update(
+                {ReparseJob.status: RUNNING, ReparseJob.lease_owner: owner, ReparseJob.lease_until: _lease_until()},
+                synchronize_session=False
+            )
+            db.commit()
+            if claimed:
+                return job_id
+    return None
+
+
+def _owned(db: Session, job_id: str, owner: str, running: bool = True) -> Query:
+    query = db.query(ReparseJob).filter(ReparseJob.id == job_id, ReparseJob.lease_owner == owner)
+    return query.filter(ReparseJob.status == RUNNING) if running else query
+
+
+def _renew(job_id: str, owner: str) -> bool:
+    with SessionLocal() as db:
+        renewed = _owned(db, job_id, owner).update({ReparseJob.lease_until: _lease_until()}, synchronize_session=False)
+        db.commit()
+        return bool(renewed)
+
+
+def _next_batch(job_id: str, owner: str) -> Optional[List[Tuple[str, str]]]:
+    """The next (id, file_url) pairs after the job's cursor, or None if the
+    job was cancelled or taken over."""
+    with SessionLocal() as db:
+        job = _owned(db, job_id, owner).first()
+        if job is None:
+            return None
+        query = _filtered(db.query(CV.id, CV.file_url), job.filters, job.parse_version)
+        if job.cursor:
+            query = query.filter(CV.id > job.cursor)
+        return [tuple(row) for row in query.order_by(CV.id).limit(settings.REPARSE_BATCH_SIZE)]
+
+
+def _finish(job_id: str, owner: str, status: str, error: Optional[str] = None):
+    with SessionLocal() as db:
+        _owned(db, job_id, owner).update({
+            ReparseJob.status: status,
+            ReparseJob.error: error,
+            ReparseJob.lease_owner: None,
+            ReparseJob.lease_until: None,
+            ReparseJob.finished_at: datetime.now(timezone.utc),
+        }, synchronize_session=False)
+        db.commit()
+
+
+async def _parse(reservation: Reservation, cv_id: str, file_url: str):
+    async with reservation.slot():
+        content = await get_blob_store().read(file_url)
+        return await get_cv_parser().parse_cv(file_url, content)
+
+
+def _save_batch(job_id: str, owner: str, results: List[Tuple[str, object]], cursor: Optional[str]) -> bool:
+    """Store a batch's results and move the cursor to ``cursor`` (if given)
+    in one commit; False (and nothing saved) if another worker has taken the
+    job over. A batch finishing after the job was cancelled is still saved."""
+    with SessionLocal() as db:
+        job = _owned(db, job_id, owner, running=False).with_for_update().first()
+        if job is None:
+            return False
+        cvs = {cv.id: cv for cv in db.query(CV).filter(CV.id.in_([cv_id for cv_id, _ in results]))}
+        succeeded = failed = 0
+        for cv_id, result in results:
+            cv = cvs.get(cv_id)
+            if cv is None:
+                continue  # Deleted meanwhile
+            if isinstance(result, Exception):
+                record_parse_failure(cv, result)
+                failed += 1
+            else:
+                record_parse_success(cv, result)
+                succeeded += 1
+        if cursor is not None:
+            job.cursor = cursor
+        job.processed += len(results)
+        job.succeeded += succeeded
+        job.failed += failed
+        job.lease_until = _lease_until()
+        with stage("db_commit"):
+            db.commit()
+    REPARSE_CVS.labels("success").inc(succeeded)
+    REPARSE_CVS.labels("failed").inc(failed)
+    return True
+
+
+async def run_job(job_id: str, owner: str):
+    """Re-parse the job's CVs batch by batch until none are left. Each
+    batch's results and the cursor are committed together, so a job that
+    stops at any point resumes after the last committed batch. CVs the open
+    circuit kept from being parsed are redone on their own before the next
+    batch, and the cursor only moves past CVs with none of those before
+    them."""
+    breaker = get_cv_parser().llm_caller.breaker
+    scheduler = get_scheduler("parse")
+    batch: List[Tuple[str, str]] = []
+    todo: List[Tuple[str, str]] = []
+    while True:
+        if not todo:
+            batch = await run_in_threadpool(_next_batch, job_id, owner)
+            if batch is None:
+                logger.info("Re-parse job %s was cancelled or taken over", job_id)
+                return
+            if not batch:
+                await run_in_threadpool(_finish, job_id, owner, COMPLETED)
+                logger.info("Re-parse job %s completed", job_id)
+                return
+            todo = batch
+
+        # Yield to live traffic: wait out an open circuit or a full parse queue
+        wait = settings.LLM_BREAKER_RESET_SECONDS if breaker.is_open else 0
+        reservation = None
+        if not wait:
+            try:
+                reservation = scheduler.check(REPARSE_TENANT, len(todo))
+            except SchedulerBusy as e:
+                wait = e.retry_after
+        if wait:
+            if not await run_in_threadpool(_renew, job_id, owner):
+                return
+            await asyncio.sleep(wait)
+            continue
+
+        with reservation:
+            outcomes = await asyncio.gather(*(_parse(reservation, *row) for row in todo), return_exceptions=True)
+        results = []
+        deferred: Optional[CircuitOpen] = None
+        deferred_rows = []
+        for row, outcome in zip(todo, outcomes):
+            if isinstance(outcome, CircuitOpen):
+                # Never tried: redo it once the circuit closes. The parses
+                # around it ran concurrently and their results are kept
+                deferred = outcome
+                deferred_rows.append(row)
+                continue
+            if isinstance(outcome, BaseException) and not isinstance(outcome, Exception):
+                raise outcome
+            results.append((row[0], outcome))
+        REPARSE_CVS.labels("deferred").inc(len(deferred_rows))
+        todo = deferred_rows
+        cursor = None
+        for cv_id, _ in batch:
+            if todo and cv_id == todo[0][0]:
+                break
+            cursor = cv_id
+        saved = await run_in_threadpool(_save_batch, job_id, owner, results, cursor) if results else await run_in_threadpool(
+            _renew, job_id, owner
+        )
+        if not saved:
+            logger.info("Re-parse job %s was taken over", job_id)
+            return
+        if deferred is not None:
+            await asyncio.sleep(min(max(deferred.retry_in, 1), settings.LLM_BREAKER_RESET_SECONDS))
+
+
+async def reparse_loop():
+    """Run pending re-parse jobs (and take over those of dead workers) until
+    cancelled, checking every REPARSE_POLL_SECONDS or when woken."""
+    global _wakeup
+    _wakeup = asyncio.Event()
+    owner = str(uuid.uuid4())
+    while True:
+        job_id = None
+        try:
+            job_id = await run_in_threadpool(_claim_job, owner)
+            if job_id:
+                logger.info("Running re-parse job %s", job_id)
+                await run_job(job_id, owner)
+                continue
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception("Re-parse job %s failed", job_id)
+            if job_id:
+                await run_in_threadpool(_finish, job_id, owner, FAILED, str(e)[:1000])
+        try:
+            await asyncio.wait_for(_wakeup.wait(), settings.REPARSE_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup.clear()
+
+
+def wake_reparse_worker():
+    """Start a newly created job now instead of at the next poll."""
+    if _wakeup is not None:
+        _wakeup.set()
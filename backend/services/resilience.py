@@ -0,0 +1,307 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from functools import lru_cache
+from typing import AsyncIterator, Awaitable, Callable, Optional, Tuple, Type, TypeVar
+from ..metrics import CIRCUIT_REJECTIONS, CIRCUIT_STATE, LLM_ATTEMPTS, LLM_HEDGES
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+@lru_cache(maxsize=None)
+def transient_errors() -> Tuple[Type[BaseException], ...]:
+    """Errors worth retrying: the provider was slow, unreachable or
+    overloaded. Anything else (bad request, auth, unparseable output) fails
+    immediately. Resolved on first use, as the OpenAI SDK is slow to import
+    (``except`` clauses only evaluate it once something was raised)."""
+    try:
+        import openai
+    except ImportError:  # pragma: no cover - optional dependency
+        return asyncio.TimeoutError, ConnectionError
+    return (
+        asyncio.TimeoutError,
+        ConnectionError,
+        openai.APIConnectionError,  # includes APITimeoutError
+        openai.RateLimitError,
+        openai.InternalServerError,
+    )
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpen(Exception):
+    """The dependency is failing; the call was refused without trying it."""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} circuit is open, retry in {retry_in:.0f}s")
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Fails fast after ``failure_threshold`` consecutive transient failures.
+
+    After ``reset_seconds`` open, a single probe call is let through
+    (half-open); its success closes the circuit and its failure opens it
+    again for another ``reset_seconds``.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        CIRCUIT_STATE.labels(name).set(_STATE_VALUES[CLOSED])
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == OPEN and time.monotonic() - self._opened_at < self.reset_seconds
+
+    def allow(self):
+        """Raise CircuitOpen unless a call may go through now."""
+        if self.state == OPEN:
+            remaining = self.reset_seconds - (time.monotonic() - self._opened_at)
+            if remaining > 0:
+                CIRCUIT_REJECTIONS.labels(self.name).inc()
+                raise CircuitOpen(self.name, remaining)
+            self._set_state(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self._probing:
+                CIRCUIT_REJECTIONS.labels(self.name).inc()
+                raise CircuitOpen(self.name, self.reset_seconds)
+            self._probing = True
+
+    def record_success(self):
+        self._failures = 0
+        self._probing = False
+        if self.state != CLOSED:
+            self._set_state(CLOSED)
+
+    def record_failure(self):
+        self._failures += 1
+        self._probing = False
+        if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            self._set_state(OPEN)
+
+    def release(self):
+        """Give up a half-open probe that ended without a verdict (e.g. a
+        non-transient error or cancellation)."""
+        self._probing = False
+
+    def _set_state(self, state: str):
+        if state == OPEN:
+            logger.warning("%s circuit opened after %d failures", self.name, self._failures)
+        elif self.state != CLOSED and state == CLOSED:
+            logger.info("%s circuit closed", self.name)
+        self.state = state
+        CIRCUIT_STATE.labels(self.name).set(_STATE_VALUES[state])
+
+
+class LatencyTracker:
+    """Rolling window of successful call durations."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self._samples = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """The ``q`` quantile, or None until there are enough samples."""
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+async def _aclose(iterator: AsyncIterator):
+    """Close an async iterator (if it can be closed), so an abandoned
+    streamed response doesn't hold on to its connection."""
+    aclose = getattr(iterator, "aclose", None)
+    if aclose is None:
+        return
+    try:
+        await aclose()
+    except Exception as e:
+        logger.debug("Closing a stream failed: %s", e)
+
+
+class ResilientCaller:
+    """Runs an async call with a deadline, jittered retries, an optional
+    hedged duplicate and a circuit breaker.
+
+    - Every attempt gets ``attempt_timeout`` seconds, and all attempts
+      together ``deadline`` seconds.
+    - Transient failures are retried up to ``max_attempts`` times with full
+      jitter exponential backoff (``backoff_base`` doubling, at most
+      ``backoff_max``).
+    - With ``hedge`` on, an attempt still running after the p95 latency of
+      recent calls (at least ``hedge_min_delay``) gets a duplicate request;
+      the first to succeed wins and the other is cancelled.
+    - Transient failures count towards the breaker, and an open breaker
+      refuses calls with CircuitOpen.
+    """
+
+    def __init__(
+            self,
+            breaker: CircuitBreaker,
+            deadline: float,
+            attempt_timeout: float,
+            max_attempts: int,
+            backoff_base: float,
+            backoff_max: float,
+            hedge: bool = False,
+            hedge_min_delay: float = 0.0
+    ):
+        self.breaker = breaker
+        self.deadline = deadline
+        self.attempt_timeout = attempt_timeout
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.latency = LatencyTracker()
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        give_up_at = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            attempt += 1
+            self.breaker.allow()
+            timeout = min(self.attempt_timeout, give_up_at - time.monotonic())
+            try:
+                result = await self._attempt(fn, timeout)
+            except transient_errors() as e:
+                await self._backoff(e, attempt, give_up_at)
+                continue
+            except BaseException:
+                self._no_verdict()
+                raise
+            self._succeeded()
+            return result
+
+    async def stream(self, fn: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+        """Like ``call`` for a streamed response. ``attempt_timeout`` limits
+        the wait for the first chunk, and failures before it are retried;
+        once chunks are flowing the stream can only fail, within
+        ``deadline``. Streams are not hedged."""
+        give_up_at = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            attempt += 1
+            self.breaker.allow()
+            iterator = fn().__aiter__()
+            timeout = min(self.attempt_timeout, give_up_at - time.monotonic())
+            streaming = False
+            try:
+                first = await asyncio.wait_for(iterator.__anext__(), timeout)
+                streaming = True
+            except StopAsyncIteration:
+                self._succeeded()
+                return
+            except transient_errors() as e:
+                error = e
+            except BaseException:
+                self._no_verdict()
+                raise
+            finally:
+                # A failed attempt's response is abandoned: release its
+                # connection before backing off
+                if not streaming:
+                    await _aclose(iterator)
+            if streaming:
+                break
+            await self._backoff(error, attempt, give_up_at)
+
+        try:
+            yield first
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(iterator.__anext__(), give_up_at - time.monotonic())
+                except StopAsyncIteration:
+                    break
+                yield chunk
+        except transient_errors() as e:
+            self._failed(e)
+            raise
+        except BaseException:
+            # Includes the consumer closing the stream early
+            self._no_verdict()
+            raise
+        finally:
+            await _aclose(iterator)
+        self._succeeded()
+
+    def _succeeded(self):
+        self.breaker.record_success()
+        LLM_ATTEMPTS.labels("success").inc()
+
+    def _no_verdict(self):
+        # Not the dependency's fault (bad input, cancelled): doesn't count
+        self.breaker.release()
+        LLM_ATTEMPTS.labels("failed").inc()
+
+    def _failed(self, error: BaseException) -> str:
+        self.breaker.record_failure()
+        outcome = "timeout" if isinstance(error, asyncio.TimeoutError) else "error"
+        LLM_ATTEMPTS.labels(outcome).inc()
+        return outcome
+
+    async def _backoff(self, error: BaseException, attempt: int, give_up_at: float):
+        """Record a transient failure and sleep before the next attempt, or
+        re-raise it when out of attempts or time."""
+        outcome = self._failed(error)
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+        if attempt >= self.max_attempts or time.monotonic() + delay >= give_up_at:
+            raise error
+        logger.info("%s attempt %d failed (%s), retrying in %.1fs", self.breaker.name, attempt, outcome, delay)
+        await asyncio.sleep(delay)
+
+    async def _attempt(self, fn: Callable[[], Awaitable[T]], timeout: float) -> T:
+        hedge_delay = self._hedge_delay()
+        if hedge_delay is None or hedge_delay >= timeout:
+            return await self._timed(fn, timeout)
+
+        primary = asyncio.ensure_future(self._timed(fn, timeout))
+        done, _ = await asyncio.wait({primary}, timeout=hedge_delay)
+        if done:
+            return primary.result()
+
+        LLM_HEDGES.labels("issued").inc()
+        hedged = asyncio.ensure_future(self._timed(fn, timeout - hedge_delay))
+        pending = {primary, hedged}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedged:
+                            LLM_HEDGES.labels("won").inc()
+                        return task.result()
+            # Both failed: report the primary's error
+            return primary.result()
+        finally:
+            for task in (primary, hedged):
+                task.cancel()
+
+    async def _timed(self, fn: Callable[[], Awaitable[T]], timeout: float) -> T:
+        started = time.monotonic()
+        result = await asyncio.wait_for(fn(), timeout)
+        self.latency.record(time.monotonic() - started)
+        return result
+
+    def _hedge_delay(self) -> Optional[float]:
+        if not self.hedge:
+            return None
+        p95 = self.latency.quantile(0.95)
+        return None if p95 is None else max(p95, self.hedge_min_delay)
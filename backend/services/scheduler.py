@@ -0,0 +1,264 @@
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Deque, Dict, Iterable, Optional
+from ..config import settings
+from ..metrics import SCHEDULER_REJECTIONS, TENANT_QUEUE_DEPTH, TENANT_QUEUE_WAIT
+
+# Service time assumed for Retry-After until a job has completed
+DEFAULT_SERVICE_SECONDS = 5.0
+MAX_RETRY_AFTER_SECONDS = 300
+
+
+class SchedulerBusy(Exception):
+    """The tenant (or everyone) already has too much work queued."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TooManyJobs(ValueError):
+    """More jobs in one request than the queue limit: waiting can't help."""
+
+    def __init__(self, message: str, limit: int):
+        super().__init__(message)
+        self.limit = limit
+
+
+class Reservation:
+    """Queue places admitted by ``FairScheduler.check`` for a request's jobs.
+    Each job queued through ``slot`` takes one; ``release`` (or leaving the
+    ``with`` block) gives back those of jobs that were never queued."""
+
+    def __init__(self, scheduler: "FairScheduler", tenant_id: str, count: int):
+        self.scheduler = scheduler
+        self.tenant_id = tenant_id
+        self.remaining = count
+
+    def slot(self, cost: float = 1.0):
+        return self.scheduler.slot(self.tenant_id, cost, reservation=self)
+
+    def release(self):
+        if self.remaining:
+            self.scheduler._unreserve(self.tenant_id, self.remaining)
+            self.remaining = 0
+
+    def __enter__(self) -> "Reservation":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class _Waiter:
+    __slots__ = ("future", "start_tag", "enqueued_at")
+
+    def __init__(self, future: asyncio.Future, start_tag: float):
+        self.future = future
+        self.start_tag = start_tag
+        self.enqueued_at = time.monotonic()
+
+
+class _Tenant:
+    __slots__ = ("waiting", "running", "finish_tag")
+
+    def __init__(self):
+        self.waiting: Deque[_Waiter] = deque()
+        self.running = 0
+        # Virtual finish time of the tenant's last queued job
+        self.finish_tag = 0.0
+
+
+class FairScheduler:
+    """Weighted fair sharing of a worker's slots for one kind of work.
+
+    Jobs wait in per-user queues and are started in order of their virtual
+    start time (start-time fair queuing): each job advances its user's
+    virtual clock by cost / weight, so a user with hundreds of queued CVs
+    gets the same share of slots as a user with one, and a weight-2 user gets
+    twice the share of a weight-1 user while both have work queued. Users
+    idle for a while don't bank credit. No user runs more than
+    ``tenant_concurrency`` jobs at once, even when slots are free.
+
+    ``check`` is the admission control: call it before queuing a request's
+    jobs and turn SchedulerBusy into a 429 (TooManyJobs, for a request that
+    could never fit, into a 413). It reserves the jobs' queue
+    places, so concurrent requests can't all pass it before any of them has
+    queued; queue the jobs through the returned Reservation. ``slot`` itself
+    never rejects.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            concurrency: int,
+            tenant_concurrency: int,
+            max_queued: int,
+            tenant_max_queued: int,
+            weights: Optional[Dict[str, float]] = None,
+            metrics_tenants: Iterable[str] = ()
+    ):
+        self.name = name
+        self.concurrency = concurrency
+        self.tenant_concurrency = tenant_concurrency
+        self.max_queued = max_queued
+        self.tenant_max_queued = tenant_max_queued
+        self.weights = weights or {}
+        self.metrics_tenants = frozenset(metrics_tenants)
+        self._tenants: Dict[str, _Tenant] = {}
+        self._running = 0
+        self._queued = 0
+        # Admitted jobs not queued yet, counted as queued by check
+        self._reserved: Dict[str, int] = {}
+        self._reserved_total = 0
+        self._virtual_time = 0.0
+        self._service_seconds: Optional[float] = None
+
+    def weight(self, tenant_id: str) -> float:
+        return max(self.weights.get(tenant_id, 1.0), 0.01)
+
+    def _metric_tenant(self, tenant_id: str) -> str:
+        # A label per user would grow without bound (and expose user ids)
+        return tenant_id if tenant_id in self.metrics_tenants else "other"
+
+    def check(self, tenant_id: str, count: int = 1) -> Reservation:
+        """Reserve queue places for ``count`` more jobs, or raise
+        SchedulerBusy if that would exceed the tenant's or the worker's
+        queue limit, or TooManyJobs if ``count`` alone exceeds it."""
+        limit = min(self.tenant_max_queued, self.max_queued)
+        if count > limit:
+            raise TooManyJobs(f"At most {limit} {self.name} jobs can be queued per request, not {count}", limit)
+        tenant = self._tenants.get(tenant_id) or _Tenant()
+        pending = len(tenant.waiting) + self._reserved.get(tenant_id, 0)
+        tenant_queued = pending + count
+        if tenant_queued > self.tenant_max_queued:
+            SCHEDULER_REJECTIONS.labels(self.name, "tenant").inc()
+            raise SchedulerBusy(
+                f"Too many {self.name} jobs queued ({pending} waiting, limit {self.tenant_max_queued})",
+                self._retry_after(tenant_queued + tenant.running, min(self.tenant_concurrency, self.concurrency))
+            )
+        queued = self._queued + self._reserved_total + count
+        if queued > self.max_queued:
+            SCHEDULER_REJECTIONS.labels(self.name, "global").inc()
+            raise SchedulerBusy(
+                f"The {self.name} queue is full, try again later",
+                self._retry_after(queued, self.concurrency)
+            )
+        self._reserved[tenant_id] = self._reserved.get(tenant_id, 0) + count
+        self._reserved_total += count
+        return Reservation(self, tenant_id, count)
+
+    def _unreserve(self, tenant_id: str, count: int):
+        self._reserved_total -= count
+        remaining = self._reserved[tenant_id] - count
+        if remaining:
+            self._reserved[tenant_id] = remaining
+        else:
+            del self._reserved[tenant_id]
+
+    def _retry_after(self, jobs: int, parallelism: int) -> int:
+        service_seconds = self._service_seconds or DEFAULT_SERVICE_SECONDS
+        seconds = math.ceil(service_seconds * jobs / max(parallelism, 1))
+        return min(max(seconds, 1), MAX_RETRY_AFTER_SECONDS)
+
+    @asynccontextmanager
+    async def slot(self, tenant_id: str, cost: float = 1.0, reservation: Optional[Reservation] = None):
+        """Wait for a slot for one job of ``tenant_id`` and hold it; the job
+        takes one of the ``reservation``'s places, if it has any left."""
+        await self._acquire(tenant_id, cost, reservation)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(tenant_id)
+            elapsed = time.monotonic() - started
+            # Smoothed service time, for Retry-After estimates
+            self._service_seconds = elapsed if self._service_seconds is None else 0.8 * self._service_seconds + 0.2 * elapsed
+
+    async def _acquire(self, tenant_id: str, cost: float, reservation: Optional[Reservation]):
+        if reservation is not None and reservation.remaining:
+            # The place moves from reserved to queued
+            reservation.remaining -= 1
+            self._unreserve(tenant_id, 1)
+        tenant = self._tenants.get(tenant_id)
+        if tenant is None:
+            tenant = self._tenants[tenant_id] = _Tenant()
+        start_tag = max(self._virtual_time, tenant.finish_tag)
+        tenant.finish_tag = start_tag + cost / self.weight(tenant_id)
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), start_tag)
+        tenant.waiting.append(waiter)
+        self._queued += 1
+        TENANT_QUEUE_DEPTH.labels(self.name, self._metric_tenant(tenant_id)).inc()
+        self._dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Cancelled right after being granted the slot: hand it back
+                self._release(tenant_id)
+            else:
+                tenant.waiting.remove(waiter)
+                self._queued -= 1
+                TENANT_QUEUE_DEPTH.labels(self.name, self._metric_tenant(tenant_id)).dec()
+                self._forget_if_idle(tenant_id)
+            raise
+        TENANT_QUEUE_WAIT.labels(self.name, self._metric_tenant(tenant_id)).observe(time.monotonic() - waiter.enqueued_at)
+
+    def _release(self, tenant_id: str):
+        self._tenants[tenant_id].running -= 1
+        self._running -= 1
+        self._forget_if_idle(tenant_id)
+        self._dispatch()
+
+    def _dispatch(self):
+        while self._running < self.concurrency:
+            tenant_id, tenant = None, None
+            for candidate_id, candidate in self._tenants.items():
+                if not candidate.waiting or candidate.running >= self.tenant_concurrency:
+                    continue
+                if tenant is None or candidate.waiting[0].start_tag < tenant.waiting[0].start_tag:
+                    tenant_id, tenant = candidate_id, candidate
+            if tenant is None:
+                return
+            waiter = tenant.waiting.popleft()
+            self._queued -= 1
+            TENANT_QUEUE_DEPTH.labels(self.name, self._metric_tenant(tenant_id)).dec()
+            self._virtual_time = max(self._virtual_time, waiter.start_tag)
+            tenant.running += 1
+            self._running += 1
+            waiter.future.set_result(None)
+
+    def _forget_if_idle(self, tenant_id: str):
+        tenant = self._tenants.get(tenant_id)
+        if tenant and not tenant.waiting and not tenant.running:
+            del self._tenants[tenant_id]
+
+
+@lru_cache(maxsize=None)
+def get_scheduler(name: str) -> FairScheduler:
+    """The worker's scheduler for "parse" (LLM) or "render" (PDF) work."""
+    if name == "parse":
+        return FairScheduler(
+            name,
+            settings.PARSE_CONCURRENCY,
+            settings.PARSE_TENANT_CONCURRENCY,
+            settings.PARSE_MAX_QUEUED,
+            settings.PARSE_TENANT_MAX_QUEUED,
+            settings.TENANT_WEIGHTS,
+            settings.METRICS_TENANTS
+        )
+    if name == "render":
+        return FairScheduler(
+            name,
+            settings.RENDER_CONCURRENCY,
+            settings.RENDER_TENANT_CONCURRENCY,
+            settings.RENDER_MAX_QUEUED,
+            settings.RENDER_TENANT_MAX_QUEUED,
+            settings.TENANT_WEIGHTS,
+            settings.METRICS_TENANTS
+        )
+    raise ValueError(f"Unknown scheduler: {name}")
@@ -0,0 +1,201 @@
+import hashlib
+import json
+import logging
+import os
+import re
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..models import CV
+from .cv_parser import extract_text
+from .storage import get_blob_store
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TAXONOMY_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "skills.json")
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize(text: str) -> str:
+    """Lowercase with whitespace runs collapsed, for text and aliases alike."""
+    return _WHITESPACE.sub(" ", text.lower())
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class AhoCorasick:
+    """Aho-Corasick automaton over a set of patterns, compiled to a DFA so
+    that scanning costs one dict lookup per character, however many
+    patterns there are."""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = []
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[List[int]] = [[]]
+        for pattern in patterns:
+            state = 0
+            for char in pattern:
+                following = goto[state].get(char)
+                if following is None:
+                    following = len(goto)
+                    goto[state][char] = following
+                    goto.append({})
+                    outputs.append([])
+                state = following
+            outputs[state].append(len(self.patterns))
+            self.patterns.append(pattern)
+
+        # Breadth-first, so a state's failure state is complete before its
+        # children are visited: each state's transitions are its failure
+        # state's, overridden by its own trie edges
+        fail = [0] * len(goto)
+        self._delta: List[Dict[str, int]] = [dict(goto[0])] + [{} for _ in goto[1:]]
+        queue = list(goto[0].values())
+        for state in queue:
+            self._delta[state] = {**self._delta[fail[state]], **goto[state]}
+            outputs[state] = outputs[state] + outputs[fail[state]]
+            for char, child in goto[state].items():
+                fail[child] = self._delta[fail[state]].get(char, 0)
+                queue.append(child)
+        self._outputs: List[Tuple[int, ...]] = [tuple(output) for output in outputs]
+
+    def search(self, text: str) -> Iterator[Tuple[int, int]]:
+        """(end, pattern index) of every occurrence, overlapping ones included."""
+        delta = self._delta
+        outputs = self._outputs
+        state = 0
+        for end, char in enumerate(text, 1):
+            state = delta[state].get(char, 0)
+            if outputs[state]:
+                for index in outputs[state]:
+                    yield end, index
+
+
+class SkillTagger:
+    """Canonical skill IDs found in text, from a taxonomy of skills and
+    their aliases. Only aliases are matched in text (names like "Go" or
+    "Express" are too ambiguous); matches must stand alone as words ("java"
+    doesn't match in "javascript"), and where matches overlap the longest
+    wins ("react native" is React Native, not React)."""
+
+    def __init__(self, taxonomy: Dict[str, Any]):
+        self.skills: Dict[str, Dict[str, Any]] = {}
+        self._aliases: Dict[str, str] = {}
+        self._names: Dict[str, str] = {}
+        for skill in taxonomy["skills"]:
+            self.skills[skill["id"]] = skill
+            self._names[skill["id"]] = self._names[normalize(skill["name"]).strip()] = skill["id"]
+            for alias in skill["aliases"]:
+                self._aliases.setdefault(normalize(alias).strip(), skill["id"])
+        self._automaton = AhoCorasick(self._aliases)
+        self._skill_of = [self._aliases[pattern] for pattern in self._automaton.patterns]
+        # Identifies the aliases matched; stored as CV.skills_version so CVs
+        # tagged with another taxonomy can be found and re-tagged
+        self.version = hashlib.sha256(
+            json.dumps(sorted(self._aliases.items())).encode("utf-8")
+        ).hexdigest()[:16]
+
+    def resolve(self, name: str) -> Optional[str]:
+        """The skill ID an ID, name or alias stands for, e.g. "JS" -> "javascript"."""
+        name = normalize(name).strip()
+        return self._aliases.get(name) or self._names.get(name)
+
+    def find(self, text: str) -> List[Tuple[int, int, str]]:
+        """(start, end, skill ID) of the skills in normalized text, leftmost
+        longest, without overlaps."""
+        patterns = self._automaton.patterns
+        matches = []
+        for end, index in self._automaton.search(text):
+            start = end - len(patterns[index])
+            if start > 0 and _is_word_char(text[start - 1]) and _is_word_char(text[start]):
+                continue
+            if end < len(text) and _is_word_char(text[end]) and _is_word_char(text[end - 1]):
+                continue
+            matches.append((start, end, self._skill_of[index]))
+        matches.sort(key=lambda match: (match[0], match[0] - match[1]))
+        kept = []
+        covered = 0
+        for match in matches:
+            if match[0] >= covered:
+                kept.append(match)
+                covered = match[1]
+        return kept
+
+    def tag(self, *texts: str) -> List[str]:
+        """Sorted IDs of the skills mentioned in any of ``texts``, all scanned
+        in one pass."""
+        text = normalize("\n".join(text for text in texts if text))
+        return sorted({skill_id for _, _, skill_id in self.find(text)})
+
+
+def _strings(value: Any) -> Iterator[str]:
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _strings(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _strings(item)
+
+
+def parsed_text(parsed_data: Any) -> str:
+    """The LLM output's text (skills, responsibilities, summary...) in one string."""
+    return "\n".join(_strings(parsed_data))
+
+
+def tag_skills(cv: CV, text: str = ""):
+    """Tag the CV with the skills in its extracted text (when at hand) and
+    its parsed data."""
+    tagger = get_skill_tagger()
+    cv.skill_ids = tagger.tag(text, parsed_text(cv.parsed_data))
+    cv.skills_version = tagger.version
+
+
+def _file_text(cv: CV) -> str:
+    blob_store = get_blob_store()
+    key = blob_store.key_for(cv.file_url)
+    if key is None:
+        return ""
+    try:
+        return extract_text(cv.file_url, blob_store.backend.get(key))
+    except Exception as e:
+        logger.warning("Could not read CV %s for skill tagging: %s", cv.id, e)
+        return ""
+
+
+def retag_cvs(db: Session, retag_all: bool = False, read_files: bool = True, batch_size: int = 200) -> int:
+    """Re-tag parsed CVs tagged with another taxonomy version (or all of
+    them), committing batch by batch; no LLM calls. With ``read_files`` the
+    text is extracted from the stored files again, as at upload; otherwise
+    only parsed_data is scanned."""
+    tagger = get_skill_tagger()
+    retagged = 0
+    cursor = ""
+    while True:
+        query = db.query(CV).filter(CV.parsed_data.isnot(None), CV.id > cursor)
+        if not retag_all:
+            query = query.filter(or_(CV.skills_version.is_(None), CV.skills_version != tagger.version))
+        cvs = query.order_by(CV.id).limit(batch_size).all()
+        if not cvs:
+            return retagged
+        for cv in cvs:
+            tag_skills(cv, _file_text(cv) if read_files else "")
+        db.commit()
+        retagged += len(cvs)
+        cursor = cvs[-1].id
+
+
+def load_taxonomy(path: Optional[str] = None) -> Dict[str, Any]:
+    with open(path or settings.SKILL_TAXONOMY_PATH or DEFAULT_TAXONOMY_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=None)
+def get_skill_tagger() -> SkillTagger:
+    return SkillTagger(load_taxonomy())
@@ -0,0 +1,368 @@
+import hashlib
+import logging
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from fastapi import UploadFile
+from sqlalchemy import event, func, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from ..config import settings
+from ..metrics import stage
+from ..models import Blob
+
+logger = logging.getLogger(__name__)
+
+BLOB_PREFIX = "blobs/"
+
+
+class StorageBackend(ABC):
+    """Flat key/value file storage. Keys are relative, "/"-separated paths."""
+
+    @abstractmethod
+    def put(self, key: str, data: bytes) -> None:
+        ...
+
+    @abstractmethod
+    def get(self, key: str) -> bytes:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def size(self, key: str) -> int:
+        ...
+
+    @abstractmethod
+    def modified_at(self, key: str) -> float:
+        """Last modification time as a Unix timestamp."""
+
+    @abstractmethod
+    def iter_keys(self, prefix: str = "") -> Iterator[str]:
+        ...
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Filesystem path of the object, or None for remote backends."""
+        return None
+
+
+class LocalStorageBackend(StorageBackend):
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    def _path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, *key.split("/")))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def put(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # Write to a temp file and rename so readers never see partial blobs
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def get(self, key: str) -> bytes:
+        with open(self._path(key), "rb") as f:
+            return f.read()
+
+    def delete(self, key: str) -> None:
+        path = self._path(key)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def size(self, key: str) -> int:
+        return os.path.getsize(self._path(key))
+
+    def modified_at(self, key: str) -> float:
+        return os.path.getmtime(self._path(key))
+
+    def iter_keys(self, prefix: str = "") -> Iterator[str]:
+        start = self._path(prefix) if prefix else self.root
+        for directory, _, filenames in os.walk(start):
+            for filename in filenames:
+                if filename.startswith(".tmp-"):
+                    continue
+                path = os.path.join(directory, filename)
+                yield os.path.relpath(path, self.root).replace(os.sep, "/")
+
+    def local_path(self, key: str) -> Optional[str]:
+        return self._path(key)
+
+
+class S3StorageBackend(StorageBackend):
+    """S3-compatible backend. Point S3_ENDPOINT_URL at MinIO or a moto server
+    to run against a local stand-in."""
+
+    def __init__(
+            self,
+            bucket: str,
+            prefix: str = "",
+            endpoint_url: Optional[str] = None,
+            region: Optional[str] = None,
+            access_key_id: Optional[str] = None,
+            secret_access_key: Optional[str] = None
+    ):
+        try:
+            import boto3
+            from botocore.exceptions import ClientError
+        except ImportError as e:
+            raise RuntimeError("STORAGE_BACKEND=s3 needs boto3 (pip install boto3)") from e
+
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url or None,
+            region_name=region or None,
+            aws_access_key_id=access_key_id or None,
+            aws_secret_access_key=secret_access_key or None,
+        )
+        self.client_error = ClientError
+
+    def put(self, key: str, data: bytes) -> None:
+        self.client.put_object(Bucket=self.bucket, Key=self.prefix + key, Body=data)
+
+    def get(self, key: str) -> bytes:
+        return self.client.get_object(Bucket=self.bucket, Key=self.prefix + key)["Body"].read()
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self.prefix + key)
+
+    def _head(self, key: str) -> Optional[dict]:
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self.prefix + key)
+        except self.client_error as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    def exists(self, key: str) -> bool:
+        return self._head(key) is not None
+
+    def size(self, key: str) -> int:
+        head = self._head(key)
+        if head is None:
+            raise FileNotFoundError(key)
+        return head["ContentLength"]
+
+    def modified_at(self, key: str) -> float:
+        head = self._head(key)
+        if head is None:
+            raise FileNotFoundError(key)
+        return head["LastModified"].timestamp()
+
+    def iter_keys(self, prefix: str = "") -> Iterator[str]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix + prefix):
+            for item in page.get("Contents", []):
+                yield item["Key"][len(self.prefix):]
+
+
+def blob_key(digest: str, extension: str) -> str:
+    """Sharded key of a content-addressed blob, e.g. blobs/ab/cd/abcd...pdf"""
+    return f"{BLOB_PREFIX}{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+
+
+class BlobStore:
+    """Content-addressed, reference-counted files on top of a StorageBackend.
+
+    Identical uploads share one blob; each save adds a reference and each
+    release drops one. A blob is deleted once the transaction that drops its
+    last reference commits. Stored URLs keep the "<UPLOAD_DIR>/<key>" form so
+    they can be served from /uploads.
+    """
+
+    def __init__(self, backend: StorageBackend, url_prefix: str):
+        self.backend = backend
+        self.url_prefix = url_prefix.strip("/")
+
+    def url(self, key: str) -> str:
+        return f"{self.url_prefix}/{key}"
+
+    def key_for(self, url: Optional[str]) -> Optional[str]:
+        if not url or url.startswith(("http://", "https://")):
+            return None
+        path = url.lstrip("/")
+        if path.startswith(self.url_prefix + "/"):
+            return path[len(self.url_prefix) + 1:]
+        return None
+
+    def local_path(self, url: Optional[str]) -> Optional[str]:
+        key = self.key_for(url)
+        return self.backend.local_path(key) if key else None
+
+    async def read(self, url: str) -> bytes:
+        key = self.key_for(url)
+        if key is None:
+            raise FileNotFoundError(url)
+        return await run_in_threadpool(self.backend.get, key)
+
+    async def save_upload(self, db: Session, file: UploadFile) -> Tuple[str, bytes]:
+        content = await file.read()
+        return await self.save(db, content, file.filename), content
+
+    async def store(self, content: bytes, filename: str) -> str:
+        """Write a blob's file unless it is already stored, and return its
+        key. No reference is added (see add_reference)."""
+        extension = os.path.splitext(filename or "")[1].lower()
+        key = blob_key(hashlib.sha256(content).hexdigest(), extension)
+        with stage("upload_write"):
+            # Also heals blobs whose file went missing (e.g. removed by hand)
+            if not await run_in_threadpool(self.backend.exists, key):
+                await run_in_threadpool(self.backend.put, key, content)
+        return key
+
+    def add_reference(self, db: Session, key: str, size: int) -> str:
+        """Reference a stored blob and return its URL. The blob's row stays
+        locked until the transaction ends, so commit without awaiting
+        anything else first (on SQLite the whole database is locked)."""
+        if not self._add_reference(db, key):
+            try:
+                with db.begin_nested():
+                    db.add(Blob(key=key, size=size, ref_count=1))
+            except IntegrityError:
+                # Another request stored the same content concurrently
+                self._add_reference(db, key)
+        return self.url(key)
+
+    async def save(self, db: Session, content: bytes, filename: str) -> str:
+        """Store the file and reference it; commit soon (see add_reference)."""
+        key = await self.store(content, filename)
+        return self.add_reference(db, key, len(content))
+
+    async def release(self, db: Session, url: Optional[str]) -> None:
+        key = self.key_for(url)
+        if key is None:
+            return
+        if not key.startswith(BLOB_PREFIX):
+            # Uploads stored before content addressing have exactly one owner
+            self._delete_after_commit(db, key)
+            return
+
+        db.execute(update(Blob).where(Blob.key == key).values(ref_count=Blob.ref_count - 1))
+        remaining = db.query(Blob.ref_count).filter(Blob.key == key).scalar()
+        if remaining is not None and remaining <= 0:
+            db.query(Blob).filter(Blob.key == key, Blob.ref_count <= 0).delete(synchronize_session=False)
+            self._delete_after_commit(db, key)
+
+    def release_many(self, db: Session, urls: Iterable[Optional[str]]) -> List[str]:
+        """Drop one reference per URL with a few set-based statements.
+
+        Unlike ``release``, nothing is deleted on commit: the keys whose last
+        reference went are returned, to be passed to ``delete_keys`` once the
+        transaction has committed (e.g. in a background task).
+        """
+        references: Dict[str, int] = defaultdict(int)
+        to_delete = []
+        for url in urls:
+            key = self.key_for(url)
+            if key is None:
+                continue
+            if key.startswith(BLOB_PREFIX):
+                references[key] += 1
+            else:
+                # Uploads stored before content addressing have exactly one owner
+                to_delete.append(key)
+        if not references:
+            return to_delete
+
+        by_count: Dict[int, List[str]] = defaultdict(list)
+        for key, count in references.items():
+            by_count[count].append(key)
+        for count, keys in by_count.items():
+            db.execute(update(Blob).where(Blob.key.in_(keys)).values(ref_count=Blob.ref_count - count))
+        unreferenced = [
+            key for (key,) in db.query(Blob.key).filter(Blob.key.in_(list(references)), Blob.ref_count <= 0)
+        ]
+        if unreferenced:
+            db.query(Blob).filter(Blob.key.in_(unreferenced), Blob.ref_count <= 0).delete(synchronize_session=False)
+        return to_delete + unreferenced
+
+    def release_committed(self, db: Session, urls: Iterable[Optional[str]]):
+        """Undo references already committed by work that then failed: drop
+        them in a transaction of their own and delete the files left
+        unreferenced (blocking)."""
+        db.rollback()
+        keys = self.release_many(db, urls)
+        db.commit()
+        self.delete_keys(keys)
+
+    def delete_keys(self, keys: List[str]):
+        """Delete files (blocking); failures are logged and left to the sweeper."""
+        with stage("blob_delete"):
+            for key in keys:
+                try:
+                    self.backend.delete(key)
+                except Exception:
+                    logger.exception("Failed to delete blob %s", key)
+
+    def _add_reference(self, db: Session, key: str) -> bool:
+        result = db.execute(update(Blob).where(Blob.key == key).values(
+            ref_count=Blob.ref_count + 1, last_referenced_at=func.now()
+        ))
+        return result.rowcount > 0
+
+    def _delete_after_commit(self, db: Session, key: str):
+        if not event.contains(db, "after_commit", self._purge):
+            event.listen(db, "after_commit", self._purge)
+            event.listen(db, "after_rollback", self._discard)
+        db.info.setdefault("blob_deletes", set()).add(key)
+
+    def _purge(self, db: Session):
+        for key in db.info.pop("blob_deletes", set()):
+            try:
+                self.backend.delete(key)
+            except Exception:
+                logger.exception("Failed to delete blob %s", key)
+
+    def _discard(self, db: Session):
+        db.info.pop("blob_deletes", None)
+
+
+def generated_path(user_id: str, filename: str) -> str:
+    """Local path for a generated artifact (rendered PDFs are node-local)."""
+    directory = os.path.join(settings.UPLOAD_DIR, "generated", user_id)
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, filename)
+
+
+@lru_cache(maxsize=None)
+def get_storage_backend() -> StorageBackend:
+    if settings.STORAGE_BACKEND == "s3":
+        return S3StorageBackend(
+            bucket=settings.S3_BUCKET,
+            prefix=settings.S3_PREFIX,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region=settings.S3_REGION,
+            access_key_id=settings.S3_ACCESS_KEY_ID,
+            secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+        )
+    return LocalStorageBackend(settings.UPLOAD_DIR)
+
+
+@lru_cache(maxsize=None)
+def get_blob_store() -> BlobStore:
+    return BlobStore(get_storage_backend(), settings.UPLOAD_DIR)
@@ -0,0 +1,189 @@
+import asyncio
+import contextvars
+import hashlib
+import importlib.util
+import io
+import json
+import logging
+from functools import lru_cache
+from typing import Optional, Set, Tuple
+from starlette.concurrency import run_in_threadpool
+from ..config import settings
+from ..database import SessionLocal
+from ..metrics import QUEUE_DEPTH, stage
+from ..models import CV, Organization, Template
+from ..tracing import create_task
+from .cv_generator import get_cv_generator
+from .render_model import upgrade_render_model
+from .storage import get_blob_store
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_PREFIX = "thumbnails/"
+# Bump when rasterization changes so every thumbnail gets a new key
+THUMBNAIL_FORMAT_VERSION = 1
+
+
+@lru_cache(maxsize=None)
+def thumbnails_available() -> bool:
+    # pypdfium2 is imported on first render, not with the app
+    return importlib.util.find_spec("pypdfium2") is not None
+
+
+def thumbnail_key(cv: CV, template: Template, organization: Organization) -> str:
+    """Storage key of the CV's thumbnail in this template and branding.
+
+    The key changes whenever anything that affects the first page does, so
+    the stored image can be cached forever.
+    """
+    style = json.dumps([
+        template.id, template.layout, template.sections,
+        organization.primary_color, organization.secondary_color, organization.font, organization.logo_url,
+        settings.THUMBNAIL_WIDTH, THUMBNAIL_FORMAT_VERSION
+    ], sort_keys=True, separators=(",", ":"))
+    digest = hashlib.sha256(f"{cv.render_hash}:{style}".encode("utf-8")).hexdigest()[:32]
+    return f"{THUMBNAIL_PREFIX}{cv.id}/{digest}.webp"
+
+
+def rasterize_first_page(pdf_bytes: bytes, width: int) -> bytes:
+    """Render page one of a PDF to a WebP image ``width`` pixels wide."""
+    import pypdfium2 as pdfium
+    pdf = pdfium.PdfDocument(pdf_bytes)
+    try:
+        page = pdf[0]
+        image = page.render(scale=width / page.get_width()).to_pil()
+    finally:
+        pdf.close()
+    output = io.BytesIO()
+    image.convert("RGB").save(output, "WEBP", quality=80, method=4)
+    return output.getvalue()
+
+
+def load_render_inputs(db, cv_id: str) -> Optional[Tuple[CV, Template, Organization]]:
+    cv = db.query(CV).filter(CV.id == cv_id).first()
+    if not cv:
+        return None
+    template = db.query(Template).filter(Template.user_id == cv.user_id, Template.is_default == True).first()
+    organization = db.query(Organization).filter(Organization.user_id == cv.user_id).first()
+    if not template or not organization:
+        return None
+    return cv, template, organization
+
+
+class ThumbnailQueue:
+    """Bounded background queue of thumbnail renders.
+
+    A job is a ("cv", cv_id) render or a ("user", user_id) request to refresh
+    the user's most recent CVs after a template or branding change. Jobs
+    already queued are not queued twice, and nothing is queued once the queue
+    is full, so a list page can't set off hundreds of renders. Jobs run in
+    the context they were submitted from, so their spans join the trace of
+    the request that queued them.
+    """
+
+    def __init__(self, maxsize: int, workers: int):
+        self.maxsize = maxsize
+        self.workers = workers
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+        self._pending: Set[Tuple[str, str]] = set()
+
+    def start(self):
+        if self._queue is not None or not thumbnails_available():
+            return
+        self._queue = asyncio.Queue(self.maxsize)
+        self._tasks = [
+            asyncio.create_task(self._work(), name=f"thumbnail-worker-{i}") for i in range(self.workers)
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        self._pending.clear()
+
+    def submit(self, cv_id: str) -> bool:
+        """Queue a render; returns False if the queue is full or not running."""
+        return self._put(("cv", cv_id))
+
+    def submit_user(self, user_id: str) -> bool:
+        return self._put(("user", user_id))
+
+    def _put(self, job: Tuple[str, str]) -> bool:
+        if self._queue is None:
+            return False
+        if job in self._pending:
+            return True
+        try:
+            self._queue.put_nowait((job, contextvars.copy_context()))
+        except asyncio.QueueFull:
+            return False
+        self._pending.add(job)
+        QUEUE_DEPTH.labels("thumbnails").inc()
+        return True
+
+    async def _work(self):
+        while True:
+            job, context = await self._queue.get()
+            try:
+                await context.run(create_task, self._run(job), f"thumbnails.{job[0]}")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Thumbnail job %s failed", job)
+            finally:
+                self._pending.discard(job)
+                QUEUE_DEPTH.labels("thumbnails").dec()
+                self._queue.task_done()
+
+    async def _run(self, job: Tuple[str, str]):
+        if job[0] == "user":
+            for cv_id in await run_in_threadpool(self._recent_cvs, job[1]):
+                self.submit(cv_id)
+        else:
+            await self._render(job[1])
+
+    @staticmethod
+    def _recent_cvs(user_id: str):
+        with SessionLocal() as db:
+            return [
+                cv_id for (cv_id,) in db.query(CV.id)
+                .filter(CV.user_id == user_id)
+                .order_by(CV.created_at.desc())
+                .limit(settings.THUMBNAIL_PREWARM_LIMIT)
+            ]
+
+    async def _render(self, cv_id: str):
+        backend = get_blob_store().backend
+        generator = get_cv_generator()
+        with SessionLocal() as db:
+            inputs = load_render_inputs(db, cv_id)
+            if inputs is None:
+                return
+            cv, template, organization = inputs
+            if upgrade_render_model(cv):
+                db.commit()
+            key = thumbnail_key(cv, template, organization)
+            if await run_in_threadpool(backend.exists, key):
+                return
+            html_content, css = await generator.prepare_html(cv, template, organization)
+
+        with stage("thumbnail_render"):
+            pdf_bytes = await run_in_threadpool(generator.render_first_page, html_content, css)
+            image = await run_in_threadpool(rasterize_first_page, pdf_bytes, settings.THUMBNAIL_WIDTH)
+        await run_in_threadpool(backend.put, key, image)
+        await run_in_threadpool(self._remove_stale, cv_id, key)
+
+    @staticmethod
+    def _remove_stale(cv_id: str, current_key: str):
+        backend = get_blob_store().backend
+        for key in list(backend.iter_keys(f"{THUMBNAIL_PREFIX}{cv_id}/")):
+            if key != current_key:
+                backend.delete(key)
+
+
+@lru_cache(maxsize=None)
+def get_thumbnail_queue() -> ThumbnailQueue:
+    return ThumbnailQueue(settings.THUMBNAIL_QUEUE_SIZE, settings.THUMBNAIL_WORKERS)
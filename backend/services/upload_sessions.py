@@ -0,0 +1,214 @@
+import asyncio
+import hashlib
+import math
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Set
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from ..config import settings
+from ..database import SessionLocal
+from ..models import UploadSession
+from .storage import StorageBackend
+
+UPLOAD_SESSION_PREFIX = "upload-sessions/"
+OPEN, FINALIZING, COMPLETE = "open", "finalizing", "complete"
+MB = 1024 * 1024
+
+
+class ChunkRejected(ValueError):
+    """A chunk doesn't fit the session (bad offset or length)."""
+
+
+class SessionIncomplete(Exception):
+    """Finalize was called before every chunk arrived."""
+
+    def __init__(self, missing: List[int]):
+        super().__init__(f"{len(missing)} chunks are missing")
+        self.missing = missing
+
+
+class ChecksumMismatch(ValueError):
+    """The assembled file doesn't match the SHA-256 given at creation."""
+
+
+def _utc(value: datetime) -> datetime:
+    # Naive datetimes come back from SQLite/MySQL in UTC
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def is_expired(session: UploadSession) -> bool:
+    return _utc(session.expires_at) <= datetime.now(timezone.utc)
+
+
+def create_session(db: Session, user_id: str, filename: str, size: int, sha256: Optional[str]) -> UploadSession:
+    session = UploadSession(
+        user_id=user_id,
+        filename=filename,
+        size=size,
+        chunk_size=settings.UPLOAD_CHUNK_MB * MB,
+        sha256=sha256.lower() if sha256 else None,
+        status=OPEN,
+        expires_at=datetime.now(timezone.utc) + timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS)
+    )
+    db.add(session)
+    return session
+
+
+def chunk_key(session_id: str, index: int) -> str:
+    return f"{UPLOAD_SESSION_PREFIX}{session_id}/{index:06d}"
+
+
+def chunk_count(session: UploadSession) -> int:
+    return math.ceil(session.size / session.chunk_size)
+
+
+def chunk_index(session: UploadSession, offset: int, length: int) -> int:
+    """Index of the chunk at ``offset``; chunks start at multiples of
+    chunk_size and only the last one may be shorter."""
+    if offset < 0 or offset >= session.size or offset % session.chunk_size:
+        raise ChunkRejected(f"Offset must be a multiple of {session.chunk_size} below {session.size}")
+    expected = min(session.chunk_size, session.size - offset)
+    if length != expected:
+        raise ChunkRejected(f"Chunk at offset {offset} must be {expected} bytes, got {length}")
+    return offset // session.chunk_size
+
+
+def received_chunks(backend: StorageBackend, session: UploadSession) -> Set[int]:
+    """Chunks are written atomically, so a stored chunk is a complete one."""
+    prefix = f"{UPLOAD_SESSION_PREFIX}{session.id}/"
+    received = set()
+    for key in backend.iter_keys(prefix):
+        name = key[len(prefix):]
+        if name.isdigit():
+            received.add(int(name))
+    return received
+
+
+def missing_offsets(session: UploadSession, received: Set[int]) -> List[int]:
+    return [index * session.chunk_size for index in range(chunk_count(session)) if index not in received]
+
+
+def assemble(backend: StorageBackend, session: UploadSession) -> bytes:
+    """Join the chunks, checking the total size and the client's checksum."""
+    missing = missing_offsets(session, received_chunks(backend, session))
+    if missing:
+        raise SessionIncomplete(missing)
+    content = b"".join(backend.get(chunk_key(session.id, index)) for index in range(chunk_count(session)))
+    if len(content) != session.size:
+        raise ChecksumMismatch(f"Assembled {len(content)} bytes, expected {session.size}")
+    if session.sha256 and hashlib.sha256(content).hexdigest() != session.sha256:
+        raise ChecksumMismatch("SHA-256 of the assembled file doesn't match")
+    return content
+
+
+def discard_chunks(backend: StorageBackend, session_id: str):
+    for key in list(backend.iter_keys(f"{UPLOAD_SESSION_PREFIX}{session_id}/")):
+        backend.delete(key)
+
+
+def find_by_idempotency_key(db: Session, user_id: str, key: str) -> Optional[UploadSession]:
+    return db.query(UploadSession).filter(
+        UploadSession.user_id == user_id, UploadSession.idempotency_key == key
+    ).first()
+
+
+def _lease_until() -> datetime:
+    return datetime.now(timezone.utc) + timedelta(seconds=settings.LLM_DEADLINE_SECONDS * 2)
+
+
+def claim(db: Session, session: UploadSession, idempotency_key: Optional[str]) -> Optional[str]:
+    """Move the session to finalizing and return the claim's owner token,
+    or None if another finalize holds it. A finalize that died without
+    finishing is taken over after its lease (see ``keep_claimed``)."""
+    now = datetime.now(timezone.utc)
+    owner = str(uuid.uuid4())
+    values = {
+        UploadSession.status: FINALIZING,
+        UploadSession.lease_owner: owner,
+        UploadSession.lease_until: _lease_until(),
+    }
+    if idempotency_key:
+        values[UploadSession.idempotency_key] = idempotency_key
+    try:
+        claimed = db.query(UploadSession).filter(
+            UploadSession.id == session.id,
+            or_(
+                UploadSession.status == OPEN,
+                (UploadSession.status == FINALIZING) & (UploadSession.lease_until < now)
+            )
+        ).update(values, synchronize_session=False)
+        db.commit()
+    except IntegrityError:
+        # The key was just taken by a finalize of another session
+        db.rollback()
+        return None
+    db.refresh(session)
+    return owner if claimed else None
+
+
+def _claimed(db: Session, session_id: str, owner: str):
+    return db.query(UploadSession).filter(
+        UploadSession.id == session_id, UploadSession.status == FINALIZING, UploadSession.lease_owner == owner
+    )
+
+
+def renew(session_id: str, owner: str) -> bool:
+    """Extend the claim's lease; False if it was lost to another finalize."""
+    with SessionLocal() as db:
+        renewed = _claimed(db, session_id, owner).update({UploadSession.lease_until: _lease_until()}, synchronize_session=False)
+        db.commit()
+        return bool(renewed)
+
+
+@asynccontextmanager
+async def keep_claimed(session_id: str, owner: str):
+    """Renew the claim's lease while the block runs, however long the wait
+    for a parse slot and the parse's retries take."""
+    async def renew_periodically():
+        # The claim was the first renewal
+        while True:
+            await asyncio.sleep(settings.LLM_DEADLINE_SECONDS / 2)
+            if not await run_in_threadpool(renew, session_id, owner):
+                return
+
+    task = asyncio.create_task(renew_periodically())
+    try:
+        yield
+    finally:
+        task.cancel()
+
+
+def release(db: Session, session: UploadSession, owner: str):
+    """Give the claim back after a failed finalize so the client can retry."""
+    db.rollback()
+    _claimed(db, session.id, owner).update(
+        {
+            UploadSession.status: OPEN,
+            UploadSession.lease_owner: None,
+            UploadSession.lease_until: None,
+            UploadSession.idempotency_key: None,
+        },
+        synchronize_session=False
+    )
+    db.commit()
+
+
+def complete(db: Session, session: UploadSession, owner: str, cv_id: str) -> bool:
+    """Mark the session finalized into ``cv_id``, in the caller's
+    transaction; False if the claim was lost to another finalize meanwhile,
+    whose CV is then the one to keep."""
+    return bool(_claimed(db, session.id, owner).update(
+        {
+            UploadSession.status: COMPLETE,
+            UploadSession.cv_id: cv_id,
+            UploadSession.lease_owner: None,
+            UploadSession.lease_until: None,
+            # Keep the row (and its idempotency key) for another TTL after finalizing
+            UploadSession.expires_at: datetime.now(timezone.utc) + timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS),
+        },
+        synchronize_session=False
+    ))
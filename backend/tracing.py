@@ -0,0 +1,321 @@
+import asyncio
+import importlib
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("craftcv_current_span", default=None)
+
+
+class Trace:
+    """Spans of one trace that have not been exported yet."""
+
+    __slots__ = ("trace_id", "spans", "open_spans", "sampled", "lock")
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.spans: List["Span"] = []
+        self.open_spans = 0
+        self.sampled: Optional[bool] = None
+        self.lock = threading.Lock()
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "attributes", "start", "end", "status")
+
+    def __init__(self, trace: Trace, name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.start = time.time()
+        self.end: Optional[float] = None
+        self.status = "ok"
+
+    @property
+    def trace_id(self) -> str:
+        return self.trace.trace_id
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "end": self.end,
+            "duration_ms": round((self.end - self.start) * 1000, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    trace_id = None
+    span_id = None
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class SpanExporter(ABC):
+    """Receives finished spans of sampled traces."""
+
+    @abstractmethod
+    def export(self, spans: List[Dict[str, Any]]):
+        ...
+
+    def shutdown(self):
+        pass
+
+
+class NoopExporter(SpanExporter):
+    def export(self, spans: List[Dict[str, Any]]):
+        pass
+
+
+class JsonLinesExporter(SpanExporter):
+    """Appends one JSON object per span to a local file, rotated once it
+    reaches ``max_bytes`` (``path.1`` being the newest of ``backups`` old
+    files). The file is written by a background thread, never by the request
+    that finished the trace; batches arriving while ``max_pending`` are
+    already waiting are dropped."""
+
+    def __init__(self, path: str, max_bytes: int = 50 * 1024 * 1024, backups: int = 3, max_pending: int = 1000):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.dropped = 0
+        self._pending: queue.Queue = queue.Queue(max_pending)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, spans: List[Dict[str, Any]]):
+        if self._thread is None:
+            # Started on first use rather than at import, so it runs in the
+            # worker process and not in a parent that forks workers
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._write, name="trace-exporter", daemon=True)
+                    self._thread.start()
+        try:
+            self._pending.put_nowait(spans)
+        except queue.Full:
+            if not self.dropped:
+                logger.warning("Trace export is falling behind; dropping spans")
+            self.dropped += len(spans)
+
+    def shutdown(self):
+        """Write the spans still pending and stop the thread."""
+        if self._thread is not None:
+            self._pending.put(None)
+            self._thread.join(timeout=5)
+
+    def _write(self):
+        f = open(self.path, "a", encoding="utf-8")
+        try:
+            while (spans := self._pending.get()) is not None:
+                try:
+                    f.write("".join(json.dumps(span, default=str) + "\n" for span in spans))
+                    f.flush()
+                    if f.tell() >= self.max_bytes:
+                        f.close()
+                        self._rotate()
+                        f = open(self.path, "a", encoding="utf-8")
+                except Exception:
+                    logger.exception("Failed to export %d spans", len(spans))
+        finally:
+            f.close()
+
+    def _rotate(self):
+        if not self.backups:
+            os.remove(self.path)
+            return
+        for index in range(self.backups - 1, 0, -1):
+            older = f"{self.path}.{index}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{index + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+
+class Tracer:
+    """Creates nested spans and exports finished traces.
+
+    Sampling is decided once a trace's open spans have all finished, so slow
+    traces can be kept at ``slow_sample_rate`` while fast ones are kept at
+    ``sample_rate``. Spans that start after their trace was flushed (background
+    work) are exported as a follow-up batch of the same trace.
+    """
+
+    def __init__(
+            self,
+            exporter: SpanExporter,
+            sample_rate: float = 1.0,
+            slow_sample_rate: float = 1.0,
+            slow_threshold_ms: float = 1000.0,
+            enabled: bool = True
+    ):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.slow_sample_rate = slow_sample_rate
+        self.slow_threshold = slow_threshold_ms / 1000
+        self.enabled = enabled
+
+    @contextmanager
+    def span(self, name: str, trace_id: Optional[str] = None, **attributes):
+        if not self.enabled:
+            yield NOOP_SPAN
+            return
+
+        parent = _current_span.get()
+        if parent is not None:
+            trace = parent.trace
+        else:
+            trace = Trace(trace_id or uuid.uuid4().hex)
+        span = Span(trace, name, parent.span_id if parent else None, attributes)
+        with trace.lock:
+            trace.open_spans += 1
+
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.attributes["error"] = repr(e)
+            raise
+        finally:
+            span.end = time.time()
+            _current_span.reset(token)
+            self._finish(span)
+
+    def _finish(self, span: Span):
+        trace = span.trace
+        with trace.lock:
+            trace.spans.append(span)
+            trace.open_spans -= 1
+            if trace.open_spans:
+                return
+            batch, trace.spans = trace.spans, []
+            sampled = self._should_sample(trace, batch)
+
+        if sampled:
+            try:
+                self.exporter.export([s.to_dict() for s in batch])
+            except Exception:
+                logger.exception("Failed to export %d spans", len(batch))
+
+    def _should_sample(self, trace: Trace, batch: List[Span]) -> bool:
+        duration = max(s.end for s in batch) - min(s.start for s in batch)
+        slow = duration >= self.slow_threshold
+        if trace.sampled is None:
+            trace.sampled = random.random() < (self.slow_sample_rate if slow else self.sample_rate)
+            return trace.sampled
+        # Follow-up batches from background work keep the original decision,
+        # but are still kept when they are slow on their own
+        return trace.sampled or (slow and random.random() < self.slow_sample_rate)
+
+
+def current_span():
+    return _current_span.get() or NOOP_SPAN
+
+
+def current_trace_id() -> Optional[str]:
+    span = _current_span.get()
+    return span.trace_id if span else None
+
+
+def create_task(coro, name: str) -> asyncio.Task:
+    """Run ``coro`` as a background task in a child span of the current trace."""
+    async def runner():
+        with tracer.span(name, background=True):
+            return await coro
+
+    return asyncio.create_task(runner())
+
+
+def build_exporter(name: str, path: str) -> SpanExporter:
+    if name == "none":
+        return NoopExporter()
+    if name == "jsonl":
+        return JsonLinesExporter(path, settings.TRACE_EXPORT_MAX_BYTES, settings.TRACE_EXPORT_BACKUPS)
+    # Anything else is a "package.module:ClassName" of a custom exporter
+    module_name, _, class_name = name.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+tracer = Tracer(
+    build_exporter(settings.TRACE_EXPORTER, settings.TRACE_EXPORT_PATH),
+    sample_rate=settings.TRACE_SAMPLE_RATE,
+    slow_sample_rate=settings.TRACE_SLOW_SAMPLE_RATE,
+    slow_threshold_ms=settings.TRACE_SLOW_THRESHOLD_MS,
+    enabled=settings.TRACE_EXPORTER != "none"
+)
+
+
+def _incoming_trace_id(headers: Dict[bytes, bytes]) -> Optional[str]:
+    traceparent = headers.get(b"traceparent")
+    if traceparent:
+        # W3C format: version-traceid-parentid-flags
+        parts = traceparent.decode("latin-1").split("-")
+        if len(parts) == 4 and len(parts[1]) == 32:
+            return parts[1]
+    trace_id = headers.get(b"x-trace-id")
+    if trace_id:
+        return trace_id.decode("latin-1")[:64]
+    return None
+
+
+class TracingMiddleware:
+    """ASGI middleware opening the root span of every HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        with tracer.span(
+                f"{scope['method']} request",
+                trace_id=_incoming_trace_id(headers),
+                method=scope["method"],
+                path=scope["path"]
+        ) as span:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("status", message["status"])
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-trace-id", span.trace_id.encode("latin-1"))
+                    ]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = scope.get("route")
+                if route is not None:
+                    span.name = f"{scope['method']} {route.path}"
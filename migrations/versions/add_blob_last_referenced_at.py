@@ -0,0 +1,22 @@
+"""Add last_referenced_at to blobs
+
+Revision ID: add_blob_last_referenced_at
+Revises: add_cv_skills
+Create Date: 2026-10-19 23:30:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_blob_last_referenced_at'
+down_revision: Union[str, None] = 'add_cv_skills'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    op.add_column('blobs', sa.Column('last_referenced_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True))
+
+def downgrade() -> None:
+    op.drop_column('blobs', 'last_referenced_at')
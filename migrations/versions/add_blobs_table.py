@@ -0,0 +1,29 @@
+"""Add blobs table
+
+Revision ID: add_blobs_table
+Revises: add_templates_table
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_blobs_table'
+down_revision: Union[str, None] = 'add_templates_table'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    # Reference counts for content-addressed uploads
+    op.create_table(
+        'blobs',
+        sa.Column('key', sa.String(255), primary_key=True),
+        sa.Column('size', sa.BigInteger, nullable=False),
+        sa.Column('ref_count', sa.Integer, nullable=False, server_default='1'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'))
+    )
+
+def downgrade() -> None:
+    op.drop_table('blobs')
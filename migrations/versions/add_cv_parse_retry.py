@@ -0,0 +1,28 @@
+"""Track failed CV parses and scheduled retries
+
+Revision ID: add_cv_parse_retry
+Revises: add_logo_original_url
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_cv_parse_retry'
+down_revision: Union[str, None] = 'add_logo_original_url'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    op.add_column('cvs', sa.Column('parse_attempts', sa.Integer, nullable=False, server_default='0'))
+    op.add_column('cvs', sa.Column('parse_error', sa.Text, nullable=True))
+    op.add_column('cvs', sa.Column('parse_retry_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index('ix_cvs_parse_retry_at', 'cvs', ['parse_retry_at'])
+
+def downgrade() -> None:
+    op.drop_index('ix_cvs_parse_retry_at', table_name='cvs')
+    op.drop_column('cvs', 'parse_retry_at')
+    op.drop_column('cvs', 'parse_error')
+    op.drop_column('cvs', 'parse_attempts')
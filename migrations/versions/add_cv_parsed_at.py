@@ -0,0 +1,26 @@
+"""Add parsed_at to CVs
+
+Revision ID: add_cv_parsed_at
+Revises: add_upload_session_lease_owner
+Create Date: 2026-10-20 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_cv_parsed_at'
+down_revision: Union[str, None] = 'add_upload_session_lease_owner'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    op.add_column('cvs', sa.Column('parsed_at', sa.DateTime(timezone=True), nullable=True))
+    # Best available guess for CVs parsed before the column existed
+    op.execute("UPDATE cvs SET parsed_at = created_at WHERE parsed_data IS NOT NULL")
+    op.create_index('ix_cvs_parsed_at', 'cvs', ['parsed_at'])
+
+def downgrade() -> None:
+    op.drop_index('ix_cvs_parsed_at', table_name='cvs')
+    op.drop_column('cvs', 'parsed_at')
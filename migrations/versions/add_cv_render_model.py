@@ -0,0 +1,27 @@
+"""Add materialized render model to CVs
+
+Revision ID: add_cv_render_model
+Revises: add_resource_versions
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_cv_render_model'
+down_revision: Union[str, None] = 'add_resource_versions'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    # Existing rows are filled in lazily the first time they are rendered
+    op.add_column('cvs', sa.Column('render_data', sa.JSON, nullable=True))
+    op.add_column('cvs', sa.Column('render_version', sa.Integer, nullable=True))
+    op.add_column('cvs', sa.Column('render_hash', sa.String(64), nullable=True))
+
+def downgrade() -> None:
+    op.drop_column('cvs', 'render_hash')
+    op.drop_column('cvs', 'render_version')
+    op.drop_column('cvs', 'render_data')
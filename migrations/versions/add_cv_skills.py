@@ -0,0 +1,24 @@
+"""Add canonical skill tags to CVs
+
+Revision ID: add_cv_skills
+Revises: add_reparse_jobs
+Create Date: 2026-10-19 23:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_cv_skills'
+down_revision: Union[str, None] = 'add_reparse_jobs'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    op.add_column('cvs', sa.Column('skill_ids', sa.JSON, nullable=True))
+    op.add_column('cvs', sa.Column('skills_version', sa.String(16), nullable=True))
+
+def downgrade() -> None:
+    op.drop_column('cvs', 'skills_version')
+    op.drop_column('cvs', 'skill_ids')
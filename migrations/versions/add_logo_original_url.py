@@ -0,0 +1,22 @@
+"""Keep the original upload next to the normalized logo
+
+Revision ID: add_logo_original_url
+Revises: add_cv_render_model
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_logo_original_url'
+down_revision: Union[str, None] = 'add_cv_render_model'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    op.add_column('organizations', sa.Column('logo_original_url', sa.Text, nullable=True))
+
+def downgrade() -> None:
+    op.drop_column('organizations', 'logo_original_url')
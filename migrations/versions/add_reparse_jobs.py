@@ -0,0 +1,42 @@
+"""Track the parser version of CVs and add re-parse jobs
+
+Revision ID: add_reparse_jobs
+Revises: add_upload_sessions
+Create Date: 2026-10-19 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_reparse_jobs'
+down_revision: Union[str, None] = 'add_upload_sessions'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    op.add_column('cvs', sa.Column('parse_version', sa.String(16), nullable=True))
+    op.create_table(
+        'reparse_jobs',
+        sa.Column('id', sa.String(36), primary_key=True),
+        sa.Column('created_by', sa.String(36), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('filters', sa.JSON, nullable=False),
+        sa.Column('parse_version', sa.String(16), nullable=False),
+        sa.Column('status', sa.String(20), nullable=False, server_default='pending'),
+        sa.Column('cursor', sa.String(36), nullable=True),
+        sa.Column('total', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('processed', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('succeeded', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('failed', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('error', sa.Text, nullable=True),
+        sa.Column('lease_owner', sa.String(36), nullable=True),
+        sa.Column('lease_until', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True)
+    )
+
+def downgrade() -> None:
+    op.drop_table('reparse_jobs')
+    op.drop_column('cvs', 'parse_version')
@@ -0,0 +1,25 @@
+"""Add per-user resource version counters
+
+Revision ID: add_resource_versions
+Revises: add_blobs_table
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_resource_versions'
+down_revision: Union[str, None] = 'add_blobs_table'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    # Bumped on every change so cached reads can be revalidated cheaply
+    op.add_column('users', sa.Column('organization_version', sa.Integer, nullable=False, server_default='0'))
+    op.add_column('users', sa.Column('templates_version', sa.Integer, nullable=False, server_default='0'))
+
+def downgrade() -> None:
+    op.drop_column('users', 'templates_version')
+    op.drop_column('users', 'organization_version')
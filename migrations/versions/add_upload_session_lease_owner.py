@@ -0,0 +1,22 @@
+"""Add lease_owner to upload sessions
+
+Revision ID: add_upload_session_lease_owner
+Revises: add_blob_last_referenced_at
+Create Date: 2026-10-19 23:45:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_upload_session_lease_owner'
+down_revision: Union[str, None] = 'add_blob_last_referenced_at'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    op.add_column('upload_sessions', sa.Column('lease_owner', sa.String(36), nullable=True))
+
+def downgrade() -> None:
+    op.drop_column('upload_sessions', 'lease_owner')
@@ -0,0 +1,39 @@
+"""Add resumable upload sessions
+
+Revision ID: add_upload_sessions
+Revises: add_cv_parse_retry
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_upload_sessions'
+down_revision: Union[str, None] = 'add_cv_parse_retry'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    op.create_table(
+        'upload_sessions',
+        sa.Column('id', sa.String(36), primary_key=True),
+        sa.Column('user_id', sa.String(36), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('filename', sa.String(255), nullable=False),
+        sa.Column('size', sa.BigInteger, nullable=False),
+        sa.Column('chunk_size', sa.Integer, nullable=False),
+        sa.Column('sha256', sa.String(64), nullable=True),
+        sa.Column('status', sa.String(20), nullable=False, server_default='open'),
+        sa.Column('idempotency_key', sa.String(255), nullable=True),
+        sa.Column('cv_id', sa.String(36), sa.ForeignKey('cvs.id', ondelete='SET NULL'), nullable=True),
+        sa.Column('lease_until', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.UniqueConstraint('user_id', 'idempotency_key', name='uq_upload_sessions_idempotency_key')
+    )
+    op.create_index('ix_upload_sessions_expires_at', 'upload_sessions', ['expires_at'])
+
+def downgrade() -> None:
+    op.drop_index('ix_upload_sessions_expires_at', table_name='upload_sessions')
+    op.drop_table('upload_sessions')
@@ -0,0 +1,134 @@
+"""Logo normalization benchmark.
+
+Normalizes a logo the way ``POST /api/organization/logo`` does and reports
+the size and time taken, then renders the same CV to PDF with the original
+and the normalized logo and compares render time and PDF size. Without a
+``--logo`` a large synthetic PNG (a typical "export at 4000px" logo) is used.
+
+The PDF comparison needs WeasyPrint and is skipped when it can't be loaded.
+
+Example:
+    python scripts/bench_logo.py --logo brand.png --repeat 5
+"""
+import argparse
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from PIL import Image, ImageDraw  # noqa: E402
+
+from backend.config import settings  # noqa: E402
+from backend.services.cv_generator import DEFAULT_FONT, DEFAULT_PRIMARY_COLOR, DEFAULT_SECONDARY_COLOR, CVGenerator  # noqa: E402
+from backend.services.images import logo_max_size, normalize_logo  # noqa: E402
+from backend.services.render_model import build_render_model  # noqa: E402
+
+SECTIONS = [
+    {"id": "header", "type": "header", "title": "Header", "column": "full"},
+    {"id": "summary", "type": "summary", "title": "Professional Summary", "column": "right"},
+    {"id": "experience", "type": "experience", "title": "Work Experience", "column": "right"},
+    {"id": "education", "type": "education", "title": "Education", "column": "right"},
+    {"id": "skills", "type": "skills", "title": "Skills", "column": "left"},
+]
+
+PARSED_DATA = {
+    "personal_info": {"name": "Jane Doe", "email": "jane@example.com", "phone": "+65 6123 4567", "location": "Singapore"},
+    "summary": "Engineer with ten years of experience building data platforms.",
+    "work_experience": [
+        {
+            "company": f"Company {i}",
+            "position": "Senior Engineer",
+            "dates": f"{2012 + i} - {2013 + i}",
+            "responsibilities": [f"Delivered project {i}.{j}" for j in range(4)]
+        }
+        for i in range(4)
+    ],
+    "education": [{"institution": "National University", "degree": "BSc Computer Science", "dates": "2008 - 2012"}],
+    "skills": ["Python", "SQL", "AWS", "Kubernetes"],
+}
+
+
+def synthetic_logo(width: int = 4000, height: int = 2000) -> bytes:
+    # Gradients and shapes compress about as badly as a real exported logo
+    image = Image.radial_gradient("L").resize((width, height)).convert("RGBA")
+    draw = ImageDraw.Draw(image)
+    for i in range(0, width, 160):
+        draw.ellipse((i, height // 4, i + 300, height // 4 + 300), fill=(37, 99, 235, 200))
+    output = io.BytesIO()
+    image.save(output, "PNG")
+    return output.getvalue()
+
+
+def timed(fn, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), result
+
+
+def render_pdf(generator: CVGenerator, logo_path: str, layout: str) -> bytes:
+    from weasyprint import HTML, CSS
+
+    branding = {"primary_color": DEFAULT_PRIMARY_COLOR, "secondary_color": DEFAULT_SECONDARY_COLOR, "font": DEFAULT_FONT}
+    context = generator.build_context(build_render_model(PARSED_DATA), SECTIONS, branding, f"file://{logo_path}")
+    html_content = generator.render_html(layout, context)
+    return HTML(string=html_content).write_pdf(stylesheets=[CSS(string=generator.branding_css(branding))])
+
+
+def main(args):
+    if args.logo:
+        with open(args.logo, "rb") as f:
+            original = f.read()
+    else:
+        original = synthetic_logo()
+    with Image.open(io.BytesIO(original)) as image:
+        original_size = image.size
+
+    seconds, normalized = timed(lambda: normalize_logo(original), args.repeat)
+    if normalized is None:
+        sys.exit("Logo can't be normalized (SVG or unknown format); nothing to compare")
+    content, extension = normalized
+    with Image.open(io.BytesIO(content)) as image:
+        normalized_size = image.size
+
+    print(f"Target box at {settings.LOGO_DPI} DPI: {logo_max_size(settings.LOGO_DPI)}")
+    print(f"{'logo':<12}{'pixels':>14}{'bytes':>12}")
+    print(f"{'original':<12}{'%dx%d' % original_size:>14}{len(original):>12,}")
+    print(f"{'normalized':<12}{'%dx%d' % normalized_size:>14}{len(content):>12,}   ({seconds * 1000:.1f} ms)")
+    print()
+
+    try:
+        import weasyprint  # noqa: F401
+    except (ImportError, OSError) as e:
+        print(f"Skipping the PDF comparison, WeasyPrint can't be loaded: {e}")
+        return
+
+    generator = CVGenerator()
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {}
+        for label, data, suffix in (("original", original, os.path.splitext(args.logo or "logo.png")[1]), ("normalized", content, extension)):
+            paths[label] = os.path.join(tmp, f"{label}{suffix}")
+            with open(paths[label], "wb") as f:
+                f.write(data)
+
+        print(f"{'logo':<12}{'median ms':>11}{'PDF bytes':>12}")
+        for label, path in paths.items():
+            render_pdf(generator, path, args.layout)  # warm up fonts and imports
+            seconds, pdf = timed(lambda: render_pdf(generator, path, args.layout), args.repeat)
+            print(f"{label:<12}{seconds * 1000:>11.1f}{len(pdf):>12,}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logo", help="logo file to use instead of a synthetic 4000x2000 PNG")
+    parser.add_argument("--layout", default="1-column", choices=["1-column", "2-column"])
+    parser.add_argument("--repeat", type=int, default=3)
+    main(parser.parse_args())
@@ -0,0 +1,87 @@
+"""PDF output profile report.
+
+Renders stored CVs (e.g. the agency samples in ``data/``, uploaded through
+the API) with every output profile of ``POST /api/cv/{cv_id}/generate`` and
+with WeasyPrint's defaults, and reports render time and PDF size. Each CV
+uses its owner's default template and branding, as thumbnails do.
+
+Example:
+    DATABASE_URL=mysql://root:@localhost/craftcv python scripts/bench_pdf_profiles.py --limit 50
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from backend.database import SessionLocal  # noqa: E402
+from backend.models import CV  # noqa: E402
+from backend.services.cv_generator import PDF_PROFILE_OPTIONS, get_cv_generator  # noqa: E402
+from backend.services.thumbnails import load_render_inputs  # noqa: E402
+
+
+async def prepare_documents(limit: int):
+    generator = get_cv_generator()
+    documents = []
+    with SessionLocal() as db:
+        cv_ids = [
+            cv_id for (cv_id,) in db.query(CV.id)
+            .order_by(CV.created_at.desc())
+            .limit(limit)
+        ]
+        for cv_id in cv_ids:
+            inputs = load_render_inputs(db, cv_id)
+            if inputs is not None:
+                documents.append(await generator.prepare_html(*inputs))
+    return documents
+
+
+def main(args):
+    try:
+        from weasyprint import HTML, CSS
+    except (ImportError, OSError) as e:
+        sys.exit(f"WeasyPrint can't be loaded: {e}")
+
+    documents = asyncio.run(prepare_documents(args.limit))
+    if not documents:
+        sys.exit("No CVs with a default template and organization in DATABASE_URL; upload the samples first")
+
+    profiles = [("default", {})] + [(profile.value, options) for profile, options in PDF_PROFILE_OPTIONS.items()]
+    print(f"{len(documents)} CVs")
+    if args.markdown:
+        print("| Profile | Median ms | p95 ms | Median KB | Total KB | Size |")
+        print("|---------|----------:|-------:|----------:|---------:|-----:|")
+    else:
+        print(f"{'profile':<10}{'median ms':>11}{'p95 ms':>9}{'median KB':>11}{'total KB':>11}{'size':>8}")
+    baseline = None
+    for label, options in profiles:
+        seconds, sizes = [], []
+        for html_content, css in documents:
+            start = time.perf_counter()
+            pdf = HTML(string=html_content).write_pdf(stylesheets=[CSS(string=css)], **options)
+            seconds.append(time.perf_counter() - start)
+            sizes.append(len(pdf))
+        total = sum(sizes)
+        baseline = baseline or total
+        p95 = statistics.quantiles(seconds, n=20)[-1] if len(seconds) > 1 else seconds[0]
+        if args.markdown:
+            print(
+                f"| `{label}` | {statistics.median(seconds) * 1000:.0f} | {p95 * 1000:.0f} "
+                f"| {statistics.median(sizes) / 1024:.1f} | {total / 1024:.0f} | {total / baseline:.0%} |"
+            )
+            continue
+        print(
+            f"{label:<10}{statistics.median(seconds) * 1000:>11.0f}{p95 * 1000:>9.0f}"
+            f"{statistics.median(sizes) / 1024:>11.1f}{total / 1024:>11.0f}{total / baseline:>8.0%}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limit", type=int, default=100, help="most recent CVs to render")
+    parser.add_argument("--markdown", action="store_true", help="print a Markdown table for the README")
+    main(parser.parse_args())
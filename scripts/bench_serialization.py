@@ -0,0 +1,129 @@
+"""Serialization benchmark for the CV list response.
+
+Compares the FastAPI ``response_model`` path (Pydantic validation of every
+CV, including its arbitrary ``parsed_data``, then the stdlib JSON encoder)
+with the streaming path used by ``GET /api/cv/`` (plain dicts encoded with
+orjson), and reports the cost and size of gzip and brotli on top.
+
+Example:
+    python scripts/bench_serialization.py --sizes 100 1000 10000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Callable, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from pydantic import TypeAdapter  # noqa: E402
+
+from backend.models import CVStatus  # noqa: E402
+from backend.routers.cv import cv_row_to_dict  # noqa: E402
+from backend.schemas import CV as CVSchema  # noqa: E402
+from backend.serialization import compress_chunks, iter_json_array, orjson  # noqa: E402
+
+SKILLS = ["Python", "SQL", "AWS", "Kubernetes", "Spark", "Airflow", "Go", "React", "Terraform", "Kafka"]
+
+
+def make_cv(rng: random.Random, user_id: str, created_at: datetime) -> SimpleNamespace:
+    parsed_data = {
+        "personal_info": {
+            "name": f"Candidate {rng.randrange(10 ** 6)}",
+            "email": f"candidate{rng.randrange(10 ** 6)}@example.com",
+            "phone": "+65 6123 4567",
+            "location": "Singapore"
+        },
+        "summary": "Engineer with experience building data platforms. " * rng.randint(1, 4),
+        "work_experience": [
+            {
+                "company": f"Company {i}",
+                "position": "Senior Engineer",
+                "dates": f"{2010 + i} - {2011 + i}",
+                "responsibilities": [f"Delivered project {i}.{j} on time and budget" for j in range(rng.randint(2, 6))]
+            }
+            for i in range(rng.randint(2, 8))
+        ],
+        "education": [
+            {"institution": "National University", "degree": "BSc Computer Science", "dates": "2006 - 2010"}
+        ],
+        "skills": rng.sample(SKILLS, rng.randint(3, len(SKILLS))),
+        "certifications": ["AWS Solutions Architect"]
+    }
+    return SimpleNamespace(
+        id=str(uuid.uuid4()),
+        user_id=user_id,
+        original_filename=f"cv-{rng.randrange(10 ** 6)}.pdf",
+        file_url=f"uploads/blobs/ab/cd/{uuid.uuid4().hex * 2}.pdf",
+        status=rng.choice(list(CVStatus)),
+        parsed_data=parsed_data,
+        created_at=created_at
+    )
+
+
+def response_model_path(adapter: TypeAdapter) -> Callable[[List[SimpleNamespace]], bytes]:
+    # What FastAPI does for response_model=List[CVSchema]: validate, dump in
+    # JSON mode, then encode with json.dumps in JSONResponse.render
+    def run(cvs):
+        value = adapter.validate_python(cvs, from_attributes=True)
+        content = adapter.dump_python(value, mode="json")
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+    return run
+
+
+def streaming_path(encoding=None) -> Callable[[List[SimpleNamespace]], bytes]:
+    def run(cvs):
+        return b"".join(compress_chunks(iter_json_array(cv_row_to_dict(cv) for cv in cvs), encoding))
+    return run
+
+
+def timed(fn, cvs, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = fn(cvs)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), len(body)
+
+
+def main(args):
+    rng = random.Random(args.seed)
+    adapter = TypeAdapter(List[CVSchema])
+    paths = [
+        ("response_model + json", response_model_path(adapter)),
+        ("streaming " + ("orjson" if orjson else "json"), streaming_path()),
+        ("streaming + gzip", streaming_path("gzip")),
+    ]
+    try:
+        import brotli  # noqa: F401
+        paths.append(("streaming + br", streaming_path("br")))
+    except ImportError:
+        pass
+
+    now = datetime.now(timezone.utc)
+    print(f"{'CVs':>7}  {'path':<24}{'median ms':>11}{'bytes':>12}{'speedup':>9}")
+    for size in args.sizes:
+        cvs = [make_cv(rng, "bench-user", now - timedelta(minutes=i)) for i in range(size)]
+        repeat = max(3, args.repeat * 1000 // max(size, 1000))
+        baseline = None
+        for label, fn in paths:
+            seconds, length = timed(fn, cvs, repeat)
+            baseline = baseline or seconds
+            print(f"{size:>7}  {label:<24}{seconds * 1000:>11.1f}{length:>12,}{baseline / seconds:>8.1f}x")
+        print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs for 1,000 CVs (scaled by size)")
+    parser.add_argument("--seed", type=int, default=7)
+    main(parser.parse_args())
@@ -0,0 +1,98 @@
+"""Skill tagger benchmark.
+
+Extracts the text of the agency sample CVs in ``data/`` (or any files given)
+and tags their skills twice: with the Aho-Corasick tagger, one pass over the
+text whatever the number of aliases, and with naive matching that searches
+the text once per alias. Both apply the same word-boundary and overlap rules,
+so their tags must agree; the report shows the time per CV of each.
+
+Example:
+    python scripts/bench_skills.py --repeat 5
+"""
+import argparse
+import glob
+import os
+import statistics
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from backend.services.cv_parser import extract_text  # noqa: E402
+from backend.services.skills import SkillTagger, _is_word_char, load_taxonomy, normalize  # noqa: E402
+
+SAMPLES = os.path.join(REPO_ROOT, "data", "Sample Profiles From Agencies", "*")
+
+
+def naive_tag(tagger: SkillTagger, text: str):
+    """tagger.tag the obvious way: str.find for every alias."""
+    text = normalize(text)
+    matches = []
+    for alias, skill_id in tagger._aliases.items():
+        start = text.find(alias)
+        while start != -1:
+            end = start + len(alias)
+            if not (
+                (start > 0 and _is_word_char(text[start - 1]) and _is_word_char(text[start]))
+                or (end < len(text) and _is_word_char(text[end]) and _is_word_char(text[end - 1]))
+            ):
+                matches.append((start, end, skill_id))
+            start = text.find(alias, start + 1)
+    matches.sort(key=lambda match: (match[0], match[0] - match[1]))
+    found = set()
+    covered = 0
+    for start, end, skill_id in matches:
+        if start >= covered:
+            found.add(skill_id)
+            covered = end
+    return sorted(found)
+
+
+def timed(function, texts, repeat):
+    """Median seconds per text over ``repeat`` runs, and the last results."""
+    per_text = []
+    results = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = [function(text) for text in texts]
+        per_text.append((time.perf_counter() - start) / len(texts))
+    return statistics.median(per_text), results
+
+
+def main(args):
+    texts = []
+    for path in sorted(args.files or glob.glob(SAMPLES)):
+        if os.path.basename(path).startswith("._") or not path.lower().endswith((".pdf", ".docx")):
+            continue
+        try:
+            texts.append(extract_text(path))
+        except Exception as e:
+            print(f"Skipping {path}: {e}", file=sys.stderr)
+    if not texts:
+        sys.exit("No CVs to tag")
+
+    taxonomy = load_taxonomy(args.taxonomy)
+    start = time.perf_counter()
+    tagger = SkillTagger(taxonomy)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    ac_seconds, ac_tags = timed(tagger.tag, texts, args.repeat)
+    naive_seconds, naive_tags = timed(lambda text: naive_tag(tagger, text), texts, args.repeat)
+    disagreements = sum(a != b for a, b in zip(ac_tags, naive_tags))
+
+    print(f"{len(texts)} CVs, {sum(map(len, texts)) // len(texts)} characters on average")
+    print(f"{len(tagger.skills)} skills, {len(tagger._aliases)} aliases, automaton built in {build_ms:.1f} ms")
+    print(f"{'matcher':<14}{'ms per CV':>11}{'skills per CV':>15}")
+    for label, seconds, tags in (("aho-corasick", ac_seconds, ac_tags), ("naive", naive_seconds, naive_tags)):
+        print(f"{label:<14}{seconds * 1000:>11.3f}{statistics.mean(map(len, tags)):>15.1f}")
+    print(f"naive / aho-corasick: {naive_seconds / ac_seconds:.2f}x; CVs tagged differently: {disagreements}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", help="CV files (default: the agency samples)")
+    parser.add_argument("--taxonomy", help="taxonomy JSON (default: SKILL_TAXONOMY_PATH or the bundled one)")
+    parser.add_argument("--repeat", type=int, default=3)
+    main(parser.parse_args())
@@ -0,0 +1,136 @@
+"""Import-time and time-to-first-request report for the CraftCV API.
+
+Runs ``python -X importtime -c "import backend.main"`` in a fresh interpreter
+and lists the slowest imports, flags heavy optional libraries that were pulled
+in at import time, then measures how long a uvicorn worker takes from spawn
+to answering its first request. With ``--compare REV`` the same measurements
+are taken on a git worktree of REV for a before/after comparison.
+
+Example:
+    python scripts/import_time.py --compare HEAD~1
+"""
+import argparse
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Tuple
+
+import httpx
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = (
+    "langchain", "langchain_openai", "openai", "weasyprint", "PyPDF2", "docx", "pypdfium2", "PIL", "pyarrow"
+)
+
+
+def scratch_env(source_root: str, workdir: str) -> dict:
+    return dict(
+        os.environ,
+        PYTHONPATH=source_root + os.pathsep + os.environ.get("PYTHONPATH", ""),
+        DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'import-time.db')}",
+        OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "stub"),
+    )
+
+
+def import_times(source_root: str, workdir: str) -> List[Tuple[int, int, int, str]]:
+    """Return (self_us, cumulative_us, depth, module) for every import."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import backend.main"],
+        cwd=workdir, env=scratch_env(source_root, workdir),
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"Importing backend.main failed:\n{result.stderr[-2000:]}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((int(self_us), int(cumulative_us), depth, name.strip()))
+    return rows
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_request(source_root: str, workdir: str, timeout: float = 120.0) -> float:
+    port = free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=scratch_env(source_root, workdir)
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if process.poll() is not None:
+                raise SystemExit("uvicorn exited during startup")
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/openapi.json", timeout=0.5).status_code == 200:
+                    return time.perf_counter() - start
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.01)
+        raise SystemExit("Timed out waiting for the first response")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def measure(label: str, source_root: str, top: int, runs: int) -> dict:
+    workdir = tempfile.mkdtemp(prefix="craftcv-import-")
+    try:
+        rows = import_times(source_root, workdir)
+        total = next(cumulative for _, cumulative, _, name in rows if name == "backend.main")
+        heavy = sorted({name.split(".")[0] for _, _, _, name in rows if name.split(".")[0] in HEAVY_MODULES})
+        first_request = [time_to_first_request(source_root, workdir) for _ in range(runs)]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"\n== {label}")
+    print(f"import backend.main: {total / 1000:.0f} ms")
+    print(f"heavy modules imported eagerly: {', '.join(heavy) or 'none'}")
+    print(f"{'cumulative ms':>14}{'self ms':>10}  module")
+    for self_us, cumulative_us, depth, name in sorted(rows, key=lambda r: -r[1])[:top]:
+        print(f"{cumulative_us / 1000:>14.1f}{self_us / 1000:>10.1f}  {'  ' * depth}{name}")
+    median = statistics.median(first_request)
+    print(f"time to first request (median of {runs}): {median * 1000:.0f} ms")
+    return {"import_ms": total / 1000, "first_request_ms": median * 1000}
+
+
+def main(args):
+    after = measure("working tree", REPO_ROOT, args.top, args.runs)
+    if not args.compare:
+        return
+
+    worktree = tempfile.mkdtemp(prefix="craftcv-compare-")
+    subprocess.run(["git", "worktree", "add", "--detach", worktree, args.compare],
+                   cwd=REPO_ROOT, check=True, capture_output=True)
+    try:
+        before = measure(args.compare, worktree, args.top, args.runs)
+    finally:
+        subprocess.run(["git", "worktree", "remove", "--force", worktree], cwd=REPO_ROOT, check=False)
+
+    print(f"\n== {args.compare} -> working tree")
+    for key, label in (("import_ms", "import backend.main"), ("first_request_ms", "time to first request")):
+        reduction = before[key] - after[key]
+        print(f"{label}: {before[key]:.0f} ms -> {after[key]:.0f} ms "
+              f"({reduction:.0f} ms, {reduction / before[key]:.0%} less)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=20, help="number of slowest imports to list")
+    parser.add_argument("--runs", type=int, default=3, help="worker starts to time")
+    parser.add_argument("--compare", metavar="REV", help="git revision to compare against")
+    main(parser.parse_args())
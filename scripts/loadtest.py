@@ -0,0 +1,381 @@
+"""End-to-end HTTP load harness for the CraftCV API.
+
+Boots ``backend.main:app`` under uvicorn against a throwaway SQLite database
+with a stubbed LLM (see ``loadtest_app.py``), seeds users, organizations and
+templates through the public API, then replays a weighted mix of logins,
+bulk uploads, list calls and PDF generation at increasing concurrency.
+
+For every concurrency level it reports throughput, p50/p95/p99 latency and
+error rate per route, and finally the saturation point for the given worker
+count: the last level whose throughput still grew meaningfully without the
+error rate crossing the configured threshold.
+
+Example:
+    python scripts/loadtest.py --workers 4 --concurrency 1,2,4,8,16,32 --duration 30
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CORPUS = os.path.join(REPO_ROOT, "data", "Sample Profiles From Agencies")
+SUPPORTED_EXTENSIONS = (".pdf", ".docx")
+
+DEFAULT_SECTIONS = [
+    {"id": "summary", "type": "summary", "title": "Summary", "column": "full"},
+    {"id": "experience", "type": "experience", "title": "Experience", "column": "right"},
+    {"id": "education", "type": "education", "title": "Education", "column": "right"},
+    {"id": "skills", "type": "skills", "title": "Skills", "column": "left"},
+    {"id": "certifications", "type": "certifications", "title": "Certifications", "column": "left"},
+]
+
+# Relative weight of each scenario in the traffic mix
+DEFAULT_MIX = {
+    "login": 10,
+    "list_cvs": 35,
+    "get_organization": 10,
+    "list_templates": 10,
+    "upload": 15,
+    "generate": 20,
+}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def load_corpus(path: str, limit: int) -> List[tuple]:
+    files = []
+    for name in sorted(os.listdir(path)):
+        if name.startswith("._") or not name.lower().endswith(SUPPORTED_EXTENSIONS):
+            continue
+        with open(os.path.join(path, name), "rb") as f:
+            files.append((name, f.read()))
+        if len(files) >= limit:
+            break
+    if not files:
+        raise SystemExit(f"No .pdf/.docx files found in {path}")
+    return files
+
+
+class Server:
+    """A uvicorn process serving the stubbed app from a scratch directory."""
+
+    def __init__(self, workers: int, llm_latency: float, llm_jitter: float):
+        self.workers = workers
+        self.port = free_port()
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        self.workdir = tempfile.mkdtemp(prefix="craftcv-load-")
+        self.env = dict(
+            os.environ,
+            PYTHONPATH=REPO_ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""),
+            DATABASE_URL=f"sqlite:///{os.path.join(self.workdir, 'load.db')}",
+            SECRET_KEY="load-test-secret",
+            OPENAI_API_KEY="stub",
+            ACCESS_TOKEN_EXPIRE_MINUTES="600",
+            LOADTEST_LLM_LATENCY=str(llm_latency),
+            LOADTEST_LLM_JITTER=str(llm_jitter),
+        )
+        self.process: Optional[subprocess.Popen] = None
+
+    def start(self, timeout: float = 60.0):
+        # Create the schema once up front so workers don't race on create_all
+        subprocess.run(
+            [sys.executable, "-c",
+             "from backend.database import engine, Base\n"
+             "import backend.models\n"
+             "Base.metadata.create_all(bind=engine)\n"
+             "with engine.connect() as conn:\n"
+             "    conn.exec_driver_sql('PRAGMA journal_mode=WAL')\n"],
+            cwd=self.workdir, env=self.env, check=True
+        )
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "loadtest_app:app",
+             "--app-dir", os.path.join(REPO_ROOT, "scripts"),
+             "--host", "127.0.0.1", "--port", str(self.port),
+             "--workers", str(self.workers), "--log-level", "warning",
+             "--no-access-log"],
+            cwd=self.workdir, env=self.env
+        )
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise SystemExit("uvicorn exited during startup")
+            try:
+                if httpx.get(f"{self.base_url}/openapi.json", timeout=1.0).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+        self.stop()
+        raise SystemExit("Timed out waiting for the server to start")
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+class Tenant:
+    def __init__(self, username: str, password: str):
+        self.username = username
+        self.password = password
+        self.token: Optional[str] = None
+        self.cv_ids: List[str] = []
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.token}"}
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def record(self, route: str, latency: float, ok: bool):
+        self.latencies[route].append(latency)
+        if not ok:
+            self.errors[route] += 1
+
+
+class LoadRunner:
+    def __init__(self, base_url: str, corpus: List[tuple], mix: Dict[str, int],
+                 upload_batch: int, timeout: float):
+        self.base_url = base_url
+        self.corpus = corpus
+        self.mix = mix
+        self.upload_batch = upload_batch
+        self.timeout = timeout
+        self.tenants: List[Tenant] = []
+
+    def client(self, concurrency: int) -> httpx.AsyncClient:
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        return httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, limits=limits)
+
+    async def seed(self, users: int, cvs_per_user: int):
+        async with self.client(8) as client:
+            for i in range(users):
+                tenant = Tenant(f"load-user-{i}", "load-test-password")
+                response = await client.post("/api/auth/signup", json={
+                    "username": tenant.username,
+                    "email": f"{tenant.username}@example.com",
+                    "password": tenant.password,
+                })
+                response.raise_for_status()
+                tenant.token = response.json()["access_token"]
+
+                response = await client.post("/api/template/", headers=tenant.headers, json={
+                    "name": "Load Test",
+                    "layout": "2-column",
+                    "sections": DEFAULT_SECTIONS,
+                    "is_default": True,
+                })
+                response.raise_for_status()
+
+                for _ in range(cvs_per_user):
+                    response = await client.post(
+                        "/api/cv/upload", headers=tenant.headers, files=self.pick_files(1)
+                    )
+                    response.raise_for_status()
+                    tenant.cv_ids.extend(cv["id"] for cv in response.json())
+                self.tenants.append(tenant)
+
+    def pick_files(self, count: int) -> List[tuple]:
+        return [
+            ("files", (name, content, "application/octet-stream"))
+            for name, content in random.sample(self.corpus, min(count, len(self.corpus)))
+        ]
+
+    async def run_scenario(self, client: httpx.AsyncClient, name: str, tenant: Tenant):
+        if name == "login":
+            return "POST /api/auth/token", await client.post(
+                "/api/auth/token", data={"username": tenant.username, "password": tenant.password}
+            )
+        if name == "list_cvs":
+            return "GET /api/cv/", await client.get("/api/cv/", headers=tenant.headers)
+        if name == "get_organization":
+            return "GET /api/organization/", await client.get("/api/organization/", headers=tenant.headers)
+        if name == "list_templates":
+            return "GET /api/template/", await client.get("/api/template/", headers=tenant.headers)
+        if name == "upload":
+            response = await client.post(
+                "/api/cv/upload", headers=tenant.headers, files=self.pick_files(self.upload_batch)
+            )
+            if response.status_code == 200:
+                tenant.cv_ids.extend(cv["id"] for cv in response.json())
+            return "POST /api/cv/upload", response
+        if name == "generate":
+            cv_id = random.choice(tenant.cv_ids)
+            return "POST /api/cv/{cv_id}/generate", await client.post(
+                f"/api/cv/{cv_id}/generate", headers=tenant.headers
+            )
+        raise ValueError(f"Unknown scenario: {name}")
+
+    async def virtual_user(self, client: httpx.AsyncClient, recorder: Recorder, stop_at: float):
+        names = list(self.mix)
+        weights = [self.mix[name] for name in names]
+        while time.monotonic() < stop_at:
+            name = random.choices(names, weights)[0]
+            tenant = random.choice(self.tenants)
+            start = time.perf_counter()
+            try:
+                route, response = await self.run_scenario(client, name, tenant)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                route, ok = name, False
+            recorder.record(route, time.perf_counter() - start, ok)
+
+    async def run_level(self, concurrency: int, duration: float) -> dict:
+        recorder = Recorder()
+        async with self.client(concurrency) as client:
+            start = time.monotonic()
+            stop_at = start + duration
+            await asyncio.gather(*[
+                self.virtual_user(client, recorder, stop_at) for _ in range(concurrency)
+            ])
+            elapsed = time.monotonic() - start
+        return summarize(concurrency, elapsed, recorder)
+
+
+def summarize(concurrency: int, elapsed: float, recorder: Recorder) -> dict:
+    routes = {}
+    total = errors = 0
+    for route, values in sorted(recorder.latencies.items()):
+        values.sort()
+        count = len(values)
+        total += count
+        errors += recorder.errors[route]
+        routes[route] = {
+            "requests": count,
+            "throughput": count / elapsed,
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+            "error_rate": recorder.errors[route] / count,
+        }
+    return {
+        "concurrency": concurrency,
+        "duration": elapsed,
+        "requests": total,
+        "throughput": total / elapsed if elapsed else 0.0,
+        "error_rate": errors / total if total else 0.0,
+        "routes": routes,
+    }
+
+
+def find_saturation(levels: List[dict], min_gain: float, max_error_rate: float) -> Optional[dict]:
+    """Return the last level that still scaled: throughput grew by at least
+    ``min_gain`` over the previous level and errors stayed under the limit."""
+    best = None
+    for level in levels:
+        if level["error_rate"] > max_error_rate:
+            break
+        if best is not None and level["throughput"] < best["throughput"] * (1 + min_gain):
+            break
+        best = level
+    return best
+
+
+def print_level(level: dict):
+    print(f"\n== concurrency {level['concurrency']}: {level['throughput']:.1f} req/s, "
+          f"{level['error_rate']:.2%} errors, {level['requests']} requests")
+    print(f"{'route':<34}{'req/s':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>9}")
+    for route, stats in level["routes"].items():
+        print(f"{route:<34}{stats['throughput']:>8.1f}{stats['p50_ms']:>10.1f}"
+              f"{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}{stats['error_rate']:>9.2%}")
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    mix = {}
+    for item in value.split(","):
+        name, weight = item.split("=")
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown scenario: {name}")
+        mix[name] = int(weight)
+    return mix
+
+
+async def main(args):
+    corpus = load_corpus(args.corpus, args.corpus_limit)
+    server = Server(args.workers, args.llm_latency, args.llm_jitter)
+    print(f"Starting {args.workers} worker(s) on {server.base_url} (workdir {server.workdir})")
+    server.start()
+    try:
+        runner = LoadRunner(server.base_url, corpus, args.mix, args.upload_batch, args.timeout)
+        print(f"Seeding {args.users} users with {args.cvs_per_user} CV(s) each")
+        await runner.seed(args.users, args.cvs_per_user)
+
+        levels = []
+        for concurrency in args.concurrency:
+            level = await runner.run_level(concurrency, args.duration)
+            print_level(level)
+            levels.append(level)
+
+        saturation = find_saturation(levels, args.min_gain, args.max_error_rate)
+        print()
+        if saturation:
+            print(f"Saturation point with {args.workers} worker(s): concurrency "
+                  f"{saturation['concurrency']} at {saturation['throughput']:.1f} req/s")
+        else:
+            print(f"Saturated at the first level: error rate above {args.max_error_rate:.0%}")
+
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump({
+                    "workers": args.workers,
+                    "mix": args.mix,
+                    "levels": levels,
+                    "saturation_concurrency": saturation["concurrency"] if saturation else None,
+                }, f, indent=2)
+            print(f"Wrote {args.output}")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--concurrency", type=lambda v: [int(c) for c in v.split(",")],
+                        default=[1, 2, 4, 8, 16, 32], help="comma-separated virtual user counts")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per concurrency level")
+    parser.add_argument("--users", type=int, default=5, help="tenants to seed")
+    parser.add_argument("--cvs-per-user", type=int, default=3, help="CVs uploaded per tenant while seeding")
+    parser.add_argument("--upload-batch", type=int, default=3, help="files per bulk upload request")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="scenario weights, e.g. login=10,list_cvs=40,upload=20,generate=30")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="directory of sample CVs")
+    parser.add_argument("--corpus-limit", type=int, default=50, help="max sample files to load")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="mean stub LLM latency in seconds")
+    parser.add_argument("--llm-jitter", type=float, default=0.1, help="stub LLM latency std deviation")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request timeout in seconds")
+    parser.add_argument("--min-gain", type=float, default=0.05,
+                        help="minimum relative throughput gain for a level to count as scaling")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="error rate that marks saturation")
+    parser.add_argument("--output", help="write the full results as JSON")
+    asyncio.run(main(parser.parse_args()))
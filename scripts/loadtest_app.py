@@ -0,0 +1,71 @@
+"""ASGI entry point used by the load harness.
+
+Serves ``backend.main:app`` with the LLM behind ``CVParser`` replaced by a
+stub that sleeps for a configurable latency and returns a canned CV, so load
+runs exercise everything except the OpenAI round trip.
+"""
+import asyncio
+import json
+import os
+import random
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, LLMResult
+
+from backend.main import app
+from backend.services.cv_parser import get_cv_parser
+
+STUB_CV = {
+    "personal_info": {
+        "name": "Load Test Candidate",
+        "email": "candidate@example.com",
+        "phone": "+65 6123 4567",
+        "location": "Singapore"
+    },
+    "summary": "Engineer with ten years of experience building data platforms.",
+    "work_experience": [
+        {
+            "company": f"Company {i}",
+            "position": "Senior Engineer",
+            "dates": f"{2010 + i} - {2011 + i}",
+            "responsibilities": [f"Delivered project {i}.{j}" for j in range(4)]
+        }
+        for i in range(6)
+    ],
+    "education": [
+        {"institution": "National University", "degree": "BSc Computer Science", "dates": "2006 - 2010"}
+    ],
+    "skills": ["Python", "SQL", "AWS", "Kubernetes", "Spark", "Airflow"],
+    "certifications": ["AWS Solutions Architect"]
+}
+
+
+class StubLLM:
+    def __init__(self, latency: float, jitter: float):
+        self.latency = latency
+        self.jitter = jitter
+        self.text = "```json\n" + json.dumps(STUB_CV) + "\n```"
+
+    async def agenerate(self, messages_list):
+        await asyncio.sleep(max(0.0, random.gauss(self.latency, self.jitter)))
+        return LLMResult(generations=[
+            [ChatGeneration(message=AIMessage(content=self.text))]
+            for _ in messages_list
+        ])
+
+    async def astream(self, messages, chunk_size: int = 16):
+        # Same total latency, spread over the chunks after a time to first token
+        latency = max(0.0, random.gauss(self.latency, self.jitter))
+        await asyncio.sleep(latency * 0.2)
+        pieces = [self.text[i:i + chunk_size] for i in range(0, len(self.text), chunk_size)]
+        for piece in pieces:
+            await asyncio.sleep(latency * 0.8 / len(pieces))
+            yield AIMessageChunk(content=piece)
+
+
+get_cv_parser().llm = StubLLM(
+    latency=float(os.environ.get("LOADTEST_LLM_LATENCY", "0.5")),
+    jitter=float(os.environ.get("LOADTEST_LLM_JITTER", "0.1"))
+)
+
+__all__ = ["app"]
@@ -0,0 +1,40 @@
+"""Re-tag CVs with the current skill taxonomy.
+
+Run after changing the taxonomy (backend/data/skills.json or the file set by
+SKILL_TAXONOMY_PATH): CVs tagged with another version of it get their
+canonical skill IDs recomputed from their stored file and parsed data. Only
+text extraction and matching are involved, no LLM calls. Restart the app as
+well, so new uploads are tagged with the new taxonomy.
+
+Example:
+    DATABASE_URL=mysql://root:@localhost/craftcv python scripts/retag_skills.py
+"""
+import argparse
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from backend.database import SessionLocal  # noqa: E402
+from backend.services.skills import get_skill_tagger, retag_cvs  # noqa: E402
+
+
+def main(args):
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        retagged = retag_cvs(db, retag_all=args.all, read_files=not args.no_files, batch_size=args.batch_size)
+    print(
+        f"Re-tagged {retagged} CVs with skill taxonomy {get_skill_tagger().version} "
+        f"in {time.perf_counter() - started:.1f}s",
+        file=sys.stderr
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--all", action="store_true", help="re-tag every parsed CV, not just those with another version")
+    parser.add_argument("--no-files", action="store_true", help="only scan parsed_data, don't read the stored files")
+    parser.add_argument("--batch-size", type=int, default=200, help="CVs per committed batch")
+    main(parser.parse_args())